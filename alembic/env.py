@@ -8,7 +8,7 @@ from alembic import context
 from api.v1.models import *
 
 from api.v1.models.user import User
-from api.v1.models.exam import Paper, Exam, Question, UserExamSession, UserPaperCredit
+from api.v1.models.exam import Paper, Exam, Question, UserExamSession, UserPaperCredit, UserProgression, CatalogVersion, PendingSubmission, AnswerDraft, TheoryMark, SessionAnswer, ExamAnalysis, ExamItemStatistic, ExamStats
 from api.v1.models.base import Base
 
 from decouple import config as decouple_config
@@ -0,0 +1,79 @@
+"""Add exam_stats table
+
+Revision ID: 0b6d2f9e4c18
+Revises: f3a86d0c5b17
+Create Date: 2026-10-18 16:52:41.208113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b6d2f9e4c18'
+down_revision: Union[str, Sequence[str], None] = 'f3a86d0c5b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Seed each exam's aggregates (as shard 0) from the sessions finished so far
+BACKFILL = """
+INSERT INTO exam_stats (
+    exam_id, shard, submissions, passed, score_sum, score_sq_sum,
+    bucket_0, bucket_1, bucket_2, bucket_3, bucket_4, bucket_5, bucket_6, bucket_7, bucket_8, bucket_9, updated_at
+)
+SELECT s.exam_id,
+       0,
+       COUNT(*),
+       COUNT(*) FILTER (WHERE s.score >= e.pass_mark),
+       SUM(s.score),
+       SUM(s.score * s.score),
+       COUNT(*) FILTER (WHERE LEAST(s.score / 10, 9) = 0),
+       COUNT(*) FILTER (WHERE LEAST(s.score / 10, 9) = 1),
+       COUNT(*) FILTER (WHERE LEAST(s.score / 10, 9) = 2),
+       COUNT(*) FILTER (WHERE LEAST(s.score / 10, 9) = 3),
+       COUNT(*) FILTER (WHERE LEAST(s.score / 10, 9) = 4),
+       COUNT(*) FILTER (WHERE LEAST(s.score / 10, 9) = 5),
+       COUNT(*) FILTER (WHERE LEAST(s.score / 10, 9) = 6),
+       COUNT(*) FILTER (WHERE LEAST(s.score / 10, 9) = 7),
+       COUNT(*) FILTER (WHERE LEAST(s.score / 10, 9) = 8),
+       COUNT(*) FILTER (WHERE LEAST(s.score / 10, 9) = 9),
+       now()
+FROM user_exam_sessions s
+JOIN exams e ON e.id = s.exam_id
+WHERE s.end_time IS NOT NULL
+  AND s.score IS NOT NULL
+GROUP BY s.exam_id
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('exam_stats',
+    sa.Column('exam_id', sa.UUID(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('submissions', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('passed', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('score_sum', sa.Float(), server_default='0', nullable=False),
+    sa.Column('score_sq_sum', sa.Float(), server_default='0', nullable=False),
+    sa.Column('bucket_0', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('bucket_1', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('bucket_2', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('bucket_3', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('bucket_4', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('bucket_5', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('bucket_6', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('bucket_7', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('bucket_8', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('bucket_9', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['exam_id'], ['exams.id'], ),
+    sa.PrimaryKeyConstraint('exam_id', 'shard')
+    )
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('exam_stats')
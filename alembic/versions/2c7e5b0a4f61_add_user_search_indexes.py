@@ -0,0 +1,48 @@
+"""Add user search indexes (pg_trgm, or FTS5 on SQLite)
+
+Revision ID: 2c7e5b0a4f61
+Revises: 8f4a1c6e9d27
+Create Date: 2026-10-18 18:41:52.774019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from api.v1.models.user import USER_FTS_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c7e5b0a4f61'
+down_revision: Union[str, Sequence[str], None] = '8f4a1c6e9d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_DOCUMENT = (
+    "lower(email || ' ' || coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || ican_number)"
+)
+
+# The same FTS5 table and triggers create_all builds for SQLite, plus a
+# rebuild to index the users that already exist
+SQLITE_FTS = USER_FTS_DDL + ["INSERT INTO users_fts(users_fts) VALUES ('rebuild')"]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        for statement in SQLITE_FTS:
+            op.execute(statement)
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(f"CREATE INDEX ix_users_search_trgm ON users USING gin ({SEARCH_DOCUMENT} gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        for trigger in ("users_fts_update", "users_fts_delete", "users_fts_insert"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS users_fts")
+        return
+    op.drop_index('ix_users_search_trgm', table_name='users')
@@ -0,0 +1,36 @@
+"""Add answer_drafts table
+
+Revision ID: 4c1f0e7d2a9b
+Revises: 9ae447752855
+Create Date: 2026-10-18 12:04:31.512907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1f0e7d2a9b'
+down_revision: Union[str, Sequence[str], None] = '9ae447752855'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('answer_drafts',
+    sa.Column('session_id', sa.UUID(), nullable=False),
+    sa.Column('question_id', sa.UUID(), nullable=False),
+    sa.Column('answer', sa.Text(), nullable=False),
+    sa.Column('saved_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ),
+    sa.ForeignKeyConstraint(['session_id'], ['user_exam_sessions.id'], ),
+    sa.PrimaryKeyConstraint('session_id', 'question_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('answer_drafts')
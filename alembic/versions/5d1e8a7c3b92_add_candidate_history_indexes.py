@@ -0,0 +1,30 @@
+"""Add covering indexes for candidate history pages
+
+Revision ID: 5d1e8a7c3b92
+Revises: 0b6d2f9e4c18
+Create Date: 2026-10-18 17:34:09.551807
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d1e8a7c3b92'
+down_revision: Union[str, Sequence[str], None] = '0b6d2f9e4c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_user_exam_sessions_user_history', 'user_exam_sessions', ['user_id', 'created_at', 'id'], unique=False, postgresql_include=['exam_id', 'score', 'start_time', 'end_time'])
+    op.create_index('ix_user_paper_credits_user_history', 'user_paper_credits', ['user_id', 'created_at', 'id'], unique=False, postgresql_include=['paper_id', 'passed_date'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_paper_credits_user_history', table_name='user_paper_credits')
+    op.drop_index('ix_user_exam_sessions_user_history', table_name='user_exam_sessions')
@@ -0,0 +1,49 @@
+"""Add indexes for the hot request paths
+
+Revision ID: 6a9d3e2f7b15
+Revises: 2c7e5b0a4f61
+Create Date: 2026-10-18 19:12:36.480952
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a9d3e2f7b15'
+down_revision: Union[str, Sequence[str], None] = '2c7e5b0a4f61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# name, table, columns, partial index predicate
+INDEXES = [
+    ('ix_papers_level', 'papers', ['level'], None),
+    ('ix_exams_paper_id', 'exams', ['paper_id'], None),
+    ('ix_questions_exam_order', 'questions', ['exam_id', 'created_at', 'id'], None),
+    ('ix_user_exam_sessions_active', 'user_exam_sessions', ['user_id', 'exam_id'], 'end_time IS NULL'),
+    ('ix_user_exam_sessions_exam_finished', 'user_exam_sessions', ['exam_id'], 'end_time IS NOT NULL'),
+    ('ix_user_paper_credits_user_paper', 'user_paper_credits', ['user_id', 'paper_id'], None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY keeps the tables writable while the indexes build, and
+    # can't run inside a transaction. IF NOT EXISTS lets a rerun pick up
+    # after an interrupted build (drop any index left INVALID first).
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False, if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
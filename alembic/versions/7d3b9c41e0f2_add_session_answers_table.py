@@ -0,0 +1,67 @@
+"""Add session_answers table and backfill it from submitted_answers
+
+Revision ID: 7d3b9c41e0f2
+Revises: e87d60a5f7d9
+Create Date: 2026-10-18 13:37:52.880164
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3b9c41e0f2'
+down_revision: Union[str, Sequence[str], None] = 'e87d60a5f7d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# submitted_answers holds either a JSON string (as written by the API) or an
+# object. Unwrap it, keep answers to questions of the session's own exam and,
+# for a question answered twice, a correct answer over a wrong one.
+BACKFILL = """
+INSERT INTO session_answers (session_id, question_id, answer, correct)
+SELECT DISTINCT ON (s.id, q.id)
+       s.id,
+       q.id,
+       a.value ->> 'answer',
+       CASE WHEN q.question_type = 'THEORY' THEN NULL
+            ELSE (a.value ->> 'answer') = q.correct_answer END
+FROM user_exam_sessions s
+CROSS JOIN LATERAL jsonb_array_elements(
+    CASE jsonb_typeof(s.submitted_answers)
+        WHEN 'string' THEN (s.submitted_answers #>> '{}')::jsonb
+        ELSE s.submitted_answers
+    END -> 'answers'
+) AS a(value)
+JOIN questions q
+  ON q.exam_id = s.exam_id
+ AND q.id::text = a.value ->> 'question_id'
+WHERE s.submitted_answers IS NOT NULL
+  AND s.end_time IS NOT NULL
+  AND a.value ->> 'answer' IS NOT NULL
+ORDER BY s.id, q.id, ((a.value ->> 'answer') = q.correct_answer) DESC
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('session_answers',
+    sa.Column('session_id', sa.UUID(), nullable=False),
+    sa.Column('question_id', sa.UUID(), nullable=False),
+    sa.Column('answer', sa.Text(), nullable=False),
+    sa.Column('correct', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ),
+    sa.ForeignKeyConstraint(['session_id'], ['user_exam_sessions.id'], ),
+    sa.PrimaryKeyConstraint('session_id', 'question_id')
+    )
+    op.execute(BACKFILL)
+    op.create_index('ix_session_answers_question_id', 'session_answers', ['question_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_session_answers_question_id', table_name='session_answers')
+    op.drop_table('session_answers')
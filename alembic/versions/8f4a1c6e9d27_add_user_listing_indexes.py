@@ -0,0 +1,34 @@
+"""Add indexes for admin user listing
+
+Revision ID: 8f4a1c6e9d27
+Revises: 5d1e8a7c3b92
+Create Date: 2026-10-18 18:05:27.316640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f4a1c6e9d27'
+down_revision: Union[str, Sequence[str], None] = '5d1e8a7c3b92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+    op.create_index('ix_users_admins', 'users', ['created_at', 'id'], unique=False, postgresql_where=sa.text('is_admin IS TRUE'))
+    op.create_index('ix_users_inactive', 'users', ['created_at', 'id'], unique=False, postgresql_where=sa.text('is_active IS FALSE'))
+    op.create_index('ix_users_unverified', 'users', ['created_at', 'id'], unique=False, postgresql_where=sa.text('is_verified IS FALSE'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_unverified', table_name='users', postgresql_where=sa.text('is_verified IS FALSE'))
+    op.drop_index('ix_users_inactive', table_name='users', postgresql_where=sa.text('is_active IS FALSE'))
+    op.drop_index('ix_users_admins', table_name='users', postgresql_where=sa.text('is_admin IS TRUE'))
+    op.drop_index('ix_users_created_at_id', table_name='users')
@@ -0,0 +1,34 @@
+"""Add per-candidate question sampling settings and session seeds
+
+Revision ID: a5e2c8f19d34
+Revises: 7d3b9c41e0f2
+Create Date: 2026-10-18 14:21:06.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5e2c8f19d34'
+down_revision: Union[str, Sequence[str], None] = '7d3b9c41e0f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('exams', sa.Column('questions_per_candidate', sa.Integer(), nullable=True))
+    op.add_column('exams', sa.Column('shuffle_questions', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+    op.add_column('exams', sa.Column('shuffle_options', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+    op.add_column('user_exam_sessions', sa.Column('seed', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user_exam_sessions', 'seed')
+    op.drop_column('exams', 'shuffle_options')
+    op.drop_column('exams', 'shuffle_questions')
+    op.drop_column('exams', 'questions_per_candidate')
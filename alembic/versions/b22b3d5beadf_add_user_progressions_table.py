@@ -0,0 +1,42 @@
+"""Add user_progressions table
+
+Revision ID: b22b3d5beadf
+Revises: 3ae79a5d68c0
+Create Date: 2026-10-18 09:12:40.418263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'b22b3d5beadf'
+down_revision: Union[str, Sequence[str], None] = '3ae79a5d68c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_progressions',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('current_level', postgresql.ENUM('FOUNDATION', 'SKILLS', 'PROFESSSIONAL', name='examlevel', create_type=False), nullable=False),
+    sa.Column('passed_papers', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_progressions_id'), 'user_progressions', ['id'], unique=False)
+    op.create_index(op.f('ix_user_progressions_user_id'), 'user_progressions', ['user_id'], unique=True)
+    # Populate with: python manage.py backfill-progression
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_progressions_user_id'), table_name='user_progressions')
+    op.drop_index(op.f('ix_user_progressions_id'), table_name='user_progressions')
+    op.drop_table('user_progressions')
@@ -0,0 +1,33 @@
+"""Add provisional to user_exam_sessions for results awaiting theory marking
+
+Revision ID: b7e3f1c9a4d2
+Revises: d4b8e1a6c3f0
+Create Date: 2026-10-18 23:12:40.516207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3f1c9a4d2'
+down_revision: Union[str, Sequence[str], None] = 'd4b8e1a6c3f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_exam_sessions', sa.Column('provisional', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+    # The history page reports provisional results, so the covering index includes the column
+    op.drop_index('ix_user_exam_sessions_user_history', table_name='user_exam_sessions')
+    op.create_index('ix_user_exam_sessions_user_history', 'user_exam_sessions', ['user_id', 'created_at', 'id'], unique=False, postgresql_include=['exam_id', 'score', 'start_time', 'end_time', 'provisional'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_exam_sessions_user_history', table_name='user_exam_sessions')
+    op.create_index('ix_user_exam_sessions_user_history', 'user_exam_sessions', ['user_id', 'created_at', 'id'], unique=False, postgresql_include=['exam_id', 'score', 'start_time', 'end_time'])
+    op.drop_column('user_exam_sessions', 'provisional')
@@ -0,0 +1,57 @@
+"""Store session start/end as timestamps and add expires_at
+
+Revision ID: c91f4b7e2d60
+Revises: a5e2c8f19d34
+Create Date: 2026-10-18 15:02:44.719350
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c91f4b7e2d60'
+down_revision: Union[str, Sequence[str], None] = 'a5e2c8f19d34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing values only have day precision; they become midnight UTC
+    op.alter_column('user_exam_sessions', 'start_time',
+               existing_type=sa.Date(),
+               type_=sa.DateTime(timezone=True),
+               existing_nullable=False,
+               postgresql_using="start_time::timestamp AT TIME ZONE 'UTC'")
+    op.alter_column('user_exam_sessions', 'end_time',
+               existing_type=sa.Date(),
+               type_=sa.DateTime(timezone=True),
+               existing_nullable=True,
+               postgresql_using="end_time::timestamp AT TIME ZONE 'UTC'")
+    op.add_column('user_exam_sessions', sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute("""
+        UPDATE user_exam_sessions s
+        SET expires_at = s.start_time + make_interval(mins => COALESCE(e.duration_minutes, 180))
+        FROM exams e
+        WHERE e.id = s.exam_id AND s.end_time IS NULL
+    """)
+    op.create_index('ix_user_exam_sessions_open_expiry', 'user_exam_sessions', ['expires_at'], unique=False, postgresql_where=sa.text('end_time IS NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_exam_sessions_open_expiry', table_name='user_exam_sessions', postgresql_where=sa.text('end_time IS NULL'))
+    op.drop_column('user_exam_sessions', 'expires_at')
+    op.alter_column('user_exam_sessions', 'end_time',
+               existing_type=sa.DateTime(timezone=True),
+               type_=sa.Date(),
+               existing_nullable=True,
+               postgresql_using="(end_time AT TIME ZONE 'UTC')::date")
+    op.alter_column('user_exam_sessions', 'start_time',
+               existing_type=sa.DateTime(timezone=True),
+               type_=sa.Date(),
+               existing_nullable=False,
+               postgresql_using="(start_time AT TIME ZONE 'UTC')::date")
@@ -0,0 +1,28 @@
+"""Add next_attempt_at to pending_submissions for grading retries
+
+Revision ID: d4b8e1a6c3f0
+Revises: 6a9d3e2f7b15
+Create Date: 2026-10-18 21:04:52.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4b8e1a6c3f0'
+down_revision: Union[str, Sequence[str], None] = '6a9d3e2f7b15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('pending_submissions', sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('pending_submissions', 'next_attempt_at')
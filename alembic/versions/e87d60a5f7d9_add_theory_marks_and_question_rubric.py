@@ -0,0 +1,40 @@
+"""Add theory_marks table and questions.rubric
+
+Revision ID: e87d60a5f7d9
+Revises: 4c1f0e7d2a9b
+Create Date: 2026-10-18 12:48:09.274615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e87d60a5f7d9'
+down_revision: Union[str, Sequence[str], None] = '4c1f0e7d2a9b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('theory_marks',
+    sa.Column('session_id', sa.UUID(), nullable=False),
+    sa.Column('question_id', sa.UUID(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('similarity', sa.Float(), nullable=False),
+    sa.Column('keyword_coverage', sa.Float(), nullable=True),
+    sa.Column('marked_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ),
+    sa.ForeignKeyConstraint(['session_id'], ['user_exam_sessions.id'], ),
+    sa.PrimaryKeyConstraint('session_id', 'question_id')
+    )
+    op.add_column('questions', sa.Column('rubric', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('questions', 'rubric')
+    op.drop_table('theory_marks')
@@ -0,0 +1,50 @@
+"""Add exam_analyses and exam_item_statistics tables
+
+Revision ID: f3a86d0c5b17
+Revises: c91f4b7e2d60
+Create Date: 2026-10-18 15:40:13.095528
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a86d0c5b17'
+down_revision: Union[str, Sequence[str], None] = 'c91f4b7e2d60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('exam_analyses',
+    sa.Column('exam_id', sa.UUID(), nullable=False),
+    sa.Column('candidates', sa.Integer(), nullable=False),
+    sa.Column('mean_score', sa.Float(), nullable=True),
+    sa.Column('score_std', sa.Float(), nullable=True),
+    sa.Column('histogram', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('computed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['exam_id'], ['exams.id'], ),
+    sa.PrimaryKeyConstraint('exam_id')
+    )
+    op.create_table('exam_item_statistics',
+    sa.Column('exam_id', sa.UUID(), nullable=False),
+    sa.Column('question_id', sa.UUID(), nullable=False),
+    sa.Column('presented', sa.Integer(), nullable=False),
+    sa.Column('answered', sa.Integer(), nullable=False),
+    sa.Column('p_value', sa.Float(), nullable=True),
+    sa.Column('point_biserial', sa.Float(), nullable=True),
+    sa.Column('distractors', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.ForeignKeyConstraint(['exam_id'], ['exams.id'], ),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ),
+    sa.PrimaryKeyConstraint('exam_id', 'question_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('exam_item_statistics')
+    op.drop_table('exam_analyses')
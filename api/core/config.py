@@ -1,6 +1,7 @@
 from decouple import config
 from pydantic_settings import BaseSettings
 from pathlib import Path
+import tempfile
 
 BASE_DIR = Path(__file__).resolve().parent
 
@@ -15,12 +16,47 @@ class Settings(BaseSettings):
     DB_PASSWORD: str = config("DB_PASSWORD")
     DB_NAME: str = config("DB_NAME")
     DB_TYPE: str = config("DB_TYPE")
+    ASYNC_DB_POOL_SIZE: int = config("ASYNC_DB_POOL_SIZE", cast=int, default=20)
+    ASYNC_DB_MAX_OVERFLOW: int = config("ASYNC_DB_MAX_OVERFLOW", cast=int, default=20)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = config("ACCESS_TOKEN_EXPIRE_MINUTES")
     JWT_REFRESH_EXPIRY: int = config("JWT_REFRESH_EXPIRY")
     CLOUD_NAME: str = config("CLOUD_NAME")
     API_KEY:str = config("API_KEY")
     API_SECRETS: str = config("API_SECRET")
     CLOUDINARY_URL: str = config("CLOUDINARY_URL")
+    PASSWORD_POOL_WORKERS: int = config("PASSWORD_POOL_WORKERS", cast=int, default=2)
+    PASSWORD_POOL_MAX_PENDING: int = config("PASSWORD_POOL_MAX_PENDING", cast=int, default=16)
+    PASSWORD_POOL_TIMEOUT: float = config("PASSWORD_POOL_TIMEOUT", cast=float, default=10.0)
+    PASSWORD_POOL_RETRY_AFTER: int = config("PASSWORD_POOL_RETRY_AFTER", cast=int, default=2)
+    JWT_CACHE_SIZE: int = config("JWT_CACHE_SIZE", cast=int, default=10000)
+    IDENTITY_CACHE_SIZE: int = config("IDENTITY_CACHE_SIZE", cast=int, default=10000)
+    IDENTITY_CACHE_TTL: int = config("IDENTITY_CACHE_TTL", cast=int, default=60)
+    MX_RESOLVER_BACKEND: str = config("MX_RESOLVER_BACKEND", default="dns")
+    MX_POSITIVE_TTL: int = config("MX_POSITIVE_TTL", cast=int, default=86400)
+    MX_NEGATIVE_TTL: int = config("MX_NEGATIVE_TTL", cast=int, default=600)
+    MX_LOOKUP_BUDGET: float = config("MX_LOOKUP_BUDGET", cast=float, default=1.5)
+    MX_FAIL_OPEN: bool = config("MX_FAIL_OPEN", cast=bool, default=False)
+    MX_STUB_UNDELIVERABLE: str = config("MX_STUB_UNDELIVERABLE", default="")
+    GRADING_QUEUE_WORKERS: int = config("GRADING_QUEUE_WORKERS", cast=int, default=2)
+    GRADING_QUEUE_BATCH_SIZE: int = config("GRADING_QUEUE_BATCH_SIZE", cast=int, default=200)
+    GRADING_QUEUE_POLL_INTERVAL: float = config("GRADING_QUEUE_POLL_INTERVAL", cast=float, default=1.0)
+    GRADING_QUEUE_MAX_ATTEMPTS: int = config("GRADING_QUEUE_MAX_ATTEMPTS", cast=int, default=5)
+    GRADING_QUEUE_RETRY_BACKOFF: float = config("GRADING_QUEUE_RETRY_BACKOFF", cast=float, default=10.0)
+    REGRADE_BATCH_SIZE: int = config("REGRADE_BATCH_SIZE", cast=int, default=5000)
+    AUTOSAVE_FLUSH_INTERVAL: float = config("AUTOSAVE_FLUSH_INTERVAL", cast=float, default=3.0)
+    AUTOSAVE_BATCH_SIZE: int = config("AUTOSAVE_BATCH_SIZE", cast=int, default=1000)
+    AUTOSAVE_MAX_PENDING: int = config("AUTOSAVE_MAX_PENDING", cast=int, default=50000)
+    THEORY_FULL_MARK_SIMILARITY: float = config("THEORY_FULL_MARK_SIMILARITY", cast=float, default=0.75)
+    THEORY_KEYWORD_WEIGHT: float = config("THEORY_KEYWORD_WEIGHT", cast=float, default=0.4)
+    SESSION_EXPIRY_GRACE: int = config("SESSION_EXPIRY_GRACE", cast=int, default=30)
+    SESSION_EXPIRY_HORIZON: int = config("SESSION_EXPIRY_HORIZON", cast=int, default=300)
+    SESSION_EXPIRY_BATCH_SIZE: int = config("SESSION_EXPIRY_BATCH_SIZE", cast=int, default=200)
+    SESSION_EXPIRY_LOCK_ID: int = config("SESSION_EXPIRY_LOCK_ID", cast=int, default=7_418_001)
+    EXAM_STATS_SHARDS: int = config("EXAM_STATS_SHARDS", cast=int, default=8)
+    RATE_LIMIT_STORAGE_URI: str = config(
+        "RATE_LIMIT_STORAGE_URI",
+        default=f"sqlite:///{Path(tempfile.gettempdir()) / 'testa_rate_limits.db'}",
+    )
 
     class Config:
         env_file = ".env"
@@ -2,6 +2,7 @@
 """
 from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from api.core.config import settings, BASE_DIR
 
 
@@ -34,9 +35,31 @@ def get_db_engine(test_mode: bool = False):
     return create_engine(DATABASE_URL)
 
 
+def get_async_db_engine(test_mode: bool = False):
+    """Async engine on the same database: asyncpg for Postgres, aiosqlite for SQLite"""
+
+    if DB_TYPE == "sqlite" or test_mode:
+        BASE_PATH = f"sqlite+aiosqlite:///{BASE_DIR}"
+        DATABASE_URL = BASE_PATH + ("test.db" if test_mode else "/")
+        return create_async_engine(DATABASE_URL)
+
+    DATABASE_URL = (
+        f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    )
+    return create_async_engine(
+        DATABASE_URL,
+        pool_size=settings.ASYNC_DB_POOL_SIZE,
+        max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+    )
+
+
 engine = get_db_engine()
+async_engine = get_async_db_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: attributes can't lazy-load outside run_sync/await
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=async_engine)
 
 db_session = scoped_session(SessionLocal)
 
@@ -53,3 +76,13 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Yields an AsyncSession for `async def` routes.
+
+    Sync service code runs on it through `await db.run_sync(fn, ...)`, which
+    hands `fn` a regular Session whose I/O is awaited on the event loop.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,45 @@
+""" This module contains small in-process metric helpers
+"""
+import threading
+
+
+class TimingStats:
+    """Thread-safe running count/total/max of a duration in seconds"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        """Records a single duration"""
+
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def snapshot(self) -> dict:
+        """Returns the current values in milliseconds"""
+
+        with self._lock:
+            avg = self.total / self.count if self.count else 0.0
+            return {
+                "count": self.count,
+                "avg_ms": round(avg * 1000, 3),
+                "max_ms": round(self.max * 1000, 3),
+            }
+
+
+class Counter:
+    """Thread-safe monotonically increasing counter"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def incr(self, amount: int = 1):
+        with self._lock:
+            self.value += amount
@@ -0,0 +1,152 @@
+""" This module resolves whether an email domain accepts mail
+
+Lookups are cached per domain (separate TTLs for domains that have MX records
+and for those that don't), concurrent lookups for the same domain share a
+single DNS query, and every lookup is bounded by a latency budget, so login
+latency never depends on a slow upstream DNS server. When the budget runs out
+or the resolver errors nothing is cached and the domain is rejected, as an
+uncached lookup always was; MX_FAIL_OPEN=true lets such domains through
+instead.
+"""
+import threading
+from typing import Iterable, Optional
+
+import dns.resolver
+
+from api.core.config import settings
+from api.utils.cache import TTLCache
+from api.utils.logger import logger
+from api.utils.metrics import Counter
+
+
+class DNSBackend:
+    """Looks MX records up with dnspython"""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+
+    def has_mx(self, domain: str) -> bool:
+        resolver = dns.resolver.Resolver()
+        resolver.lifetime = self.timeout
+        try:
+            answer = resolver.resolve(domain, "MX")
+        except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+            return False
+        return len(answer) > 0
+
+
+class StubBackend:
+    """Offline backend for tests and local runs: every domain accepts mail
+    except the ones listed in `undeliverable` (MX_STUB_UNDELIVERABLE)"""
+
+    def __init__(self, undeliverable: Iterable[str] = ()):
+        self.undeliverable = {d.strip().lower() for d in undeliverable if d.strip()}
+
+    def has_mx(self, domain: str) -> bool:
+        return domain not in self.undeliverable
+
+
+class _Flight:
+    """A lookup in progress that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[bool] = None
+
+
+class MXResolver:
+    """Cached, single-flight, time-bounded MX lookups"""
+
+    def __init__(
+        self,
+        backend,
+        positive_ttl: float,
+        negative_ttl: float,
+        budget: float,
+        fail_open: bool = False,
+        maxsize: int = 10000,
+    ):
+        self.backend = backend
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.budget = budget
+        self.fail_open = fail_open
+
+        self._cache = TTLCache(maxsize=maxsize)
+        self._inflight: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+        self.lookups = Counter()
+        self.coalesced = Counter()
+        self.unresolved = Counter()
+
+    def _lookup(self, domain: str) -> Optional[bool]:
+        """Runs the backend lookup; None means no answer within budget"""
+
+        self.lookups.incr()
+        try:
+            result = self.backend.has_mx(domain)
+        except Exception as exc:
+            logger.warning(f"MX lookup for {domain} failed: {exc!r}")
+            return None
+        self._cache.set(
+            domain, result, ttl=self.positive_ttl if result else self.negative_ttl
+        )
+        return result
+
+    def has_mx(self, domain: str) -> bool:
+        """Returns whether the domain accepts mail. A lookup that fails or runs
+        out of budget counts as no, unless the resolver fails open"""
+
+        domain = domain.lower().rstrip(".")
+
+        cached = self._cache.get(domain)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            flight = self._inflight.get(domain)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[domain] = flight
+
+        if leader:
+            try:
+                flight.result = self._lookup(domain)
+            finally:
+                flight.done.set()
+                with self._lock:
+                    self._inflight.pop(domain, None)
+            result = flight.result
+        else:
+            self.coalesced.incr()
+            result = flight.result if flight.done.wait(self.budget) else None
+
+        if result is None:
+            self.unresolved.incr()
+            return self.fail_open
+        return result
+
+    def stats(self) -> dict:
+        return {
+            **self._cache.stats(),
+            "lookups": self.lookups.value,
+            "coalesced": self.coalesced.value,
+            "unresolved": self.unresolved.value,
+        }
+
+
+def _make_backend():
+    if settings.MX_RESOLVER_BACKEND == "stub":
+        return StubBackend(settings.MX_STUB_UNDELIVERABLE.split(","))
+    return DNSBackend(timeout=settings.MX_LOOKUP_BUDGET)
+
+
+mx_resolver = MXResolver(
+    backend=_make_backend(),
+    positive_ttl=settings.MX_POSITIVE_TTL,
+    negative_ttl=settings.MX_NEGATIVE_TTL,
+    budget=settings.MX_LOOKUP_BUDGET,
+    fail_open=settings.MX_FAIL_OPEN,
+)
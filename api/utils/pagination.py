@@ -0,0 +1,135 @@
+""" Keyset (cursor) pagination over (created_at, id)
+
+A page is fetched with `WHERE (created_at, id) < (:last_created_at, :last_id)
+ORDER BY created_at DESC, id DESC LIMIT n`, which an index on the ordering
+columns answers by seeking straight to the cursor, so page 500 costs the
+same as page 1 (an OFFSET has to walk and discard every earlier row). The
+cursor is the last row's key, base64-encoded so clients treat it as opaque.
+
+Listings that show a total use the planner's row estimate for the filtered
+query instead of an exact COUNT(*), which would scan every matching row.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+def _encode(values: list) -> str:
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    return json.loads(raw)
+
+
+def encode_cursor(created_at: datetime, id: UUID) -> str:
+    """Function to build the opaque cursor of a row"""
+
+    return _encode([created_at.isoformat(), str(id)])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Function to read a cursor back into (created_at, id)"""
+
+    try:
+        created_at, id = _decode(cursor)
+        return datetime.fromisoformat(created_at), UUID(id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor."
+        )
+
+
+def keyset_query(query: Query, created_at, id, cursor: Optional[str], limit: int) -> Query:
+    """Function to narrow `query` to the page after `cursor`, newest first.
+
+    Fetches one row more than `limit`, which tells whether a next page exists.
+    """
+
+    if cursor:
+        query = query.filter(tuple_(created_at, id) < tuple_(*decode_cursor(cursor)))
+    return query.order_by(created_at.desc(), id.desc()).limit(limit + 1)
+
+
+def keyset_page(query: Query, created_at, id, cursor: Optional[str], limit: int) -> Tuple[list, Optional[str]]:
+    """Function to fetch the page of `query` after `cursor`, newest first.
+
+    `created_at` and `id` are the ordering columns; result rows must expose
+    them as `.created_at` and `.id`. Returns (rows, next cursor or None).
+    """
+
+    rows = keyset_query(query, created_at, id, cursor, limit).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def ranked_page(query: Query, rank, id, cursor: Optional[str], limit: int) -> Tuple[list, Optional[str]]:
+    """Function to fetch the page of `query` after `cursor`, best `rank` first.
+
+    Like keyset_page, with a relevance score in place of created_at; result
+    rows must expose them as `.rank` and `.id`.
+    """
+
+    if cursor:
+        try:
+            after_rank, after_id = _decode(cursor)
+            after = (float(after_rank), UUID(after_id))
+        except (ValueError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid pagination cursor."
+            )
+        query = query.filter(tuple_(rank, id) < tuple_(*after))
+
+    rows = query.order_by(rank.desc(), id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, _encode([rows[-1].rank, str(rows[-1].id)])
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) of a statement, sent with its bound parameters
+    so UUID and enum values go through their column types"""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain)
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def estimated_count(db: Session, query: Query) -> int:
+    """Function to estimate how many rows a query returns.
+
+    On Postgres this is the planner's estimate (from table statistics, so it
+    is as fresh as the last ANALYZE); other dialects count exactly.
+    """
+
+    query = query.order_by(None)
+    if db.get_bind().dialect.name != "postgresql":
+        return query.count()
+
+    plan = db.execute(_Explain(query.statement)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,161 @@
+""" This module runs bcrypt hashing and verification in a dedicated process pool
+
+bcrypt is deliberately slow (~250 ms of CPU per call). Running it inline pins one
+of the shared anyio worker threads for that long, so a burst of logins starves
+every other sync route. Here the CPU work happens in separate processes and the
+number of calls allowed in flight (running + queued) is capped; once the cap is
+reached callers are turned away immediately with a 503 and a Retry-After header
+instead of piling up behind the pool.
+"""
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from api.core.config import settings
+from api.utils.logger import logger
+from api.utils.metrics import TimingStats, Counter
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash(password: str):
+    """Runs in a pool process. Returns the hash and the time spent computing it"""
+
+    start = time.perf_counter()
+    hashed_password = pwd_context.hash(secret=password)
+    return hashed_password, time.perf_counter() - start
+
+
+def _verify(password: str, hash: str):
+    """Runs in a pool process. Returns the result and the time spent computing it"""
+
+    start = time.perf_counter()
+    verified = pwd_context.verify(secret=password, hash=hash)
+    return verified, time.perf_counter() - start
+
+
+class PasswordPool:
+    """Bounded process pool for password hashing and verification"""
+
+    def __init__(
+        self,
+        workers: int,
+        max_pending: int,
+        timeout: float,
+        retry_after: int,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.retry_after = retry_after
+
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+        self.queue_wait = TimingStats()
+        self.compute = TimingStats()
+        self.rejected = Counter()
+        self.timed_out = Counter()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn rather than fork: the parent is a threaded server process
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _reset_executor(self, executor: ProcessPoolExecutor):
+        with self._executor_lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _saturated(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy. Please try again shortly.",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected.incr()
+            raise self._saturated()
+
+        executor = self._get_executor()
+        submitted = time.perf_counter()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._reset_executor(executor)
+            raise self._saturated()
+        except BaseException:
+            self._slots.release()
+            raise
+
+        # The slot is held until the work actually finishes, even if this
+        # caller gives up waiting, so the cap reflects real pool occupancy.
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            result, compute_time = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.timed_out.incr()
+            raise self._saturated()
+        except BrokenProcessPool:
+            logger.exception("Password pool worker died")
+            self._reset_executor(executor)
+            raise self._saturated()
+
+        elapsed = time.perf_counter() - submitted
+        self.compute.record(compute_time)
+        self.queue_wait.record(max(elapsed - compute_time, 0.0))
+        return result
+
+    def hash(self, password: str) -> str:
+        """Hashes a password in the pool"""
+
+        return self._run(_hash, password)
+
+    def verify(self, password: str, hash: str) -> bool:
+        """Verifies a password against a hash in the pool"""
+
+        return self._run(_verify, password, hash)
+
+    def stats(self) -> dict:
+        """Returns pool configuration, rejections and timings"""
+
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected.value,
+            "timed_out": self.timed_out.value,
+            "queue_wait": self.queue_wait.snapshot(),
+            "compute": self.compute.snapshot(),
+        }
+
+    def shutdown(self):
+        """Stops the pool processes"""
+
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+password_pool = PasswordPool(
+    workers=settings.PASSWORD_POOL_WORKERS,
+    max_pending=settings.PASSWORD_POOL_MAX_PENDING,
+    timeout=settings.PASSWORD_POOL_TIMEOUT,
+    retry_after=settings.PASSWORD_POOL_RETRY_AFTER,
+)
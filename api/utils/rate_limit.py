@@ -0,0 +1,192 @@
+""" This module holds the application's single rate limiter
+
+The storage backend is chosen with RATE_LIMIT_STORAGE_URI. Besides the
+backends shipped with `limits` (memory://, redis://, ...), a `sqlite://`
+scheme is registered here so that every uvicorn worker on one host shares the
+same counters through a single SQLite file (point it at /dev/shm to keep it in
+shared memory). Counters use the sliding-window-counter strategy: one compact
+row per key holding the current and previous window counts.
+"""
+import math
+import sqlite3
+import threading
+import time
+
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from api.core.config import settings
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport):
+    """Cross-process rate limit storage backed by one SQLite file"""
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    # Expired rows are swept after this many writes
+    PURGE_EVERY = 1000
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        # Same convention as SQLAlchemy: sqlite:///relative or sqlite:////absolute
+        self.path = uri.split("://", 1)[1][1:] or ":memory:"
+        self._local = threading.local()
+        self._writes = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                " key TEXT PRIMARY KEY,"
+                " window INTEGER NOT NULL,"
+                " current INTEGER NOT NULL,"
+                " previous INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    class _Transaction:
+        def __init__(self, conn):
+            self.conn = conn
+
+        def __enter__(self):
+            # IMMEDIATE takes the write lock up front, so read-modify-write
+            # of a counter is atomic across processes.
+            self.conn.execute("BEGIN IMMEDIATE")
+            return self.conn
+
+        def __exit__(self, exc_type, exc, tb):
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+    def _transaction(self):
+        return self._Transaction(self._connection())
+
+    def _after_write(self, conn: sqlite3.Connection, now: float):
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+
+    @staticmethod
+    def _roll(row, window: int):
+        """Returns (previous, current) counts as seen from `window`"""
+
+        if row is None:
+            return 0, 0
+        stored_window, current, previous = row
+        if stored_window == window:
+            return previous, current
+        if stored_window == window - 1:
+            return current, 0
+        return 0, 0
+
+    # Fixed window
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT current, expires_at FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                value, expires_at = amount, now + expiry
+            else:
+                value, expires_at = row[0] + amount, row[1]
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits VALUES (?, 0, ?, 0, ?)",
+                (key, value, expires_at),
+            )
+            self._after_write(conn, now)
+        return value
+
+    def get(self, key: str) -> int:
+        row = self._connection().execute(
+            "SELECT current FROM rate_limits WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        row = self._connection().execute(
+            "SELECT expires_at FROM rate_limits WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    # Sliding window counter
+
+    def acquire_sliding_window_entry(
+        self, key: str, limit: int, expiry: int, amount: int = 1
+    ) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        window = math.floor(now / expiry)
+        elapsed = (now / expiry) % 1
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT window, current, previous FROM rate_limits WHERE key = ?",
+                (key,),
+            ).fetchone()
+            previous, current = self._roll(row, window)
+            weighted = previous * (1 - elapsed) + current
+            if math.floor(weighted) + amount > limit:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits VALUES (?, ?, ?, ?, ?)",
+                (key, window, current + amount, previous, (window + 2) * expiry),
+            )
+            self._after_write(conn, now)
+        return True
+
+    def get_sliding_window(self, key: str, expiry: int):
+        now = time.time()
+        window = math.floor(now / expiry)
+        elapsed = (now / expiry) % 1
+        row = self._connection().execute(
+            "SELECT window, current, previous FROM rate_limits WHERE key = ?",
+            (key,),
+        ).fetchone()
+        previous, current = self._roll(row, window)
+        previous_ttl = (1 - elapsed) * expiry if previous else 0.0
+        current_ttl = (1 - elapsed) * expiry + expiry
+        return previous, previous_ttl, current, current_ttl
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        self.clear(key)
+
+    # Housekeeping
+
+    def check(self) -> bool:
+        try:
+            self._connection().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        with self._transaction() as conn:
+            return conn.execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=settings.RATE_LIMIT_STORAGE_URI,
+    strategy="sliding-window-counter",
+)
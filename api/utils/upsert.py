@@ -0,0 +1,30 @@
+""" Dialect-aware INSERT ... ON CONFLICT
+"""
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+
+def upsert(db: Session, model, rows: list, keys: list, fields: list, where=None, increment: list = ()):
+    """Function to insert rows, updating `fields` of rows whose `keys` already exist.
+
+    `where` receives the statement's `excluded` row and returns an extra
+    condition an existing row must meet to be updated. Columns listed in
+    `increment` are added to the existing row's value instead of replacing it.
+    With neither `fields` nor `increment`, existing rows are left untouched.
+    """
+
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(model)
+    if not fields and not increment:
+        db.execute(stmt.on_conflict_do_nothing(index_elements=keys), rows)
+        return
+
+    set_ = {field: stmt.excluded[field] for field in fields}
+    set_.update({field: model.__table__.c[field] + stmt.excluded[field] for field in increment})
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_=set_,
+        where=where(stmt.excluded) if where is not None else None,
+    )
+    db.execute(stmt, rows)
@@ -1,6 +1,7 @@
 """ This is the Base Model Class
 """
 import uuid
+from datetime import datetime, timezone
 from fastapi import Depends
 from api.db.base import Base
 from sqlalchemy.dialects.postgresql import UUID
@@ -16,7 +17,12 @@ class BaseTableModel(Base):
     __abstract__ = True
 
     id = Column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Also set by the app: on SQLite a server default is stored without
+    # fractional seconds, so keyset cursors (api/utils/pagination) wouldn't
+    # compare equal to it as text
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), default=lambda: datetime.now(timezone.utc)
+    )
     updated_at = Column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
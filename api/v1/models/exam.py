@@ -1,9 +1,10 @@
 import enum 
-from sqlalchemy import (Column, String, ForeignKey, Integer, Date, Enum as SQLAlchemyEnum, Boolean, Text)
+from sqlalchemy import (Column, String, ForeignKey, Integer, BigInteger, Date, DateTime, Enum as SQLAlchemyEnum, Boolean, Float, Text, Index, text)
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.dialects.postgresql import JSONB
 
+from api.db.base import Base
 from api.v1.models.base import BaseTableModel
 
 
@@ -24,6 +25,9 @@ class ExamDiet(str, enum.Enum):
 
 class Paper(BaseTableModel):
     __tablename__ = 'papers'
+    __table_args__ = (
+        Index("ix_papers_level", "level"),
+    )
 
     title = Column(String, nullable=False, unique=True)
     level = Column(SQLAlchemyEnum(ExamLevel), nullable=False)
@@ -33,6 +37,9 @@ class Paper(BaseTableModel):
 
 class Exam(BaseTableModel):
     __tablename__ = 'exams'
+    __table_args__ = (
+        Index("ix_exams_paper_id", "paper_id"),
+    )
 
     paper_id = Column(UUID(as_uuid=True), ForeignKey('papers.id'), nullable=False)
     diet = Column(SQLAlchemyEnum(ExamDiet), nullable=False)
@@ -41,15 +48,28 @@ class Exam(BaseTableModel):
     total_score = Column(Integer, default=100)
     pass_mark = Column(Integer, default=50)
 
+    # Draw this many questions per candidate from the exam's pool (None: all)
+    questions_per_candidate = Column(Integer, nullable=True)
+    shuffle_questions = Column(Boolean, nullable=False, default=False, server_default=text("false"))
+    shuffle_options = Column(Boolean, nullable=False, default=False, server_default=text("false"))
+
     paper = relationship("Paper", back_populates="exams")
 
-    questions = relationship("Question", back_populates="exam", cascade="all, delete-orphan")
+    # Same order as the compiled answer key
+    questions = relationship(
+        "Question", back_populates="exam", cascade="all, delete-orphan",
+        order_by=lambda: (Question.created_at, Question.id)
+    )
 
     user_sessions = relationship("UserExamSession", back_populates="exam")
 
 
 class Question(BaseTableModel):
     __tablename__ = 'questions'
+    __table_args__ = (
+        # An exam's questions in paper order
+        Index("ix_questions_exam_order", "exam_id", "created_at", "id"),
+    )
 
     exam_id = Column(UUID(as_uuid=True), ForeignKey('exams.id'), nullable=False)
     question_text = Column(Text, nullable=False)
@@ -58,20 +78,47 @@ class Question(BaseTableModel):
     options = Column(JSONB, nullable=True)
     correct_answer = Column(Text, nullable=False)
 
+    # Theory questions only: key phrases a good answer should mention,
+    # "a|b" accepting either form, e.g. ["going concern", "depreciation|amortisation"]
+    rubric = Column(JSONB, nullable=True)
+
     exam = relationship("Exam", back_populates="questions")
 
 
 class UserExamSession(BaseTableModel):
     __tablename__ = "user_exam_sessions"
+    __table_args__ = (
+        Index("ix_user_exam_sessions_open_expiry", "expires_at", postgresql_where=text("end_time IS NULL")),
+        # A candidate's active session on an exam (start, paper, submit)
+        Index("ix_user_exam_sessions_active", "user_id", "exam_id", postgresql_where=text("end_time IS NULL")),
+        # An exam's finished sessions (regrade, marking, analysis, stats)
+        Index("ix_user_exam_sessions_exam_finished", "exam_id", postgresql_where=text("end_time IS NOT NULL")),
+        # Covers a candidate's history page (see services/history.py)
+        Index(
+            "ix_user_exam_sessions_user_history", "user_id", "created_at", "id",
+            postgresql_include=["exam_id", "score", "start_time", "end_time", "provisional"],
+        ),
+    )
 
     user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
     exam_id = Column(UUID(as_uuid=True), ForeignKey('exams.id'), nullable=False)
     score = Column(Integer, nullable=True)
 
+    # Legacy: submissions before session_answers existed, as a JSON string
     submitted_answers = Column(JSONB, nullable=True)
 
-    start_time = Column(Date, nullable=False)
-    end_time = Column(Date, nullable=True)
+    start_time = Column(DateTime(timezone=True), nullable=False)
+    end_time = Column(DateTime(timezone=True), nullable=True)
+    # start_time + the exam's duration; open sessions past it are auto-submitted
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Sampling/shuffling seed of personalized exams (see services/sampling.py)
+    seed = Column(BigInteger, nullable=True)
+
+    # Submitted with theory answers not marked yet: the score counts only the
+    # objective answers, and pass/fail, the credit and the exam's stats wait
+    # for theory marking (see services/theory_marking.py)
+    provisional = Column(Boolean, nullable=False, default=False, server_default=text("false"))
 
     user = relationship("User", back_populates="exam_sessions")
     exam = relationship("Exam", back_populates="user_sessions")
@@ -79,6 +126,14 @@ class UserExamSession(BaseTableModel):
 
 class UserPaperCredit(BaseTableModel):
     __tablename__ = "user_paper_credits"
+    __table_args__ = (
+        # Covers a candidate's credits page (see services/history.py)
+        Index(
+            "ix_user_paper_credits_user_history", "user_id", "created_at", "id",
+            postgresql_include=["paper_id", "passed_date"],
+        ),
+        Index("ix_user_paper_credits_user_paper", "user_id", "paper_id"),
+    )
 
     user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
     paper_id =  Column(UUID(as_uuid=True), ForeignKey('papers.id'), nullable=False)
@@ -89,3 +144,153 @@ class UserPaperCredit(BaseTableModel):
     user = relationship("User", back_populates="paper_credits")
     paper = relationship("Paper", back_populates="user_credits")
 
+
+class UserProgression(BaseTableModel):
+    """Materialized progression state, maintained whenever a credit is granted."""
+
+    __tablename__ = "user_progressions"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False, unique=True, index=True)
+    current_level = Column(SQLAlchemyEnum(ExamLevel), nullable=False, default=ExamLevel.FOUNDATION)
+
+    # {"Foundation": ["<paper id>", ...], "Skills": [...], "Professional": [...]}
+    passed_papers = Column(JSONB, nullable=False, default=dict)
+
+    user = relationship("User", back_populates="progression")
+
+
+class CatalogVersion(Base):
+    """Single-row counter bumped by every admin write to papers, exams or questions.
+
+    Workers compare it with the version of their in-process catalog cache.
+    """
+
+    __tablename__ = "catalog_versions"
+
+    id = Column(Integer, primary_key=True, default=1)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
+class PendingSubmission(BaseTableModel):
+    """A submission accepted for deferred grading; rows double as the work queue."""
+
+    __tablename__ = "pending_submissions"
+    __table_args__ = (
+        Index("ix_pending_submissions_queued", "created_at", postgresql_where=text("status = 'queued'")),
+    )
+
+    session_id = Column(UUID(as_uuid=True), ForeignKey('user_exam_sessions.id'), nullable=False, unique=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
+    payload = Column(JSONB, nullable=False)
+
+    # queued -> done | failed; a failed attempt is queued again (after
+    # next_attempt_at) until GRADING_QUEUE_MAX_ATTEMPTS, then stays failed
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class AnswerDraft(Base):
+    """The latest autosaved answer to one question of an active session."""
+
+    __tablename__ = "answer_drafts"
+
+    session_id = Column(UUID(as_uuid=True), ForeignKey('user_exam_sessions.id'), primary_key=True)
+    question_id = Column(UUID(as_uuid=True), ForeignKey('questions.id'), primary_key=True)
+    answer = Column(Text, nullable=False)
+
+    # When the API received the answer; older writes never overwrite newer ones
+    saved_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class TheoryMark(Base):
+    """The automatic mark of one theory answer, as a fraction of the question's mark."""
+
+    __tablename__ = "theory_marks"
+
+    session_id = Column(UUID(as_uuid=True), ForeignKey('user_exam_sessions.id'), primary_key=True)
+    question_id = Column(UUID(as_uuid=True), ForeignKey('questions.id'), primary_key=True)
+
+    score = Column(Float, nullable=False)
+    similarity = Column(Float, nullable=False)
+    keyword_coverage = Column(Float, nullable=True)
+    marked_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class SessionAnswer(Base):
+    """One answer of a submitted session; `correct` is None for theory answers."""
+
+    __tablename__ = "session_answers"
+    __table_args__ = (
+        Index("ix_session_answers_question_id", "question_id"),
+    )
+
+    session_id = Column(UUID(as_uuid=True), ForeignKey('user_exam_sessions.id'), primary_key=True)
+    question_id = Column(UUID(as_uuid=True), ForeignKey('questions.id'), primary_key=True)
+    answer = Column(Text, nullable=False)
+    correct = Column(Boolean, nullable=True)
+
+
+class ExamAnalysis(Base):
+    """Score distribution of an exam, as of its latest item analysis run."""
+
+    __tablename__ = "exam_analyses"
+
+    exam_id = Column(UUID(as_uuid=True), ForeignKey('exams.id'), primary_key=True)
+    candidates = Column(Integer, nullable=False)
+    mean_score = Column(Float, nullable=True)
+    score_std = Column(Float, nullable=True)
+    # Candidates per whole-number score, index 0..100
+    histogram = Column(JSONB, nullable=False)
+    computed_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class ExamItemStatistic(Base):
+    """Difficulty, discrimination and distractor counts of one question."""
+
+    __tablename__ = "exam_item_statistics"
+
+    exam_id = Column(UUID(as_uuid=True), ForeignKey('exams.id'), primary_key=True)
+    question_id = Column(UUID(as_uuid=True), ForeignKey('questions.id'), primary_key=True)
+
+    presented = Column(Integer, nullable=False)
+    answered = Column(Integer, nullable=False)
+    # Mean mark (proportion correct for objective questions)
+    p_value = Column(Float, nullable=True)
+    # Correlation of the item mark with the candidate's score
+    point_biserial = Column(Float, nullable=True)
+    # {"<option>": count, ..., "_other": count, "_omitted": count}
+    distractors = Column(JSONB, nullable=True)
+
+
+class ExamStats(Base):
+    """Running submission aggregates of an exam, kept up to date by grading.
+
+    Each exam has up to EXAM_STATS_SHARDS rows that submissions increment at
+    random, so concurrent submits rarely wait on the same row lock; readers
+    sum the shards.
+    """
+
+    __tablename__ = "exam_stats"
+
+    exam_id = Column(UUID(as_uuid=True), ForeignKey('exams.id'), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+
+    submissions = Column(BigInteger, nullable=False, default=0)
+    passed = Column(BigInteger, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0)
+    score_sq_sum = Column(Float, nullable=False, default=0)
+    # Submissions per score band: 0-9, 10-19, ..., 80-89, 90-100
+    bucket_0 = Column(BigInteger, nullable=False, default=0)
+    bucket_1 = Column(BigInteger, nullable=False, default=0)
+    bucket_2 = Column(BigInteger, nullable=False, default=0)
+    bucket_3 = Column(BigInteger, nullable=False, default=0)
+    bucket_4 = Column(BigInteger, nullable=False, default=0)
+    bucket_5 = Column(BigInteger, nullable=False, default=0)
+    bucket_6 = Column(BigInteger, nullable=False, default=0)
+    bucket_7 = Column(BigInteger, nullable=False, default=0)
+    bucket_8 = Column(BigInteger, nullable=False, default=0)
+    bucket_9 = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
@@ -1,11 +1,19 @@
 from sqlalchemy.orm import relationship
 
-from sqlalchemy import Column, String, text, Boolean, Index
+from sqlalchemy import Column, String, text, Boolean, Index, DDL, event, func, literal_column
 from api.v1.models.base import BaseTableModel
 
 
 class User(BaseTableModel):
     __tablename__ = "users"
+    __table_args__ = (
+        # Admin user listing pages by (created_at, id); the partial indexes
+        # serve the selective filters, the full one everything else
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index("ix_users_admins", "created_at", "id", postgresql_where=text("is_admin IS TRUE")),
+        Index("ix_users_inactive", "created_at", "id", postgresql_where=text("is_active IS FALSE")),
+        Index("ix_users_unverified", "created_at", "id", postgresql_where=text("is_verified IS FALSE")),
+    )
 
     email = Column(String, unique=True, nullable=False)
     password = Column(String, nullable=True)
@@ -20,6 +28,7 @@ class User(BaseTableModel):
 
     exam_sessions = relationship("UserExamSession", back_populates="user", cascade="all, delete-orphan")
     paper_credits = relationship("UserPaperCredit", back_populates="user", cascade="all, delete-orphan")
+    progression = relationship("UserProgression", back_populates="user", uselist=False, cascade="all, delete-orphan")
 
 
     def to_dict(self):
@@ -31,3 +40,46 @@ class User(BaseTableModel):
         return self.email
 
 
+
+
+# Text admin search matches against (see services/user_search.py). Literal
+# separators keep the query's expression identical to the index's.
+USER_SEARCH_DOCUMENT = func.lower(
+    User.email
+    + literal_column("' '") + func.coalesce(User.first_name, literal_column("''"))
+    + literal_column("' '") + func.coalesce(User.last_name, literal_column("''"))
+    + literal_column("' '") + User.ican_number
+)
+
+# Postgres: trigram index serving both similarity and substring (LIKE) search
+Index(
+    "ix_users_search_trgm",
+    USER_SEARCH_DOCUMENT.label("search_document"),
+    postgresql_using="gin",
+    postgresql_ops={"search_document": "gin_trgm_ops"},
+).ddl_if(dialect="postgresql")
+
+event.listen(
+    User.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+# SQLite (local runs): an FTS5 index over the same columns, kept in sync by
+# triggers. Migration 2c7e5b0a4f61 runs these same statements.
+USER_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "email, first_name, last_name, ican_number, content='users', content_rowid='rowid', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, email, first_name, last_name, ican_number) "
+    "VALUES (new.rowid, new.email, new.first_name, new.last_name, new.ican_number); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, email, first_name, last_name, ican_number) "
+    "VALUES ('delete', old.rowid, old.email, old.first_name, old.last_name, old.ican_number); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, email, first_name, last_name, ican_number) "
+    "VALUES ('delete', old.rowid, old.email, old.first_name, old.last_name, old.ican_number); "
+    "INSERT INTO users_fts(rowid, email, first_name, last_name, ican_number) "
+    "VALUES (new.rowid, new.email, new.first_name, new.last_name, new.ican_number); END",
+]
+for statement in USER_FTS_DDL:
+    event.listen(User.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
@@ -1,18 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
+from typing import Optional
 from uuid import UUID
 
 from api.db.database import get_db
-from api.v1.models.user import User
+from api.v1.schemas.user import AllUsersResponse, UserIdentity
 from api.v1.models.exam import Paper, Exam, Question
 from api.v1.schemas.exam import (
     PaperCreate, PaperResponse,
     ExamCreate, ExamResponse,
-    QuestionCreate, QuestionResponse
+    QuestionCreate, QuestionUpdate, QuestionResponse
 )
 
-from api.v1.services.user import user_service
+from api.utils.mx_resolver import mx_resolver
+from api.utils.password_pool import password_pool
+from api.utils.success_response import success_response
+from api.v1.services.autosave import autosave_buffer
+from api.v1.services.catalog import catalog_cache
+from api.v1.services.exam_stats import exam_stats_service
+from api.v1.services.grading import grading_service
+from api.v1.services.grading_queue import grading_queue
+from api.v1.services.item_analysis import item_analysis_service
+from api.v1.services.paper_payload import paper_payload_cache
+from api.v1.services.question_export import MEDIA_TYPES, question_exporter
+from api.v1.services.question_import import QuestionImportError, detect_format, question_importer
+from api.v1.services.regrade import regrade_service
+from api.v1.services.session_expiry import session_expiry
+from api.v1.services.theory_marking import theory_marker
+from api.v1.services.user import user_service, token_cache, identity_cache
+from api.v1.services.user_search import user_search_service
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -21,7 +39,7 @@ router = APIRouter(prefix="/admin", tags=["Admin"])
 def create_paper(
     paper_data: PaperCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(user_service.get_current_user)
+    current_user: UserIdentity = Depends(user_service.get_current_identity)
 ):
     """Admin endpoint to create a new exam paper (subject)."""
     
@@ -37,6 +55,7 @@ def create_paper(
     
     new_paper = Paper(**paper_data.model_dump())
     db.add(new_paper)
+    catalog_cache.bump(db)
     db.commit()
     db.refresh(new_paper)
     return new_paper
@@ -46,7 +65,7 @@ def create_paper(
 def create_exam(
     exam_data: ExamCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(user_service.get_current_user)
+    current_user: UserIdentity = Depends(user_service.get_current_identity)
 ):
     """Admin endpoint to create a specific exam instance for a paper."""
     
@@ -63,6 +82,7 @@ def create_exam(
     
     new_exam = Exam(**exam_data.model_dump())
     db.add(new_exam)
+    catalog_cache.bump(db)
     db.commit()
     db.refresh(new_exam)
     return new_exam
@@ -73,7 +93,7 @@ def add_question_to_exam(
     exam_id: UUID,
     question_data: QuestionCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(user_service.get_current_user)
+    current_user: UserIdentity = Depends(user_service.get_current_identity)
 ):
     user_service.get_current_admin_user(current_user=current_user)
 
@@ -92,6 +112,336 @@ def add_question_to_exam(
     # Create the question and associate it with the exam
     new_question = Question(**question_data.model_dump(), exam_id=exam_id)
     db.add(new_question)
+    catalog_cache.bump(db)
     db.commit()
     db.refresh(new_question)
-    return new_question
\ No newline at end of file
+    return new_question
+
+
+
+@router.post("/exams/{exam_id}/questions/import", status_code=status.HTTP_200_OK)
+def import_questions(
+    exam_id: UUID,
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    strict: bool = False,
+    db: Session = Depends(get_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity)
+):
+    """Admin endpoint to bulk import questions into an exam from a CSV or JSONL file.
+
+    Invalid rows are skipped and listed in the report; pass `strict=true` to
+    import nothing unless every row is valid.
+    """
+
+    user_service.get_current_admin_user(current_user=current_user)
+
+    if not db.query(Exam.id).filter(Exam.id == exam_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Exam with id {exam_id} not found."
+        )
+
+    try:
+        fmt = detect_format(file.filename, format)
+        report = question_importer.run(db, exam_id, file.file, fmt, strict=strict)
+    except QuestionImportError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=exc.detail)
+
+    return success_response(
+        status_code=status.HTTP_200_OK,
+        message=f"Imported {report.imported} questions",
+        data=report.to_dict()
+    )
+
+
+@router.get("/questions/export")
+def export_questions(
+    format: str = "jsonl",
+    paper_id: Optional[UUID] = None,
+    exam_id: Optional[UUID] = None,
+    current_user: UserIdentity = Depends(user_service.get_current_identity)
+):
+    """Admin endpoint to stream papers, exams and questions out as CSV or JSONL.
+
+    Filter with `paper_id` and/or `exam_id`; the whole bank is exported otherwise.
+    """
+
+    user_service.get_current_admin_user(current_user=current_user)
+
+    try:
+        fmt = detect_format(None, format)
+    except QuestionImportError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=exc.detail)
+
+    return StreamingResponse(
+        question_exporter.stream(fmt, paper_id=paper_id, exam_id=exam_id),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="questions.{fmt}"'}
+    )
+
+
+@router.patch("/questions/{question_id}", response_model=QuestionResponse)
+def update_question(
+    question_id: UUID,
+    question_data: QuestionUpdate,
+    background_tasks: BackgroundTasks,
+    regrade: bool = False,
+    db: Session = Depends(get_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity)
+):
+    """Admin endpoint to correct a question.
+
+    Pass `regrade=true` to re-grade the exam's finished sessions afterwards.
+    """
+
+    user_service.get_current_admin_user(current_user=current_user)
+
+    question = db.query(Question).filter(Question.id == question_id).first()
+    if not question:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Question with id {question_id} not found."
+        )
+
+    for key, value in question_data.model_dump(exclude_unset=True).items():
+        setattr(question, key, value)
+    catalog_cache.bump(db)
+    db.commit()
+    db.refresh(question)
+
+    if regrade:
+        job = regrade_service.create_job(question.exam_id)
+        background_tasks.add_task(regrade_service.run_in_background, job)
+
+    return question
+
+
+@router.post("/exams/{exam_id}/regrade", status_code=status.HTTP_202_ACCEPTED)
+def regrade_exam(
+    exam_id: UUID,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity)
+):
+    """Admin endpoint to re-grade every finished session of an exam against its current answer key."""
+
+    user_service.get_current_admin_user(current_user=current_user)
+
+    if not db.query(Exam.id).filter(Exam.id == exam_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Exam with id {exam_id} not found."
+        )
+
+    job = regrade_service.create_job(exam_id)
+    background_tasks.add_task(regrade_service.run_in_background, job)
+
+    return success_response(
+        status_code=status.HTTP_202_ACCEPTED,
+        message="Re-grade started",
+        data=job.to_dict()
+    )
+
+
+@router.post("/exams/{exam_id}/mark-theory", status_code=status.HTTP_202_ACCEPTED)
+def mark_theory_answers(
+    exam_id: UUID,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity)
+):
+    """Admin endpoint to auto-mark the theory answers of every finished session of an exam and rescore them.
+
+    Progress is reported by GET /admin/regrade-jobs/{job_id}.
+    """
+
+    user_service.get_current_admin_user(current_user=current_user)
+
+    if not db.query(Exam.id).filter(Exam.id == exam_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Exam with id {exam_id} not found."
+        )
+
+    job = theory_marker.create_job(exam_id)
+    background_tasks.add_task(theory_marker.run_in_background, job)
+
+    return success_response(
+        status_code=status.HTTP_202_ACCEPTED,
+        message="Theory marking started",
+        data=job.to_dict()
+    )
+
+
+@router.get("/exams/{exam_id}/stats", status_code=status.HTTP_200_OK)
+def get_exam_stats(
+    exam_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity)
+):
+    """Admin endpoint to fetch the live submission count, pass rate and score distribution of an exam."""
+
+    user_service.get_current_admin_user(current_user=current_user)
+
+    if not db.query(Exam.id).filter(Exam.id == exam_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Exam with id {exam_id} not found."
+        )
+
+    return success_response(
+        status_code=status.HTTP_200_OK,
+        message="Exam statistics retrieved successfully",
+        data=exam_stats_service.get(db, exam_id)
+    )
+
+
+@router.post("/exams/{exam_id}/item-analysis", status_code=status.HTTP_202_ACCEPTED)
+def run_item_analysis(
+    exam_id: UUID,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity)
+):
+    """Admin endpoint to (re)compute item statistics and the score distribution of an exam.
+
+    Progress is reported by GET /admin/regrade-jobs/{job_id}.
+    """
+
+    user_service.get_current_admin_user(current_user=current_user)
+
+    if not db.query(Exam.id).filter(Exam.id == exam_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Exam with id {exam_id} not found."
+        )
+
+    job = item_analysis_service.create_job(exam_id)
+    background_tasks.add_task(item_analysis_service.run_in_background, job)
+
+    return success_response(
+        status_code=status.HTTP_202_ACCEPTED,
+        message="Item analysis started",
+        data=job.to_dict()
+    )
+
+
+@router.get("/exams/{exam_id}/item-analysis", status_code=status.HTTP_200_OK)
+def get_item_analysis(
+    exam_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity)
+):
+    """Admin endpoint to fetch the latest item analysis of an exam."""
+
+    user_service.get_current_admin_user(current_user=current_user)
+
+    analysis = item_analysis_service.get(db, exam_id)
+    if analysis is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No item analysis for exam {exam_id} yet."
+        )
+
+    return success_response(
+        status_code=status.HTTP_200_OK,
+        message="Item analysis retrieved successfully",
+        data=analysis
+    )
+
+
+@router.get("/users", status_code=status.HTTP_200_OK, response_model=AllUsersResponse)
+def get_users(
+    cursor: Optional[str] = None,
+    per_page: int = Query(default=10, ge=1, le=100),
+    is_active: Optional[bool] = None,
+    is_admin: Optional[bool] = None,
+    is_verified: Optional[bool] = None,
+    estimate_total: bool = False,
+    db: Session = Depends(get_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity)
+):
+    """Admin endpoint to page through users, newest first.
+
+    Pass the returned `next_cursor` back as `cursor` for the next page.
+    """
+
+    user_service.get_current_admin_user(current_user=current_user)
+
+    return user_service.fetch_all(
+        db,
+        cursor=cursor,
+        per_page=per_page,
+        estimate_total=estimate_total,
+        is_active=is_active,
+        is_admin=is_admin,
+        is_verified=is_verified,
+    )
+
+
+@router.get("/users/search", status_code=status.HTTP_200_OK, response_model=AllUsersResponse)
+def search_users(
+    q: str = Query(..., min_length=2, max_length=100),
+    cursor: Optional[str] = None,
+    per_page: int = Query(default=10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity)
+):
+    """Admin endpoint to look users up by email, name or ICAN number, best match first.
+
+    Pass the returned `next_cursor` back as `cursor` for the next page.
+    """
+
+    user_service.get_current_admin_user(current_user=current_user)
+
+    users, next_cursor = user_search_service.search(db, q, cursor, per_page)
+    return user_service.all_users_response(users, None, per_page, next_cursor)
+
+
+@router.get("/regrade-jobs/{job_id}", status_code=status.HTTP_200_OK)
+def get_regrade_job(
+    job_id: UUID,
+    current_user: UserIdentity = Depends(user_service.get_current_identity)
+):
+    """Admin endpoint to follow the progress of a re-grade job started on this worker."""
+
+    user_service.get_current_admin_user(current_user=current_user)
+
+    job = regrade_service.get_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Re-grade job with id {job_id} not found."
+        )
+
+    return success_response(
+        status_code=status.HTTP_200_OK,
+        message="Re-grade job retrieved successfully",
+        data=job.to_dict()
+    )
+
+@router.get("/metrics", status_code=status.HTTP_200_OK)
+def get_metrics(
+    current_user: UserIdentity = Depends(user_service.get_current_identity)
+):
+    """Admin endpoint to read in-process performance counters for this worker."""
+
+    user_service.get_current_admin_user(current_user=current_user)
+
+    return success_response(
+        status_code=status.HTTP_200_OK,
+        message="Metrics retrieved successfully",
+        data={
+            "password_pool": password_pool.stats(),
+            "token_cache": token_cache.stats(),
+            "identity_cache": identity_cache.stats(),
+            "mx_resolver": mx_resolver.stats(),
+            "catalog_cache": catalog_cache.stats(),
+            "paper_payload_cache": paper_payload_cache.stats(),
+            "answer_key_cache": grading_service.stats(),
+            "grading_queue": grading_queue.stats(),
+            "autosave": autosave_buffer.stats(),
+            "session_expiry": session_expiry.stats(),
+        }
+    )
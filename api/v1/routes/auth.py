@@ -2,8 +2,6 @@ import logging
 from datetime import timedelta
 from fastapi.responses import JSONResponse
 from jose import ExpiredSignatureError, JWTError
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 
 from fastapi import (
     Depends,
@@ -17,10 +15,11 @@ from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 from typing import Annotated
 
+from api.utils.rate_limit import limiter
 from api.utils.success_response import auth_response, success_response
 from api.v1.models.user import User
 from api.v1.schemas.user import (
-    UserCreate, LoginRequest
+    UserCreate, LoginRequest, UserIdentity
 )
 from api.db.database import get_db
 from api.v1.services.user import user_service
@@ -31,7 +30,6 @@ from api.core.config import settings
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
-limiter = Limiter(key_func=get_remote_address)
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -115,7 +113,7 @@ def logout(
     request: Request,
     response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(user_service.get_current_user),
+    current_user: UserIdentity = Depends(user_service.get_current_identity),
 ):
     """Endpoint to log a user out of their account"""
     response = success_response(status_code=200, message="User logged put successfully")
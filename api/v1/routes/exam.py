@@ -1,167 +1,338 @@
-from uuid import UUID
-
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from datetime import date
-
-from api.db.database import get_db
-from api.v1.models.user import User
-from api.v1.models.exam import Paper, Exam, UserPaperCredit, UserExamSession
+import gzip
+from typing import Optional
+from uuid import UUID, uuid4
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta, timezone
+
+from api.db.database import get_async_db
+from api.v1.schemas.user import UserIdentity
+from api.v1.models.exam import Paper, Exam, UserPaperCredit, UserExamSession, PendingSubmission
 from api.v1.schemas.exam import QuestionResponse
 
-from api.v1.schemas.exam import ExamSessionResponse, ExamSubmission
-
+from api.v1.schemas.exam import ExamSessionResponse, ExamPaperResponse, ExamSubmission
+from api.v1.schemas.exam import AnswerDraftSave, AnswerDraftResponse, UserAnswer
+from api.v1.schemas.exam import ExamHistoryPage, PaperCreditPage
+
+from api.v1.services.autosave import autosave_buffer
+from api.v1.services.catalog import catalog_cache
+from api.v1.services.grading import grading_service
+from api.v1.services.grading_queue import grading_queue
+from api.v1.services.history import history_service
+from api.v1.services.paper_payload import paper_payload_cache
+from api.v1.services.progression import progression_service
+from api.v1.services.sampling import new_seed
+from api.v1.services.session_expiry import session_expiry
 from api.v1.services.user import user_service
 
 router = APIRouter(prefix="/exams", tags=["Exams"])
 
+# Handlers are async: direct queries are awaited on the AsyncSession and the
+# (sync) services run on it through `await db.run_sync(...)`, so a request
+# waiting on the database holds no threadpool thread.
+
 @router.get("/available")
-def get_available_exams(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(user_service.get_current_user)
+async def get_available_exams(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity_async)
 ):
     """
     Fetches a list of exams the current user is eligible to take based on their level.
     """
 
-    passed_paper_credits = db.query(UserPaperCredit.paper_id).filter(
-        UserPaperCredit.user_id == current_user.id
-    ).all()
-    passed_paper_ids = {pid for (pid,) in passed_paper_credits}
+    return await db.run_sync(progression_service.available_exams, current_user.id)
 
-    foundation_papers_count = db.query(Paper).filter(Paper.level == 'Foundation').count()
 
-    skills_papers_count = db.query(Paper).filter(Paper.level == 'Skills').count()
+@router.get("/history", response_model=ExamHistoryPage)
+async def get_exam_history(
+    cursor: Optional[str] = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity_async)
+):
+    """
+    Lists the current user's exam attempts, newest first.
 
-    passed_foundation_count = db.query(Paper).filter(
-        Paper.id.in_(passed_paper_ids), Paper.level == 'Foundation'
-    ).count()
+    Pass the returned `next_cursor` back as `cursor` for the next page.
+    """
 
-    current_level = 'Foundation'
-    if passed_foundation_count >= foundation_papers_count:
-        current_level = 'Skills'
+    items, next_cursor = await db.run_sync(history_service.sessions, current_user.id, cursor, limit)
+    return ExamHistoryPage(items=items, next_cursor=next_cursor)
 
-        passed_skills_count = db.query(Paper).filter(
-            Paper.id.in_(passed_paper_ids), Paper.level == 'Skills'
-        ).count()
-        if passed_skills_count >= skills_papers_count:
-            current_level = 'Professional'
 
+@router.get("/credits", response_model=PaperCreditPage)
+async def get_paper_credits(
+    cursor: Optional[str] = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity_async)
+):
+    """
+    Lists the papers the current user holds a credit for, newest first.
 
-    eligible_papers = db.query(Paper).filter(
-        Paper.level == current_level,
-        Paper.id.notin_(passed_paper_ids)
-    ).all()
-    eligible_paper_ids = [paper.id for paper in eligible_papers]
+    Pass the returned `next_cursor` back as `cursor` for the next page.
+    """
 
-    available_exams = db.query(Exam).filter(
-        Exam.paper_id.in_(eligible_paper_ids)
-    ).all()
-    
-    return available_exams
+    items, next_cursor = await db.run_sync(history_service.credits, current_user.id, cursor, limit)
+    return PaperCreditPage(items=items, next_cursor=next_cursor)
 
 
 @router.post("/{exam_id}/start", response_model=ExamSessionResponse)
-def start_exam_session(
+async def start_exam_session(
     exam_id: UUID,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(user_service.get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity_async)
 ):
     """
     Starts a new exam session for the user and returns the questions.
     """
 
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
-    if not exam:
-        raise HTTPException(status_code=404, detail="Exam not found")
-    
-    existing_session = db.query(UserExamSession).filter(
+    payload = await db.run_sync(paper_payload_cache.get, exam_id)
+
+    existing_session = (await db.execute(select(UserExamSession.id).where(
         UserExamSession.user_id == current_user.id,
         UserExamSession.exam_id == exam_id,
         UserExamSession.end_time == None
-    ).first()
+    ))).first()
 
     if existing_session:
         raise HTTPException(status_code=400, detail="You already have an active session for this exam.")
     
+    start_time = datetime.now(timezone.utc)
     new_session = UserExamSession(
+        id=uuid4(),
         user_id=current_user.id,
         exam_id=exam_id,
-        start_time=date.today()
+        start_time=start_time,
+        expires_at=start_time + timedelta(minutes=payload.duration_minutes or 180),
+        seed=new_seed() if payload.personalized else None
     )
 
     db.add(new_session)
-    db.commit()
-    db.refresh(new_session)
+    await db.commit()
+    session_expiry.schedule(new_session.id, new_session.expires_at)
+
+    return Response(
+        content=payload.session_body(new_session.id, new_session.seed),
+        media_type="application/json",
+        headers={"ETag": payload.etag_for(new_session.seed)},
+    )
+
+
+@router.get("/{exam_id}/paper", response_model=ExamPaperResponse)
+async def get_exam_paper(
+    exam_id: UUID,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity_async)
+):
+    """
+    Returns the answer-stripped paper for an exam.
+
+    Supports If-None-Match (304 when the paper is unchanged) and serves a
+    pre-gzipped body when the client accepts gzip. For exams that sample or
+    shuffle questions per candidate, this is the paper of the user's active
+    session.
+    """
+
+    payload = await db.run_sync(paper_payload_cache.get, exam_id)
+
+    seed = None
+    if payload.personalized:
+        session = (await db.execute(select(UserExamSession.seed).where(
+            UserExamSession.user_id == current_user.id,
+            UserExamSession.exam_id == exam_id,
+            UserExamSession.end_time == None
+        ))).first()
+        if not session:
+            raise HTTPException(status_code=404, detail="Start this exam to see its paper.")
+        seed = session.seed
+
+    etag = payload.etag_for(seed)
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    body = payload.paper_body(seed)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        if body is payload.body:
+            gzipped = payload.gzipped
+        else:
+            # Personalized bodies are compressed per request; keep that off the event loop
+            gzipped = await run_in_threadpool(gzip.compress, body, mtime=0)
+        return Response(content=gzipped, media_type="application/json", headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.put("/{session_id}/answers")
+async def autosave_answers(
+    session_id: UUID,
+    drafts: AnswerDraftSave,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity_async)
+):
+    """
+    Autosaves one or more answers of an active session.
+
+    Saves are buffered and written in batches every few seconds; the latest
+    answer per question wins.
+    """
+
+    saved = await db.run_sync(autosave_buffer.save, session_id, current_user.id, drafts.answers)
 
     return {
-        "session_id": new_session.id,
-        "exam_title": exam.paper.title,
-        "duration_minutes": exam.duration_minutes,
-        "questions": exam.questions
+        "message": "Answers saved",
+        "saved": saved
     }
 
 
+@router.get("/{session_id}/answers", response_model=AnswerDraftResponse)
+async def get_saved_answers(
+    session_id: UUID,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity_async)
+):
+    """
+    Returns the autosaved answers of an active session, e.g. after a reconnect.
+    """
+
+    await db.run_sync(autosave_buffer.active_session, session_id, current_user.id)
+    drafts = await db.run_sync(autosave_buffer.drafts, session_id)
+
+    return AnswerDraftResponse(
+        session_id=session_id,
+        answers=[UserAnswer(question_id=q, answer=a) for q, a in drafts.items()]
+    )
+
+
 @router.post("/{session_id}/submit")
-def submit_exam_answers(
+async def submit_exam_answers(
     session_id: UUID,
     submission: ExamSubmission,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(user_service.get_current_user)
+    deferred: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity_async)
 ):
     """
     Submits a user's answers, grades them, and finalizes the session.
+
+    Autosaved answers fill in any question the submission leaves out.
+    With `deferred=true` the answers are only recorded and the request is
+    answered with 202; the grading queue finalizes the session shortly after
+    and the outcome is available from the result URL.
     """
 
-    session = db.query(UserExamSession).filter(
+    # The row lock orders this submit with the grading queue and the expiry
+    # scheduler; whoever gets it second sees end_time set (or the queued row)
+    session = (await db.execute(select(UserExamSession).where(
         UserExamSession.id == session_id,
         UserExamSession.user_id == current_user.id,
         UserExamSession.end_time == None
-    ).first()
+    ).with_for_update())).scalars().first()
 
     if not session:
         raise HTTPException(status_code=404, detail="Active exam session not found.")
-    
-    correct_answers = {
-        str(q.id): q.correct_answer for q in session.exam.questions
-    }
 
-    score = 0
-    total_questions = len(session.exam.questions)
-
-    for user_answer in submission.answers:
-        question_id_str = str(user_answer.question_id)
-        if question_id_str in correct_answers and user_answer.answer == correct_answers[question_id_str]:
-            score += 1
-
-    final_score = (score / total_questions) * 100 if total_questions > 0 else 0
-
-    session.score = final_score
-    session.end_time = date.today()
-    session.submitted_answers = submission.model_dump_json()
-
-    passed = final_score >= session.exam.pass_mark
-
-    if passed:
-        # Check if a credit already exists to avoid duplicates
-        existing_credit = db.query(UserPaperCredit).filter(
-            UserPaperCredit.user_id == current_user.id,
-            UserPaperCredit.paper_id == session.exam.paper_id
-        ).first()
-        
-        if not existing_credit:
-            new_credit = UserPaperCredit(
-                user_id=current_user.id,
-                paper_id=session.exam.paper_id,
-                passed=True,
-                passed_date=date.today()
-            )
-            db.add(new_credit)
-            
-    db.commit()
+    already_queued = (await db.execute(select(PendingSubmission.id).where(
+        PendingSubmission.session_id == session_id
+    ))).first()
+    if already_queued:
+        raise HTTPException(status_code=409, detail="This session has already been submitted.")
+
+    submission = await db.run_sync(autosave_buffer.merge, session_id, submission)
+
+    if deferred:
+        await db.run_sync(grading_queue.enqueue, session, submission)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # A concurrent deferred submit of the same session got there first
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="This session has already been submitted.")
+        autosave_buffer.close_session(session_id)
+
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={
+                "message": "Exam submitted successfully! Your answers are being graded.",
+                "session_id": str(session_id),
+                "result_url": f"/api/v1/exams/{session_id}/result"
+            }
+        )
+
+    final_score, passed = await db.run_sync(grading_service.finalize, session, submission)
+    await db.commit()
+    autosave_buffer.close_session(session_id)
+
+    if passed is None:
+        return {
+            "message": "Exam submitted successfully! Your theory answers are marked later; until then the score is provisional.",
+            "score": final_score,
+            "passed": None,
+            "provisional": True
+        }
 
     return {
         "message": "Exam submitted successfully!",
         "score": final_score,
-        "passed": passed
-    }
\ No newline at end of file
+        "passed": passed,
+        "provisional": False
+    }
+
+
+@router.get("/{session_id}/result")
+async def get_exam_result(
+    session_id: UUID,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserIdentity = Depends(user_service.get_current_identity_async)
+):
+    """
+    Returns the grading status and, once graded, the outcome of a session.
+    """
+
+    session = (await db.execute(select(
+        UserExamSession.exam_id, UserExamSession.score, UserExamSession.end_time, UserExamSession.provisional
+    ).where(
+        UserExamSession.id == session_id,
+        UserExamSession.user_id == current_user.id
+    ))).first()
+
+    if not session:
+        raise HTTPException(status_code=404, detail="Exam session not found.")
+
+    if session.end_time is not None and session.provisional:
+        return {
+            "session_id": session_id,
+            "status": "provisional",
+            "score": session.score,
+            "passed": None
+        }
+
+    if session.end_time is not None:
+        exam = (await db.run_sync(catalog_cache.get)).exams.get(session.exam_id)
+        pass_mark = exam["pass_mark"] if exam else 50
+        return {
+            "session_id": session_id,
+            "status": "graded",
+            "score": session.score,
+            "passed": session.score is not None and session.score >= pass_mark
+        }
+
+    pending = (await db.execute(select(PendingSubmission.status).where(
+        PendingSubmission.session_id == session_id
+    ))).first()
+
+    return {
+        "session_id": session_id,
+        "status": pending.status if pending else "in_progress",
+        "score": None,
+        "passed": None
+    }
@@ -11,7 +11,7 @@ from fastapi.encoders import jsonable_encoder
 from api.utils.success_response import success_response
 from api.core.config import settings
 from api.v1.services.user import user_service
-from api.v1.schemas.user import UserUpdate
+from api.v1.schemas.user import UserUpdate, UserIdentity
 
 from api.db.database import get_db
 
@@ -36,7 +36,7 @@ async def upload_image(file: UploadFile = File(...)):
 @router.patch("/update", status_code=status.HTTP_200_OK)
 def update_current_user(
     user_id: str,
-    current_user : Annotated[User , Depends(user_service.get_current_user)],
+    current_user : Annotated[UserIdentity, Depends(user_service.get_current_identity)],
     schema: UserUpdate,
     db : Session = Depends(get_db),
 ):
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 
 from pydantic import UUID4
 
@@ -29,6 +29,9 @@ class ExamBase(BaseModel):
     year: int = Field(..., gt=2020)
     duration_minutes: int = Field(default=180, gt=0)
     pass_mark: int = Field(default=50, ge=0, le=100)
+    questions_per_candidate: Optional[int] = Field(default=None, ge=1)
+    shuffle_questions: bool = False
+    shuffle_options: bool = False
 
 
 class ExamCreate(ExamBase):
@@ -49,12 +52,21 @@ class QuestionBase(BaseModel):
     question_type: QuestionType
     options: Optional[List[str]] = None
     correct_answer: str
+    rubric: Optional[List[str]] = None
 
 
 class QuestionCreate(QuestionBase):
     pass
 
 
+class QuestionUpdate(BaseModel):
+    question_text: Optional[str] = None
+    question_type: Optional[QuestionType] = None
+    options: Optional[List[str]] = None
+    correct_answer: Optional[str] = None
+    rubric: Optional[List[str]] = None
+
+
 class QuestionResponse(QuestionBase):
     id: UUID4
     exam_id: UUID4
@@ -74,15 +86,59 @@ class QuestionForStudent(BaseModel):
         from_attributes = True
 
 
-class ExamSessionResponse(BaseModel):
-    session_id: UUID4
+class ExamPaperResponse(BaseModel):
     exam_title: str
     duration_minutes: int
     questions: List[QuestionForStudent]
 
+
+class ExamSessionResponse(ExamPaperResponse):
+    session_id: UUID4
+
 class UserAnswer(BaseModel):
     question_id: UUID4
     answer: str
 
 class ExamSubmission(BaseModel):
-    answers: List[UserAnswer]
\ No newline at end of file
+    answers: List[UserAnswer]
+
+
+class AnswerDraftSave(BaseModel):
+    answers: List[UserAnswer] = Field(..., min_length=1, max_length=500)
+
+
+class AnswerDraftResponse(BaseModel):
+    session_id: UUID4
+    answers: List[UserAnswer]
+
+
+class ExamHistoryItem(BaseModel):
+    session_id: UUID4
+    exam_id: UUID4
+    paper_id: Optional[UUID4] = None
+    paper_title: Optional[str] = None
+    diet: Optional[ExamDiet] = None
+    year: Optional[int] = None
+    status: str
+    score: Optional[float] = None
+    passed: Optional[bool] = None
+    start_time: datetime
+    end_time: Optional[datetime] = None
+
+
+class ExamHistoryPage(BaseModel):
+    items: List[ExamHistoryItem]
+    next_cursor: Optional[str] = None
+
+
+class PaperCreditItem(BaseModel):
+    credit_id: UUID4
+    paper_id: UUID4
+    paper_title: Optional[str] = None
+    level: Optional[ExamLevel] = None
+    passed_date: date
+
+
+class PaperCreditPage(BaseModel):
+    items: List[PaperCreditItem]
+    next_cursor: Optional[str] = None
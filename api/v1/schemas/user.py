@@ -1,6 +1,6 @@
 from email_validator import validate_email, EmailNotValidError
-import dns.resolver
 from datetime import datetime
+from uuid import UUID
 from typing import (Optional, Union,
                     List, Annotated, Dict,
                     Literal)
@@ -12,20 +12,14 @@ from pydantic import (BaseModel, EmailStr,
                       
 from pydantic import Field  # Added this import
 
+from api.utils.mx_resolver import mx_resolver
+
 def validate_mx_record(domain: str):
     """
     Validate mx records for email
     """
-    try:
-        # Try to resolve the MX record for the domain
-        mx_records = dns.resolver.resolve(domain, 'MX')
-        return True if mx_records else False
-    except dns.resolver.NoAnswer:
-        return False
-    except dns.resolver.NXDOMAIN:
-        return False
-    except Exception:
-        return False
+    # Cached and time-bounded; see api/utils/mx_resolver.py
+    return mx_resolver.has_mx(domain)
     
 
 class UserUpdate(BaseModel):
@@ -37,12 +31,12 @@ class UserData(BaseModel):
     """
     Schema for users to be returned to superadmin
     """
-    id: str
+    id: UUID
     email: EmailStr
-    first_name: str
-    last_name: str
-    avatar_url: str
-    phone_number: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    avatar_url: Optional[str] = None
+    phone_number: Optional[str] = None
     ican_number: str
     is_active: bool
     is_admin: bool
@@ -59,9 +53,14 @@ class AllUsersResponse(BaseModel):
     message: str
     status_code: int
     status: str
-    page: int
     per_page: int
-    total: int
+    # Planner estimate, only when asked for
+    estimated_total: Optional[int] = None
+    next_cursor: Optional[str] = None
+    # Deprecated, from the page-numbered listing; removed in the next release.
+    # Pages have no number now, and `total` repeats `estimated_total`.
+    page: Optional[int] = None
+    total: Optional[int] = None
     data: Union[List[UserData], List[None]]
 
 class UserBase(BaseModel):
@@ -152,7 +151,7 @@ class UserCreate(BaseModel):
             raise ValueError("Passwords do not match")
         
         try:
-            email = validate_email(email, check_deliverability=True)
+            email = validate_email(email, check_deliverability=False)
             if email.domain.count(".com") > 1:
                 raise EmailNotValidError("Email address contains multiple '.com' endings.")
             if not validate_mx_record(email.domain):
@@ -176,6 +175,17 @@ class TokenData(BaseModel):
     id: Optional[str]
 
 
+class UserIdentity(BaseModel):
+    """Lightweight snapshot of the fields needed for identity and role checks"""
+
+    id: UUID
+    is_admin: bool
+    is_active: bool
+    is_verified: bool
+
+    model_config = ConfigDict(frozen=True)
+
+
 class LoginRequest(BaseModel):
     email: EmailStr
     password: str
@@ -202,7 +212,7 @@ class LoginRequest(BaseModel):
             raise ValueError("password must include at least one special character")
         
         try:
-            email_info = validate_email(email, check_deliverability=True)
+            email_info = validate_email(email, check_deliverability=False)
             if email_info.domain.count(".com") > 1:
                 raise EmailNotValidError("Email address contains multiple '.com' endings.")
             if not validate_mx_record(email_info.domain):
@@ -0,0 +1,235 @@
+""" Per-answer autosave with write coalescing
+
+Autosaves land in an in-memory buffer keyed by (session, question), so a
+candidate changing an answer ten times between flushes costs one row write.
+A flusher thread swaps the buffer out every few seconds (or early, once it
+grows past a limit) and writes it with batched upserts in one transaction,
+which keeps the database write rate bounded by the flush interval instead of
+by click rate. Each entry carries the time the API received it and the upsert
+only replaces older rows, so buffers flushed by different workers can't
+reorder a candidate's answers.
+
+Answers still in the buffer are visible to restore and submit through this
+worker; a crash loses at most one flush interval of autosaves.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from api.core.config import settings
+from api.db.database import SessionLocal
+from api.utils.cache import TTLCache
+from api.utils.logger import logger
+from api.utils.metrics import Counter, TimingStats
+from api.utils.upsert import upsert
+from api.v1.models.exam import AnswerDraft, UserExamSession
+from api.v1.schemas.exam import ExamSubmission, UserAnswer
+from api.v1.services.grading import grading_service
+
+
+def upsert_drafts(db: Session, rows: List[dict]):
+    """Writes draft rows, keeping whichever answer was received last"""
+
+    upsert(
+        db, AnswerDraft, rows,
+        keys=[AnswerDraft.session_id, AnswerDraft.question_id],
+        fields=["answer", "saved_at"],
+        where=lambda excluded: AnswerDraft.saved_at <= excluded.saved_at,
+    )
+
+
+class AutosaveBuffer:
+    """Coalesces autosaved answers in memory and flushes them in batches"""
+
+    def __init__(self, flush_interval: float, batch_size: int, max_pending: int):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+
+        # {session_id: {question_id: (answer, saved_at)}}
+        self._pending: Dict[UUID, Dict[UUID, Tuple[str, datetime]]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Active sessions this worker has recently checked: {session_id: (user_id, exam_id)}
+        self._sessions = TTLCache(maxsize=max_pending, ttl=30)
+
+        self.saves = Counter()
+        self.coalesced = Counter()
+        self.rows_written = Counter()
+        self.flush_time = TimingStats()
+
+    def active_session(self, db: Session, session_id: UUID, user_id: UUID) -> UUID:
+        """Returns the exam id of a user's active session, raising 404 otherwise"""
+
+        owner = self._sessions.get(session_id)
+        if owner is None:
+            owner = db.query(UserExamSession.user_id, UserExamSession.exam_id).filter(
+                UserExamSession.id == session_id,
+                UserExamSession.end_time == None
+            ).first()
+            if owner is not None:
+                owner = tuple(owner)
+                self._sessions.set(session_id, owner)
+
+        if owner is None or owner[0] != user_id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Active exam session not found.")
+        return owner[1]
+
+    def save(self, db: Session, session_id: UUID, user_id: UUID, answers: List[UserAnswer]) -> int:
+        """Buffers answers for an active session. Returns how many were accepted"""
+
+        exam_id = self.active_session(db, session_id, user_id)
+        key = grading_service.get_answer_key(db, exam_id)
+        unknown = [str(a.question_id) for a in answers if a.question_id.int not in key.index]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Questions not in this exam: {', '.join(unknown)}"
+            )
+
+        saved_at = datetime.now(timezone.utc)
+        with self._lock:
+            drafts = self._pending.setdefault(session_id, {})
+            for answer in answers:
+                if answer.question_id in drafts:
+                    self.coalesced.incr()
+                else:
+                    self._size += 1
+                drafts[answer.question_id] = (answer.answer, saved_at)
+            size = self._size
+
+        self.saves.incr(len(answers))
+        if size >= self.max_pending:
+            self._wake.set()
+        return len(answers)
+
+    def drafts(self, db: Session, session_id: UUID) -> Dict[UUID, str]:
+        """Returns the latest saved answer per question, buffered or stored"""
+
+        answers = {
+            question_id: answer
+            for question_id, answer in db.query(AnswerDraft.question_id, AnswerDraft.answer)
+            .filter(AnswerDraft.session_id == session_id)
+        }
+        with self._lock:
+            buffered = dict(self._pending.get(session_id, {}))
+        for question_id, (answer, _) in buffered.items():
+            answers[question_id] = answer
+        return answers
+
+    def merge(self, db: Session, session_id: UUID, submission: ExamSubmission) -> ExamSubmission:
+        """Returns the submission completed with drafts of unanswered questions"""
+
+        answers = self.drafts(db, session_id)
+        for answer in submission.answers:
+            answers[answer.question_id] = answer.answer
+        return ExamSubmission(answers=[
+            UserAnswer(question_id=question_id, answer=answer)
+            for question_id, answer in answers.items()
+        ])
+
+    def close_session(self, session_id: UUID):
+        """Drops buffered drafts of a session that has been submitted"""
+
+        self._sessions.pop(session_id)
+        with self._lock:
+            self._size -= len(self._pending.pop(session_id, {}))
+
+    def flush(self) -> int:
+        """Writes everything buffered so far. Returns the number of rows written"""
+
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending, self._size = self._pending, {}, 0
+            if not pending:
+                return 0
+
+            started = time.perf_counter()
+            rows = [
+                {"session_id": session_id, "question_id": question_id, "answer": answer, "saved_at": saved_at}
+                for session_id, drafts in pending.items()
+                for question_id, (answer, saved_at) in drafts.items()
+            ]
+            # Every flush locks rows in primary key order, so two flushes
+            # (from different processes) can't deadlock on each other
+            rows.sort(key=lambda row: (row["session_id"], row["question_id"]))
+            db = SessionLocal()
+            try:
+                for start in range(0, len(rows), self.batch_size):
+                    upsert_drafts(db, rows[start:start + self.batch_size])
+                db.commit()
+            except Exception:
+                db.rollback()
+                self._requeue(pending)
+                raise
+            finally:
+                db.close()
+
+            self.rows_written.incr(len(rows))
+            self.flush_time.record(time.perf_counter() - started)
+            return len(rows)
+
+    def _requeue(self, pending: dict):
+        # Put a failed flush back without overwriting anything newer
+        with self._lock:
+            for session_id, drafts in pending.items():
+                current = self._pending.setdefault(session_id, {})
+                for question_id, draft in drafts.items():
+                    if question_id not in current:
+                        current[question_id] = draft
+                        self._size += 1
+
+    def _work(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Autosave flush failed")
+
+    def start(self):
+        """Starts the flusher thread"""
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._work, name="autosave-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the flusher thread and writes whatever is still buffered"""
+
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Final autosave flush failed")
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._size,
+            "saves": self.saves.value,
+            "coalesced": self.coalesced.value,
+            "rows_written": self.rows_written.value,
+            "flush_time": self.flush_time.snapshot(),
+        }
+
+
+autosave_buffer = AutosaveBuffer(
+    flush_interval=settings.AUTOSAVE_FLUSH_INTERVAL,
+    batch_size=settings.AUTOSAVE_BATCH_SIZE,
+    max_pending=settings.AUTOSAVE_MAX_PENDING,
+)
@@ -0,0 +1,108 @@
+""" In-process, read-through cache of the paper/exam catalog
+
+Papers, exams and questions only change through the admin routes, and every
+one of those writes calls `catalog_cache.bump(db)` inside its transaction.
+Readers compare the stored version with the version their cached snapshot was
+built from (one primary-key read) and rebuild only when it moved, so each
+worker sees admin changes on its next request without restarts or TTLs.
+"""
+import threading
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from api.v1.models.exam import CatalogVersion, ExamLevel, Exam, Paper
+
+EXAM_FIELDS = (
+    "id", "paper_id", "diet", "year", "duration_minutes",
+    "total_score", "pass_mark", "questions_per_candidate",
+    "shuffle_questions", "shuffle_options", "created_at", "updated_at",
+)
+
+
+class CatalogSnapshot:
+    """Immutable view of the catalog at one version"""
+
+    def __init__(self, version: int, papers: List[Paper], exams: List[Exam]):
+        self.version = version
+
+        self.papers: Dict = {}
+        self.papers_by_level: Dict[str, List[dict]] = {level.value: [] for level in ExamLevel}
+        for paper in papers:
+            level = ExamLevel(paper.level).value
+            data = {"id": paper.id, "title": paper.title, "level": level}
+            self.papers[paper.id] = data
+            self.papers_by_level[level].append(data)
+
+        self.exams: Dict = {}
+        self.exams_by_paper: Dict = {}
+        for exam in exams:
+            data = {field: getattr(exam, field) for field in EXAM_FIELDS}
+            self.exams[exam.id] = data
+            self.exams_by_paper.setdefault(exam.paper_id, []).append(data)
+
+        self.level_counts: Dict[str, int] = {
+            level: len(items) for level, items in self.papers_by_level.items()
+        }
+
+
+class CatalogCache:
+    """Holds the latest CatalogSnapshot for this worker"""
+
+    def __init__(self):
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.rebuilds = 0
+
+    def current_version(self, db: Session) -> int:
+        """Function to read the stored catalog version"""
+
+        version = db.execute(
+            select(CatalogVersion.version).where(CatalogVersion.id == 1)
+        ).scalar()
+        return version or 0
+
+    def get(self, db: Session) -> CatalogSnapshot:
+        """Returns a snapshot that is current as of this call"""
+
+        version = self.current_version(db)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            self.hits += 1
+            return snapshot
+
+        # Load without holding the lock: under AsyncSession.run_sync these
+        # queries yield to the event loop, and another coroutine blocking on
+        # a thread lock there would stall the loop for good. Concurrent
+        # rebuilds are harmless; the lock only guards the swap.
+        # Reading after the version means the data is at least that new.
+        snapshot = CatalogSnapshot(version, db.query(Paper).all(), db.query(Exam).all())
+        with self._lock:
+            current = self._snapshot
+            if current is None or current.version < snapshot.version:
+                self._snapshot = snapshot
+                self.rebuilds += 1
+        return snapshot
+
+    def bump(self, db: Session):
+        """Marks the catalog as changed; takes effect when the caller commits"""
+
+        result = db.execute(
+            update(CatalogVersion)
+            .where(CatalogVersion.id == 1)
+            .values(version=CatalogVersion.version + 1)
+        )
+        if result.rowcount == 0:
+            db.add(CatalogVersion(id=1, version=1))
+
+    def stats(self) -> dict:
+        return {
+            "version": self._snapshot.version if self._snapshot else None,
+            "hits": self.hits,
+            "rebuilds": self.rebuilds,
+        }
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,151 @@
+""" Live submission statistics per exam
+
+Grading adds every submission to running aggregates in exam_stats, in the
+submit's own transaction: the submission count, the pass count, the sum and
+sum of squares of scores and a ten-band score histogram. Mean, standard
+deviation, pass rate and distribution then cost one small read however many
+candidates sat the exam, instead of a COUNT/AVG scan of user_exam_sessions.
+
+Each exam's aggregates are spread over a few shard rows, and a submission
+increments a random one with a single INSERT ... ON CONFLICT, so candidates
+submitting together at the end of a diet rarely wait on each other's row
+lock. Regrading and theory marking change past scores, so they rebuild the
+exam's aggregates from its sessions. Provisional sessions (theory answers
+not marked yet) are left out until their marks are in.
+"""
+import random
+from datetime import datetime, timezone
+from uuid import UUID
+
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import Session
+
+from api.core.config import settings
+from api.utils.upsert import upsert
+from api.v1.models.exam import Exam, ExamStats, UserExamSession
+
+BUCKETS = 10
+BUCKET_COLUMNS = [f"bucket_{i}" for i in range(BUCKETS)]
+COUNTERS = ["submissions", "passed", "score_sum", "score_sq_sum", *BUCKET_COLUMNS]
+
+
+def bucket_of(score: float) -> int:
+    """Function to find the histogram band of a 0..100 score"""
+
+    return min(max(int(score), 0) // 10, BUCKETS - 1)
+
+
+def bucket_label(i: int) -> str:
+    return f"{i * 10}-{i * 10 + 9}" if i < BUCKETS - 1 else f"{i * 10}-100"
+
+
+class ExamStatsService:
+    """Maintains and reads the running aggregates of exams"""
+
+    def __init__(self, shards: int):
+        self.shards = max(shards, 1)
+
+    def record(self, db: Session, exam_id: UUID, score: int, passed: bool):
+        """Adds one graded submission with its stored score. Changes are left in the caller's transaction"""
+
+        row = {
+            "exam_id": exam_id,
+            "shard": random.randrange(self.shards),
+            "submissions": 1,
+            "passed": int(passed),
+            "score_sum": score,
+            "score_sq_sum": score * score,
+            **{column: 0 for column in BUCKET_COLUMNS},
+            "updated_at": datetime.now(timezone.utc),
+        }
+        row[BUCKET_COLUMNS[bucket_of(score)]] = 1
+        upsert(
+            db, ExamStats, [row],
+            keys=[ExamStats.exam_id, ExamStats.shard],
+            fields=["updated_at"],
+            increment=COUNTERS,
+        )
+
+    def rebuild(self, db: Session, exam_id: UUID):
+        """Recomputes an exam's aggregates from its finished sessions and commits"""
+
+        # Lock the exam row first. A submit that inserts a new shard row
+        # holds a key-share lock on it (the foreign key check) until it
+        # commits, so this waits for those and later ones wait for us; the
+        # delete then waits on submits incrementing existing shards. Every
+        # submit is either committed and counted below or lands afterwards.
+        db.query(Exam.id).filter(Exam.id == exam_id).with_for_update().one()
+        db.query(ExamStats).filter(ExamStats.exam_id == exam_id).delete(synchronize_session=False)
+
+        score = UserExamSession.score
+        bands = [
+            func.sum(case((and_(score >= i * 10, score < (i + 1) * 10), 1), else_=0))
+            for i in range(BUCKETS - 1)
+        ] + [func.sum(case((score >= (BUCKETS - 1) * 10, 1), else_=0))]
+        totals = (
+            db.query(
+                func.count(),
+                func.sum(case((score >= Exam.pass_mark, 1), else_=0)),
+                func.sum(score),
+                func.sum(score * score),
+                *bands,
+            )
+            .join(Exam, Exam.id == UserExamSession.exam_id)
+            .filter(
+                UserExamSession.exam_id == exam_id,
+                UserExamSession.end_time != None,
+                UserExamSession.provisional.is_(False),
+                score != None,
+            )
+            .one()
+        )
+        if totals[0]:
+            upsert(
+                db, ExamStats, [{
+                    "exam_id": exam_id,
+                    "shard": 0,
+                    "updated_at": datetime.now(timezone.utc),
+                    **{column: value or 0 for column, value in zip(COUNTERS, totals)},
+                }],
+                keys=[ExamStats.exam_id, ExamStats.shard],
+                fields=["updated_at"],
+                increment=COUNTERS,
+            )
+        db.commit()
+
+    def get(self, db: Session, exam_id: UUID) -> dict:
+        """Returns an exam's live statistics, summed over its shards"""
+
+        totals = (
+            db.query(
+                *[func.coalesce(func.sum(getattr(ExamStats, column)), 0) for column in COUNTERS],
+                func.max(ExamStats.updated_at),
+            )
+            .filter(ExamStats.exam_id == exam_id)
+            .one()
+        )
+        counts = dict(zip(COUNTERS, totals))
+        submissions = int(counts["submissions"])
+
+        mean = std = pass_rate = None
+        if submissions:
+            mean = counts["score_sum"] / submissions
+            std = max(counts["score_sq_sum"] / submissions - mean ** 2, 0) ** 0.5
+            pass_rate = counts["passed"] / submissions
+
+        return {
+            "exam_id": exam_id,
+            "submissions": submissions,
+            "passed": int(counts["passed"]),
+            "pass_rate": None if pass_rate is None else round(pass_rate, 4),
+            "mean_score": None if mean is None else round(mean, 4),
+            "score_std": None if std is None else round(std, 4),
+            "histogram": [
+                {"range": bucket_label(i), "count": int(counts[column])}
+                for i, column in enumerate(BUCKET_COLUMNS)
+            ],
+            "updated_at": totals[-1],
+        }
+
+
+exam_stats_service = ExamStatsService(shards=settings.EXAM_STATS_SHARDS)
@@ -0,0 +1,239 @@
+""" Compiled answer keys and submission grading
+
+Each exam's answer key is compiled once per catalog version into a map from
+question id to position plus a tuple of correct answers in that order.
+Grading a submission is then one dict lookup and one string comparison per
+answer, with no ORM loads and no per-question string conversion. Question
+writes bump the catalog version, which retires the compiled key.
+
+Theory questions have no exact answer: they score nothing at submission and
+are marked afterwards by the theory marking job, which then rescores the
+session. Until then a session with theory answers is provisional: its score
+counts the objective answers only, and pass/fail, the paper credit and the
+exam's statistics are decided once the marks are in.
+"""
+import math
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from api.utils.cache import TTLCache
+from api.v1.models.exam import Question, QuestionType, SessionAnswer, UserExamSession, UserPaperCredit
+from api.v1.schemas.exam import ExamSubmission, UserAnswer
+from api.v1.services.catalog import catalog_cache
+from api.v1.services.exam_stats import exam_stats_service
+from api.v1.services.progression import progression_service
+from api.v1.services.sampling import select_positions
+
+
+class AnswerKey:
+    """The compiled answer key of one exam"""
+
+    __slots__ = (
+        "exam_id", "version", "paper_id", "level", "pass_mark",
+        "question_ids", "index", "answers", "size", "theory", "questions_per_candidate",
+    )
+
+    def __init__(
+        self,
+        question_ids: Sequence[UUID],
+        correct_answers: Sequence[str],
+        exam_id: Optional[UUID] = None,
+        version: int = 0,
+        paper_id: Optional[UUID] = None,
+        level: Optional[str] = None,
+        pass_mark: int = 50,
+        question_types: Optional[Sequence[QuestionType]] = None,
+        questions_per_candidate: Optional[int] = None,
+    ):
+        self.exam_id = exam_id
+        self.version = version
+        self.paper_id = paper_id
+        self.level = level
+        self.pass_mark = pass_mark
+        self.questions_per_candidate = questions_per_candidate
+
+        self.question_ids = tuple(question_ids)
+        # UUID.int is stored on the object, so looking it up allocates nothing
+        self.index = {qid.int: i for i, qid in enumerate(self.question_ids)}
+        self.size = len(self.question_ids)
+
+        # Positions of theory questions; None never equals a submitted answer
+        self.theory = tuple(
+            i for i, kind in enumerate(question_types or ())
+            if kind == QuestionType.THEORY
+        )
+        answers = list(correct_answers)
+        for i in self.theory:
+            answers[i] = None
+        self.answers = tuple(answers)
+
+    def positions_for(self, seed: Optional[int]) -> Optional[frozenset]:
+        """Returns the positions drawn for a session's seed, or None if it sees them all"""
+
+        if seed is None or not self.questions_per_candidate:
+            return None
+        return frozenset(select_positions(seed, self.question_ids, self.questions_per_candidate))
+
+    def size_for(self, seed: Optional[int]) -> int:
+        """Returns how many questions a session with this seed was given"""
+
+        if seed is None or not self.questions_per_candidate:
+            return self.size
+        return min(self.questions_per_candidate, self.size)
+
+    def mark(
+        self, answers: Iterable[UserAnswer], positions: Optional[frozenset] = None
+    ) -> Dict[int, Tuple[str, Optional[bool]]]:
+        """Returns {position: (answer, correct)} for each answered question of the exam.
+
+        A question answered more than once keeps a correct answer if there is
+        one, otherwise the last. Theory answers are marked None. With
+        `positions`, answers to any other question are ignored.
+        """
+
+        marked = {}
+        index = self.index
+        key = self.answers
+        for answer in answers:
+            i = index.get(answer.question_id.int)
+            if i is None or (positions is not None and i not in positions):
+                continue
+            if key[i] is None:
+                marked[i] = (answer.answer, None)
+                continue
+            correct = answer.answer == key[i]
+            if correct or not (i in marked and marked[i][1]):
+                marked[i] = (answer.answer, correct)
+        return marked
+
+    def percentage(self, marks: float, size: Optional[int] = None) -> float:
+        """Returns the percentage score of a number of marks out of `size` questions"""
+
+        size = self.size if size is None else size
+        if not size:
+            return 0
+        return (marks / size) * 100
+
+    def stored_score(self, marks: float, size: Optional[int] = None) -> int:
+        """Returns the percentage as the integer score column keeps it.
+
+        Rounds half away from zero like Postgres (and regrade.score_chunk), so
+        the pass mark is always applied to the score that is stored.
+        """
+
+        return math.floor(self.percentage(marks, size) + 0.5)
+
+    def grade(
+        self, answers: Iterable[UserAnswer], seed: Optional[int] = None
+    ) -> Tuple[Dict[int, Tuple[str, Optional[bool]]], int]:
+        """Returns the marked answers (see `mark`) and the stored score of a session's submission"""
+
+        marked = self.mark(answers, self.positions_for(seed))
+        correct = sum(1 for _, is_correct in marked.values() if is_correct)
+        return marked, self.stored_score(correct, self.size_for(seed))
+
+
+class GradingService:
+    """Grades submissions against cached answer keys and finalizes sessions"""
+
+    def __init__(self, maxsize: int = 512):
+        self._keys = TTLCache(maxsize=maxsize)
+
+    def compile_answer_key(self, db: Session, exam_id: UUID) -> AnswerKey:
+        """Function to build an exam's answer key from the database"""
+
+        catalog = catalog_cache.get(db)
+        exam = catalog.exams.get(exam_id)
+        if exam is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Exam not found")
+
+        rows = (
+            db.query(Question.id, Question.correct_answer, Question.question_type)
+            .filter(Question.exam_id == exam_id)
+            .order_by(Question.created_at, Question.id)
+            .all()
+        )
+        return AnswerKey(
+            question_ids=[row.id for row in rows],
+            correct_answers=[row.correct_answer for row in rows],
+            question_types=[row.question_type for row in rows],
+            exam_id=exam_id,
+            version=catalog.version,
+            paper_id=exam["paper_id"],
+            level=catalog.papers[exam["paper_id"]]["level"],
+            pass_mark=exam["pass_mark"],
+            questions_per_candidate=exam["questions_per_candidate"],
+        )
+
+    def get_answer_key(self, db: Session, exam_id: UUID) -> AnswerKey:
+        """Returns the cached answer key for an exam, recompiling it if stale"""
+
+        version = catalog_cache.current_version(db)
+        key = self._keys.get(exam_id)
+        if key is None or key.version != version:
+            key = self.compile_answer_key(db, exam_id)
+            self._keys.set(exam_id, key)
+        return key
+
+    def finalize(
+        self, db: Session, session: UserExamSession, submission: ExamSubmission
+    ) -> Tuple[int, Optional[bool]]:
+        """Grades a submission, closes the session and grants a credit on a pass.
+
+        Each answer is stored as a session_answers row and the exam's live
+        statistics are updated. Changes are left in the caller's transaction.
+        Returns (score, passed); passed is None while the session is
+        provisional, i.e. has theory answers still to be marked.
+        """
+
+        key = self.get_answer_key(db, session.exam_id)
+        marked, final_score = key.grade(submission.answers, session.seed)
+
+        session.score = final_score
+        session.end_time = datetime.now(timezone.utc)
+        if marked:
+            db.execute(insert(SessionAnswer), [
+                {
+                    "session_id": session.id,
+                    "question_id": key.question_ids[i],
+                    "answer": answer,
+                    "correct": correct,
+                }
+                for i, (answer, correct) in marked.items()
+            ])
+
+        session.provisional = any(correct is None for _, correct in marked.values())
+        if session.provisional:
+            return final_score, None
+
+        passed = final_score >= key.pass_mark
+        exam_stats_service.record(db, session.exam_id, final_score, passed)
+
+        if passed:
+            # Check if a credit already exists to avoid duplicates
+            existing_credit = db.query(UserPaperCredit.id).filter(
+                UserPaperCredit.user_id == session.user_id,
+                UserPaperCredit.paper_id == key.paper_id
+            ).first()
+
+            if not existing_credit:
+                db.add(UserPaperCredit(
+                    user_id=session.user_id,
+                    paper_id=key.paper_id,
+                    passed=True,
+                    passed_date=date.today()
+                ))
+                progression_service.record_credit(db, session.user_id, key.paper_id, key.level)
+
+        return final_score, passed
+
+    def stats(self) -> dict:
+        return self._keys.stats()
+
+
+grading_service = GradingService()
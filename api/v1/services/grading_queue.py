@@ -0,0 +1,183 @@
+""" Deferred grading of submissions through a database-backed queue
+
+In deferred mode the submit route only stores the raw ExamSubmission as a
+PendingSubmission row and answers 202. Worker threads in each app process
+claim queued rows in batches (FOR UPDATE SKIP LOCKED on Postgres, so workers
+in different processes never grade the same row), grade and finalize them
+through grading_service, and commit each batch in one transaction. The rate
+of grading writes is bounded by workers x batch size instead of following
+the end-of-exam spike. No external broker is involved.
+
+A failed attempt is queued again with exponential backoff; after
+`max_attempts` the row stays failed and the session expiry scheduler
+auto-submits the session once its time is up.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from api.core.config import settings
+from api.db.database import SessionLocal
+from api.utils.logger import logger
+from api.utils.metrics import Counter, TimingStats
+from api.v1.models.exam import PendingSubmission, UserExamSession
+from api.v1.schemas.exam import ExamSubmission
+from api.v1.services.grading import grading_service
+
+
+class GradingQueue:
+    """Worker threads that drain the pending_submissions table"""
+
+    def __init__(
+        self, workers: int, batch_size: int, poll_interval: float, max_attempts: int, retry_backoff: float
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+
+        self.processed = Counter()
+        self.retried = Counter()
+        self.failed = Counter()
+        self.queue_wait = TimingStats()
+        self.batch_time = TimingStats()
+
+    def enqueue(self, db: Session, session: UserExamSession, submission: ExamSubmission) -> PendingSubmission:
+        """Records a submission for deferred grading; the caller commits"""
+
+        pending = PendingSubmission(
+            session_id=session.id,
+            user_id=session.user_id,
+            payload=submission.model_dump(mode="json"),
+        )
+        db.add(pending)
+        return pending
+
+    def _claim(self, db: Session, now: datetime) -> List[PendingSubmission]:
+        return (
+            db.query(PendingSubmission)
+            .filter(
+                PendingSubmission.status == "queued",
+                or_(PendingSubmission.next_attempt_at == None, PendingSubmission.next_attempt_at <= now),
+            )
+            .order_by(PendingSubmission.created_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    def process_batch(self, db: Session) -> int:
+        """Grades one batch of queued submissions. Returns how many were claimed"""
+
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        batch = self._claim(db, now)
+        if not batch:
+            db.rollback()
+            return 0
+
+        # Locked so a concurrent submit or auto-submit can't finalize them too
+        sessions = {
+            s.id: s
+            for s in db.query(UserExamSession).filter(
+                UserExamSession.id.in_([p.session_id for p in batch])
+            ).order_by(UserExamSession.id).with_for_update()
+        }
+
+        for pending in batch:
+            pending.attempts += 1
+            pending.processed_at = now
+            if pending.created_at is not None:
+                created_at = pending.created_at
+                if created_at.tzinfo is None:
+                    created_at = created_at.replace(tzinfo=timezone.utc)
+                self.queue_wait.record(max((now - created_at).total_seconds(), 0.0))
+
+            session = sessions.get(pending.session_id)
+            if session is None or session.end_time is not None:
+                # Finalized some other way (e.g. a later synchronous submit)
+                pending.status = "done"
+                continue
+
+            try:
+                with db.begin_nested():
+                    grading_service.finalize(
+                        db, session, ExamSubmission.model_validate(pending.payload)
+                    )
+                pending.status = "done"
+                self.processed.incr()
+            except Exception as exc:
+                logger.exception(
+                    f"Grading of session {pending.session_id} failed (attempt {pending.attempts})"
+                )
+                pending.error = str(exc)
+                if pending.attempts < self.max_attempts:
+                    delay = self.retry_backoff * 2 ** (pending.attempts - 1)
+                    pending.next_attempt_at = now + timedelta(seconds=delay)
+                    self.retried.incr()
+                else:
+                    pending.status = "failed"
+                    self.failed.incr()
+
+        db.commit()
+        self.batch_time.record(time.perf_counter() - started)
+        return len(batch)
+
+    def _work(self):
+        while not self._stop.is_set():
+            claimed = 0
+            db = SessionLocal()
+            try:
+                claimed = self.process_batch(db)
+            except Exception:
+                logger.exception("Grading queue batch failed")
+                db.rollback()
+            finally:
+                db.close()
+            if claimed < self.batch_size:
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        """Starts the worker threads"""
+
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"grading-queue-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Asks the worker threads to finish their current batch and exit"""
+
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=30)
+        self._threads = []
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "batch_size": self.batch_size,
+            "processed": self.processed.value,
+            "retried": self.retried.value,
+            "failed": self.failed.value,
+            "queue_wait": self.queue_wait.snapshot(),
+            "batch_time": self.batch_time.snapshot(),
+        }
+
+
+grading_queue = GradingQueue(
+    workers=settings.GRADING_QUEUE_WORKERS,
+    batch_size=settings.GRADING_QUEUE_BATCH_SIZE,
+    poll_interval=settings.GRADING_QUEUE_POLL_INTERVAL,
+    max_attempts=settings.GRADING_QUEUE_MAX_ATTEMPTS,
+    retry_backoff=settings.GRADING_QUEUE_RETRY_BACKOFF,
+)
@@ -0,0 +1,97 @@
+""" A candidate's own exam attempts and paper credits
+
+Both listings page newest first with keyset cursors (api/utils/pagination)
+and read only columns held in the covering (user_id, created_at, id) indexes
+of their tables, so each page is one index range scan however many attempts
+a candidate has. Exam and paper details come from the catalog snapshot
+rather than a join.
+"""
+from typing import Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.orm import Query, Session
+
+from api.utils.pagination import keyset_page
+from api.v1.models.exam import UserExamSession, UserPaperCredit
+from api.v1.services.catalog import catalog_cache
+
+
+class HistoryService:
+    """Lists a candidate's sessions and credits"""
+
+    def sessions_query(self, db: Session, user_id: UUID) -> Query:
+        """Returns the query the sessions listing pages through"""
+
+        return db.query(
+            UserExamSession.id,
+            UserExamSession.created_at,
+            UserExamSession.exam_id,
+            UserExamSession.score,
+            UserExamSession.start_time,
+            UserExamSession.end_time,
+            UserExamSession.provisional,
+        ).filter(UserExamSession.user_id == user_id)
+
+    def sessions(self, db: Session, user_id: UUID, cursor: Optional[str], limit: int) -> Tuple[list, Optional[str]]:
+        """Returns one page of the user's exam sessions and the next cursor"""
+
+        rows, next_cursor = keyset_page(
+            self.sessions_query(db, user_id), UserExamSession.created_at, UserExamSession.id, cursor, limit
+        )
+
+        catalog = catalog_cache.get(db)
+        items = []
+        for row in rows:
+            exam = catalog.exams.get(row.exam_id) or {}
+            paper = catalog.papers.get(exam.get("paper_id")) or {}
+            finished = row.end_time is not None
+            decided = finished and not row.provisional
+            items.append({
+                "session_id": row.id,
+                "exam_id": row.exam_id,
+                "paper_id": exam.get("paper_id"),
+                "paper_title": paper.get("title"),
+                "diet": exam.get("diet"),
+                "year": exam.get("year"),
+                "status": ("provisional" if row.provisional else "completed") if finished else "in_progress",
+                "score": row.score,
+                "passed": (
+                    row.score is not None and row.score >= exam.get("pass_mark", 50)
+                ) if decided else None,
+                "start_time": row.start_time,
+                "end_time": row.end_time,
+            })
+        return items, next_cursor
+
+    def credits_query(self, db: Session, user_id: UUID) -> Query:
+        """Returns the query the credits listing pages through"""
+
+        return db.query(
+            UserPaperCredit.id,
+            UserPaperCredit.created_at,
+            UserPaperCredit.paper_id,
+            UserPaperCredit.passed_date,
+        ).filter(UserPaperCredit.user_id == user_id)
+
+    def credits(self, db: Session, user_id: UUID, cursor: Optional[str], limit: int) -> Tuple[list, Optional[str]]:
+        """Returns one page of the user's paper credits and the next cursor"""
+
+        rows, next_cursor = keyset_page(
+            self.credits_query(db, user_id), UserPaperCredit.created_at, UserPaperCredit.id, cursor, limit
+        )
+
+        papers = catalog_cache.get(db).papers
+        items = []
+        for row in rows:
+            paper = papers.get(row.paper_id) or {}
+            items.append({
+                "credit_id": row.id,
+                "paper_id": row.paper_id,
+                "paper_title": paper.get("title"),
+                "level": paper.get("level"),
+                "passed_date": row.passed_date,
+            })
+        return items, next_cursor
+
+
+history_service = HistoryService()
@@ -0,0 +1,305 @@
+""" Psychometric item analysis of exam results
+
+Finished sessions are streamed in chunks; each chunk becomes NumPy matrices
+of (candidates x items): which items the candidate was given, their mark on
+each (0/1, or the automatic mark for theory items), and the option they
+chose. Only running sums are kept between chunks, so a diet of any size is
+analysed in memory proportional to chunk size x items:
+
+- difficulty (p-value): mean mark of the candidates given the item
+- discrimination (point-biserial): Pearson correlation of the item mark with
+  the candidate's score, from the sums of x, x^2, y, y^2 and xy
+- distractors: how often each option was chosen, plus other and omitted
+- the score distribution: a 0..100 histogram, mean and standard deviation
+
+Results replace the exam's previous analysis in exam_analyses and
+exam_item_statistics.
+"""
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from api.db.database import SessionLocal
+from api.utils.logger import logger
+from api.utils.upsert import upsert
+from api.v1.models.exam import (
+    ExamAnalysis, ExamItemStatistic, Question, SessionAnswer, TheoryMark, UserExamSession
+)
+from api.v1.services.grading import AnswerKey, grading_service
+from api.v1.services.regrade import RegradeJob, regrade_service
+
+OTHER = -2
+OMITTED = -1
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    out = np.full(numerator.shape, np.nan)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+
+def _clean(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+class ItemStatistics:
+    """Running sums for the items of one exam"""
+
+    def __init__(self, key: AnswerKey, options: Sequence[Optional[List[str]]]):
+        self.key = key
+        self.options = [list(o) if o else [] for o in options]
+        self.option_index = [{option: j for j, option in enumerate(o)} for o in self.options]
+
+        size = key.size
+        self.presented = np.zeros(size)
+        self.answered = np.zeros(size)
+        self.sum_x = np.zeros(size)
+        self.sum_xx = np.zeros(size)
+        self.sum_y = np.zeros(size)
+        self.sum_yy = np.zeros(size)
+        self.sum_xy = np.zeros(size)
+        # One column per option, then "other" and "omitted"
+        width = max((len(o) for o in self.options), default=0)
+        self.choices = np.zeros((size, width + 2), dtype=np.int64)
+
+        self.candidates = 0
+        self.score_sum = 0.0
+        self.score_squares = 0.0
+        self.histogram = np.zeros(101, dtype=np.int64)
+
+    def add(self, scores: np.ndarray, presented: np.ndarray, marks: np.ndarray, codes: np.ndarray):
+        """Adds one chunk.
+
+        scores: (c,) session scores; presented: (c, k) bool; marks: (c, k)
+        item marks; codes: (c, k) chosen option index, OTHER or OMITTED.
+        """
+
+        given = presented.astype(np.float64)
+        x = marks * given
+        y = scores
+
+        self.presented += given.sum(axis=0)
+        self.answered += ((codes != OMITTED) & presented).sum(axis=0)
+        self.sum_x += x.sum(axis=0)
+        self.sum_xx += (x * x).sum(axis=0)
+        self.sum_y += y @ given
+        self.sum_yy += (y * y) @ given
+        self.sum_xy += y @ x
+
+        width = self.choices.shape[1]
+        # OTHER and OMITTED land in the last two columns
+        columns = np.where(codes >= 0, codes, width + codes)
+        rows, items = np.nonzero(presented)
+        np.add.at(self.choices, (items, columns[rows, items]), 1)
+
+        self.candidates += len(scores)
+        self.score_sum += float(scores.sum())
+        self.score_squares += float((scores * scores).sum())
+        self.histogram += np.bincount(np.clip(np.rint(scores), 0, 100).astype(np.int64), minlength=101)
+
+    def items(self) -> List[dict]:
+        n = self.presented
+        p_value = _ratio(self.sum_x, n)
+        covariance = n * self.sum_xy - self.sum_x * self.sum_y
+        spread = (n * self.sum_xx - self.sum_x ** 2) * (n * self.sum_yy - self.sum_y ** 2)
+        point_biserial = _ratio(covariance, np.sqrt(np.clip(spread, 0, None)))
+
+        items = []
+        width = self.choices.shape[1]
+        for i, question_id in enumerate(self.key.question_ids):
+            distractors = None
+            if self.options[i]:
+                distractors = {
+                    option: int(self.choices[i, j]) for j, option in enumerate(self.options[i])
+                }
+                distractors["_other"] = int(self.choices[i, width - 2])
+                distractors["_omitted"] = int(self.choices[i, width - 1])
+            items.append({
+                "question_id": question_id,
+                "presented": int(n[i]),
+                "answered": int(self.answered[i]),
+                "p_value": _clean(p_value[i]),
+                "point_biserial": _clean(point_biserial[i]),
+                "distractors": distractors,
+            })
+        return items
+
+    def summary(self) -> dict:
+        mean = std = None
+        if self.candidates:
+            mean = self.score_sum / self.candidates
+            std = max(self.score_squares / self.candidates - mean ** 2, 0) ** 0.5
+        return {
+            "candidates": self.candidates,
+            "mean_score": None if mean is None else round(mean, 4),
+            "score_std": None if std is None else round(std, 4),
+            "histogram": self.histogram.tolist(),
+        }
+
+
+class ItemAnalysisService:
+    """Runs item analysis jobs and serves their stored results"""
+
+    def __init__(self, chunk_size: int = 5000):
+        self.chunk_size = chunk_size
+
+    def create_job(self, exam_id: UUID) -> RegradeJob:
+        return regrade_service.create_job(exam_id, kind="item_analysis")
+
+    def run(self, db: Session, job: RegradeJob, chunk_size: Optional[int] = None):
+        """Analyses every finished session of the job's exam"""
+
+        chunk_size = chunk_size or self.chunk_size
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            self._run(db, job, chunk_size)
+            job.status = "completed"
+        except Exception as exc:
+            logger.exception(f"Item analysis of exam {job.exam_id} failed")
+            job.status = "failed"
+            job.error = str(exc)
+            raise
+        finally:
+            job.finished_at = time.time()
+
+    def run_in_background(self, job: RegradeJob):
+        """Runs a job on its own database session (for BackgroundTasks)"""
+
+        db = SessionLocal()
+        try:
+            self.run(db, job)
+        except Exception:
+            pass  # recorded on the job and logged
+        finally:
+            db.close()
+
+    def _chunk(self, reader: Session, key: AnswerKey, stats: ItemStatistics, partition):
+        ids = [row.id for row in partition]
+        row_of = {sid: r for r, sid in enumerate(ids)}
+        shape = (len(ids), key.size)
+
+        presented = np.ones(shape, dtype=bool)
+        for r, row in enumerate(partition):
+            positions = key.positions_for(row.seed)
+            if positions is not None:
+                presented[r] = False
+                presented[r, list(positions)] = True
+
+        marks = np.zeros(shape)
+        codes = np.full(shape, OMITTED, dtype=np.int16)
+        index = key.index
+        for session_id, question_id, answer, correct in reader.execute(
+            select(SessionAnswer.session_id, SessionAnswer.question_id, SessionAnswer.answer, SessionAnswer.correct)
+            .where(SessionAnswer.session_id.in_(ids))
+        ):
+            i = index.get(question_id.int)
+            if i is None:
+                continue
+            r = row_of[session_id]
+            if correct:
+                marks[r, i] = 1
+            codes[r, i] = stats.option_index[i].get(answer, OTHER)
+
+        if key.theory:
+            for session_id, question_id, score in reader.execute(
+                select(TheoryMark.session_id, TheoryMark.question_id, TheoryMark.score)
+                .where(TheoryMark.session_id.in_(ids))
+            ):
+                i = index.get(question_id.int)
+                if i is not None:
+                    marks[row_of[session_id], i] = score
+
+        scores = np.array([row.score or 0 for row in partition], dtype=np.float64)
+        stats.add(scores, presented, marks, codes)
+
+    def _run(self, db: Session, job: RegradeJob, chunk_size: int):
+        key = grading_service.compile_answer_key(db, job.exam_id)
+        options = dict(
+            db.query(Question.id, Question.options).filter(Question.exam_id == job.exam_id).all()
+        )
+        stats = ItemStatistics(key, [options.get(qid) for qid in key.question_ids])
+
+        finished = and_(UserExamSession.exam_id == job.exam_id, UserExamSession.end_time != None)
+        # Known before streaming, so progress can be polled against it
+        job.total = db.query(func.count(UserExamSession.id)).filter(finished).scalar()
+
+        # Side queries go through their own session so the stream stays open
+        reader = Session(bind=db.get_bind())
+        try:
+            rows = db.execute(
+                select(UserExamSession.id, UserExamSession.score, UserExamSession.seed)
+                .where(finished)
+                .execution_options(stream_results=True, yield_per=chunk_size)
+            )
+            for partition in rows.partitions():
+                self._chunk(reader, key, stats, partition)
+                job.processed += len(partition)
+        finally:
+            reader.close()
+
+        self.save(db, job.exam_id, stats)
+
+    def save(self, db: Session, exam_id: UUID, stats: ItemStatistics):
+        """Replaces the stored analysis of an exam"""
+
+        computed_at = datetime.now(timezone.utc)
+        upsert(
+            db, ExamAnalysis,
+            [{"exam_id": exam_id, **stats.summary(), "computed_at": computed_at}],
+            keys=[ExamAnalysis.exam_id],
+            fields=["candidates", "mean_score", "score_std", "histogram", "computed_at"],
+        )
+        db.query(ExamItemStatistic).filter(ExamItemStatistic.exam_id == exam_id).delete(
+            synchronize_session=False
+        )
+        items = stats.items()
+        if items:
+            db.execute(
+                ExamItemStatistic.__table__.insert(),
+                [{"exam_id": exam_id, **item} for item in items],
+            )
+        db.commit()
+
+    def get(self, db: Session, exam_id: UUID) -> Optional[dict]:
+        """Returns the stored analysis of an exam, items in paper order"""
+
+        analysis = db.get(ExamAnalysis, exam_id)
+        if analysis is None:
+            return None
+        items = (
+            db.query(ExamItemStatistic, Question.question_text, Question.question_type)
+            .join(Question, Question.id == ExamItemStatistic.question_id)
+            .filter(ExamItemStatistic.exam_id == exam_id)
+            .order_by(Question.created_at, Question.id)
+            .all()
+        )
+        return {
+            "exam_id": exam_id,
+            "candidates": analysis.candidates,
+            "mean_score": analysis.mean_score,
+            "score_std": analysis.score_std,
+            "histogram": analysis.histogram,
+            "computed_at": analysis.computed_at,
+            "items": [
+                {
+                    "question_id": item.question_id,
+                    "question_text": question_text,
+                    "question_type": question_type,
+                    "presented": item.presented,
+                    "answered": item.answered,
+                    "p_value": item.p_value,
+                    "point_biserial": item.point_biserial,
+                    "distractors": item.distractors,
+                }
+                for item, question_text, question_type in items
+            ],
+        }
+
+
+item_analysis_service = ItemAnalysisService()
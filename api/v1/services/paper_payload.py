@@ -0,0 +1,140 @@
+""" Pre-encoded, answer-stripped exam papers
+
+The paper is validated through QuestionForStudent and JSON-encoded once per
+catalog version, one fragment per question, along with a gzipped copy of the
+full paper and a content-hash ETag. Starting a session then only splices the
+new session id into the cached bytes; for exams with per-candidate sampling
+or shuffling the candidate's paper is assembled from the cached fragments.
+Admin question writes bump the catalog version, which retires the cached
+payload.
+"""
+import gzip
+import hashlib
+import json
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from api.utils.cache import TTLCache
+from api.v1.models.exam import Exam
+from api.v1.schemas.exam import QuestionForStudent
+from api.v1.services.catalog import catalog_cache
+from api.v1.services.sampling import is_personalized, select_positions, shuffled_options
+
+
+def _encode(obj) -> bytes:
+    # Same compact encoding as fastapi.responses.JSONResponse
+    return json.dumps(
+        jsonable_encoder(obj), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class PaperPayload:
+    """The encoded paper of one exam at one catalog version"""
+
+    def __init__(self, exam: Exam, version: int):
+        self.version = version
+        self.exam_id = exam.id
+        self.duration_minutes = exam.duration_minutes
+        self.questions_per_candidate = exam.questions_per_candidate
+        self.shuffle_questions = bool(exam.shuffle_questions)
+        self.shuffle_options = bool(exam.shuffle_options)
+        self.personalized = is_personalized(
+            self.questions_per_candidate, self.shuffle_questions, self.shuffle_options
+        )
+
+        self.question_ids = [question.id for question in exam.questions]
+        self.questions = [
+            QuestionForStudent.model_validate(question).model_dump(mode="json")
+            for question in exam.questions
+        ]
+
+        # Each question is encoded once. Options come last in
+        # QuestionForStudent, so `_heads` end right before them and a
+        # candidate's shuffled options can be appended.
+        self._fragments = [_encode(question) for question in self.questions]
+        self._heads = [
+            _encode({k: v for k, v in question.items() if k != "options"})[:-1] + b',"options":'
+            for question in self.questions
+        ]
+        self._header = _encode({
+            "exam_title": exam.paper.title,
+            "duration_minutes": exam.duration_minutes,
+        })[:-1] + b',"questions":['
+
+        self.body = self._header + b",".join(self._fragments) + b"]}"
+        self.gzipped = gzip.compress(self.body, mtime=0)
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+
+    def positions(self, seed: int) -> List[int]:
+        """Returns the positions of a candidate's questions, in presentation order"""
+
+        return select_positions(
+            seed, self.question_ids, self.questions_per_candidate, self.shuffle_questions
+        )
+
+    def paper_body(self, seed: Optional[int] = None) -> bytes:
+        """Returns the paper as a candidate with this seed sees it"""
+
+        if seed is None or not self.personalized:
+            return self.body
+
+        parts = []
+        for i in self.positions(seed):
+            options = self.questions[i]["options"]
+            if self.shuffle_options and options:
+                shuffled = shuffled_options(seed, self.question_ids[i], options)
+                parts.append(self._heads[i] + _encode(shuffled) + b"}")
+            else:
+                parts.append(self._fragments[i])
+        return self._header + b",".join(parts) + b"]}"
+
+    def etag_for(self, seed: Optional[int] = None) -> str:
+        """Returns the ETag of a candidate's paper"""
+
+        if seed is None or not self.personalized:
+            return self.etag
+        return '"' + hashlib.sha256(f"{self.etag}:{seed}".encode()).hexdigest()[:32] + '"'
+
+    def session_body(self, session_id: UUID, seed: Optional[int] = None) -> bytes:
+        """Returns the start-session response body for a session id"""
+
+        # The start response is {"session_id":"<id>", <paper fields>}
+        return b'{"session_id":"' + str(session_id).encode() + b'",' + self.paper_body(seed)[1:]
+
+
+class PaperPayloadCache:
+    """Per-exam PaperPayload objects, rebuilt when the catalog version moves"""
+
+    def __init__(self, maxsize: int = 256):
+        self._cache = TTLCache(maxsize=maxsize)
+
+    def get(self, db: Session, exam_id: UUID) -> PaperPayload:
+        """Returns the current payload for an exam, raising 404 if it doesn't exist"""
+
+        version = catalog_cache.current_version(db)
+        payload = self._cache.get(exam_id)
+        if payload is not None and payload.version == version:
+            return payload
+
+        exam = (
+            db.query(Exam)
+            .options(joinedload(Exam.paper), selectinload(Exam.questions))
+            .filter(Exam.id == exam_id)
+            .first()
+        )
+        if not exam:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Exam not found")
+
+        payload = PaperPayload(exam, version)
+        self._cache.set(exam_id, payload)
+        return payload
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+paper_payload_cache = PaperPayloadCache()
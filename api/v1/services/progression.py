@@ -0,0 +1,181 @@
+from uuid import UUID
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from api.utils.upsert import upsert
+from api.v1.models.exam import (
+    ExamLevel, Paper, UserPaperCredit, UserProgression
+)
+from api.v1.services.catalog import catalog_cache
+
+
+class ProgressionService:
+    """Maintains and reads the materialized UserProgression record"""
+
+    def level_counts(self, db: Session) -> Dict[str, int]:
+        """Function to count papers per level"""
+
+        return catalog_cache.get(db).level_counts
+
+    def compute_level(self, passed_papers: Dict[str, List[str]], level_counts: Dict[str, int]) -> ExamLevel:
+        """Function to work out a user's current level from the papers they passed"""
+
+        passed_foundation = len(passed_papers.get(ExamLevel.FOUNDATION.value, []))
+        if passed_foundation < level_counts.get(ExamLevel.FOUNDATION.value, 0):
+            return ExamLevel.FOUNDATION
+
+        passed_skills = len(passed_papers.get(ExamLevel.SKILLS.value, []))
+        if passed_skills < level_counts.get(ExamLevel.SKILLS.value, 0):
+            return ExamLevel.SKILLS
+
+        return ExamLevel.PROFESSSIONAL
+
+    def _passed_papers_from_credits(self, db: Session, user_id: UUID) -> Dict[str, List[str]]:
+        rows = (
+            db.query(UserPaperCredit.paper_id, Paper.level)
+            .join(Paper, Paper.id == UserPaperCredit.paper_id)
+            .filter(UserPaperCredit.user_id == user_id)
+            .all()
+        )
+        passed_papers: Dict[str, List[str]] = {}
+        for paper_id, level in rows:
+            ids = passed_papers.setdefault(ExamLevel(level).value, [])
+            if str(paper_id) not in ids:
+                ids.append(str(paper_id))
+        return passed_papers
+
+    def fetch(self, db: Session, user_id: UUID, for_update: bool = False) -> Optional[UserProgression]:
+        """Fetches a user's progression record by user id"""
+
+        query = db.query(UserProgression).filter(UserProgression.user_id == user_id)
+        if for_update:
+            query = query.with_for_update()
+        return query.first()
+
+    def get_or_build(self, db: Session, user_id: UUID, for_update: bool = False) -> UserProgression:
+        """Fetches a user's progression record, building it from their credits if missing.
+
+        A newly built record is inserted in the caller's transaction; the
+        caller commits it. If a concurrent request inserts it first, that
+        record is returned instead.
+        """
+
+        progression = self.fetch(db, user_id, for_update=for_update)
+        if progression:
+            return progression
+
+        passed_papers = self._passed_papers_from_credits(db, user_id)
+        upsert(
+            db, UserProgression, [{
+                "user_id": user_id,
+                "passed_papers": passed_papers,
+                "current_level": self.compute_level(passed_papers, self.level_counts(db)),
+            }],
+            keys=[UserProgression.user_id],
+            fields=[],
+        )
+        return self.fetch(db, user_id, for_update=for_update)
+
+    def record_credit(self, db: Session, user_id: UUID, paper_id: UUID, level: ExamLevel):
+        """Adds a newly granted credit to the user's progression.
+
+        The row is locked so concurrent submissions by the same user can't
+        lose each other's update; it commits with the caller's transaction.
+        """
+
+        progression = self.get_or_build(db, user_id, for_update=True)
+
+        level = ExamLevel(level).value
+        passed_papers = {key: list(ids) for key, ids in (progression.passed_papers or {}).items()}
+        ids = passed_papers.setdefault(level, [])
+        if str(paper_id) not in ids:
+            ids.append(str(paper_id))
+
+        # JSONB is not mutation-tracked, so assign a new value
+        progression.passed_papers = passed_papers
+        progression.current_level = self.compute_level(passed_papers, self.level_counts(db))
+
+    def available_exams(self, db: Session, user_id: UUID) -> List[dict]:
+        """Function to list the exams a user is eligible to take at their level"""
+
+        catalog = catalog_cache.get(db)
+
+        progression = self.fetch(db, user_id)
+        if progression is None:
+            progression = self.get_or_build(db, user_id)
+            db.commit()
+
+        passed_papers = progression.passed_papers or {}
+        current_level = self.compute_level(passed_papers, catalog.level_counts)
+        passed_ids = set(passed_papers.get(current_level.value, []))
+
+        return [
+            exam
+            for paper in catalog.papers_by_level[current_level.value]
+            if str(paper["id"]) not in passed_ids
+            for exam in catalog.exams_by_paper.get(paper["id"], [])
+        ]
+
+    def rebuild(self, db: Session, user_ids: List[UUID], level_counts: Optional[Dict[str, int]] = None):
+        """Recomputes the progression records of the given users from their credits.
+
+        Changes are left in the caller's transaction.
+        """
+
+        if level_counts is None:
+            level_counts = self.level_counts(db)
+
+        batch: Dict[UUID, Dict[str, List[str]]] = {uid: {} for uid in user_ids}
+        rows = (
+            db.query(UserPaperCredit.user_id, UserPaperCredit.paper_id, Paper.level)
+            .join(Paper, Paper.id == UserPaperCredit.paper_id)
+            .filter(UserPaperCredit.user_id.in_(user_ids))
+        )
+        for uid, paper_id, level in rows:
+            ids = batch[uid].setdefault(ExamLevel(level).value, [])
+            if str(paper_id) not in ids:
+                ids.append(str(paper_id))
+
+        existing = {
+            p.user_id: p
+            for p in db.query(UserProgression).filter(UserProgression.user_id.in_(user_ids))
+        }
+        for uid, passed_papers in batch.items():
+            progression = existing.get(uid)
+            if progression is None:
+                progression = UserProgression(user_id=uid)
+                db.add(progression)
+            progression.passed_papers = passed_papers
+            progression.current_level = self.compute_level(passed_papers, level_counts)
+
+    def backfill(self, db: Session, batch_size: int = 1000) -> int:
+        """Rebuilds every user's progression record from their credits.
+
+        Users are walked in id order one batch at a time (keyset, not
+        OFFSET) and each batch is committed before the next is read, so
+        memory stays flat. Returns the number of users processed.
+        """
+
+        level_counts = self.level_counts(db)
+        processed = 0
+        last_user_id = None
+
+        while True:
+            query = db.query(UserPaperCredit.user_id).distinct().order_by(UserPaperCredit.user_id)
+            if last_user_id is not None:
+                query = query.filter(UserPaperCredit.user_id > last_user_id)
+            user_ids = [uid for (uid,) in query.limit(batch_size)]
+            if not user_ids:
+                break
+
+            self.rebuild(db, user_ids, level_counts)
+            db.commit()
+
+            processed += len(user_ids)
+            last_user_id = user_ids[-1]
+
+        return processed
+
+
+progression_service = ProgressionService()
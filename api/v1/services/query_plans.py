@@ -0,0 +1,157 @@
+""" EXPLAIN checks for the hot queries of the API
+
+Each entry in `hot_queries` is a query that a request or a background batch
+runs, with placeholder parameters; the paginated listings are built by the
+services that serve them, so the check sees exactly what they send. `check` EXPLAINs every one of them
+on the configured database and reports the tables it reads with a full
+sequential scan, i.e. queries no index serves. Run it after schema or query
+changes with `python manage.py check-query-plans`; the test suite runs the
+same check on SQLite (tests/test_query_plans.py).
+
+On Postgres sequential scans are disabled for the check (in a transaction
+that is rolled back), so the planner uses an index whenever one applies
+however small the tables are; a sequential scan that remains means there
+is no usable index. On SQLite, `EXPLAIN QUERY PLAN` reports a full scan as
+"SCAN <table>" without an index.
+"""
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from sqlalchemy import or_, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from api.utils.pagination import encode_cursor, keyset_query
+from api.v1.models.exam import (
+    AnswerDraft, Exam, ExamLevel, ExamStats, Paper, PendingSubmission, Question,
+    SessionAnswer, UserExamSession, UserPaperCredit, UserProgression
+)
+from api.v1.models.user import User
+from api.v1.services.history import history_service
+from api.v1.services.user import user_service
+
+
+def hot_queries(db: Session) -> Dict[str, Select]:
+    """Function to build the checked queries, by name"""
+
+    user_id, exam_id, paper_id, session_id, question_id = (uuid.uuid4() for _ in range(5))
+    now = datetime.now(timezone.utc)
+
+    return {
+        "active session of a candidate": select(UserExamSession.id).where(
+            UserExamSession.user_id == user_id,
+            UserExamSession.exam_id == exam_id,
+            UserExamSession.end_time == None,
+        ),
+        "questions of an exam": select(Question.id, Question.correct_answer)
+            .where(Question.exam_id == exam_id)
+            .order_by(Question.created_at, Question.id),
+        "exams of a paper": select(Exam.id).where(Exam.paper_id == paper_id),
+        "papers of a level": select(Paper.id).where(Paper.level == ExamLevel.FOUNDATION),
+        "credit for a paper": select(UserPaperCredit.id).where(
+            UserPaperCredit.user_id == user_id, UserPaperCredit.paper_id == paper_id
+        ),
+        "credits of a candidate": select(UserPaperCredit.paper_id).where(UserPaperCredit.user_id == user_id),
+        "progression of a candidate": select(UserProgression.id).where(UserProgression.user_id == user_id),
+        "history page": keyset_query(
+            history_service.sessions_query(db, user_id),
+            UserExamSession.created_at, UserExamSession.id, encode_cursor(now, session_id), 20,
+        ).statement,
+        "credits page": keyset_query(
+            history_service.credits_query(db, user_id),
+            UserPaperCredit.created_at, UserPaperCredit.id, encode_cursor(now, paper_id), 20,
+        ).statement,
+        "finished sessions of an exam": select(UserExamSession.id, UserExamSession.score).where(
+            UserExamSession.exam_id == exam_id, UserExamSession.end_time != None
+        ),
+        "sessions expiring soon": select(UserExamSession.id).where(
+            UserExamSession.end_time == None,
+            UserExamSession.expires_at != None,
+            UserExamSession.expires_at <= now,
+        ),
+        "answers of a session": select(SessionAnswer.answer).where(SessionAnswer.session_id == session_id),
+        "answers to a question": select(SessionAnswer.session_id).where(SessionAnswer.question_id == question_id),
+        "drafts of a session": select(AnswerDraft.answer).where(AnswerDraft.session_id == session_id),
+        "pending submission of a session": select(PendingSubmission.id).where(
+            PendingSubmission.session_id == session_id
+        ),
+        "queued submissions": select(PendingSubmission.id)
+            .where(
+                PendingSubmission.status == "queued",
+                or_(PendingSubmission.next_attempt_at == None, PendingSubmission.next_attempt_at <= now),
+            )
+            .order_by(PendingSubmission.created_at)
+            .limit(200),
+        "live stats of an exam": select(ExamStats.submissions).where(ExamStats.exam_id == exam_id),
+        "admin users page": keyset_query(
+            user_service.listing_query(db), User.created_at, User.id, encode_cursor(now, user_id), 10
+        ).statement,
+        "admin users page, admins only": keyset_query(
+            user_service.listing_query(db, is_admin=True), User.created_at, User.id, None, 10
+        ).statement,
+    }
+
+
+class QueryPlanChecker:
+    """EXPLAINs queries and finds sequential scans"""
+
+    def explain(self, db: Session, statement: Select) -> List[str]:
+        """Returns the plan of a statement, one line per node"""
+
+        dialect = db.get_bind().dialect
+        sql = statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        if dialect.name == "postgresql":
+            plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            lines = []
+            self._walk(plan[0]["Plan"], lines)
+            return lines
+        return [row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+    def _walk(self, node: dict, lines: list, depth: int = 0):
+        label = node["Node Type"]
+        if "Relation Name" in node:
+            label += f" on {node['Relation Name']}"
+        if "Index Name" in node:
+            label += f" using {node['Index Name']}"
+        lines.append("  " * depth + label)
+        for child in node.get("Plans", []):
+            self._walk(child, lines, depth + 1)
+
+    def seq_scans(self, dialect: str, plan: List[str]) -> List[str]:
+        """Returns the plan lines that read a whole table"""
+
+        if dialect == "postgresql":
+            return [line.strip() for line in plan if line.strip().startswith("Seq Scan")]
+        return [
+            line for line in plan
+            if line.startswith("SCAN ")
+            and "USING" not in line
+            and "VIRTUAL TABLE" not in line
+            and line != "SCAN CONSTANT ROW"
+        ]
+
+    def check(self, db: Session) -> List[dict]:
+        """EXPLAINs every hot query. Returns one result per query"""
+
+        dialect = db.get_bind().dialect.name
+        results = []
+        try:
+            if dialect == "postgresql":
+                db.execute(text("SET LOCAL enable_seqscan = off"))
+            for name, statement in hot_queries(db).items():
+                plan = self.explain(db, statement)
+                results.append({
+                    "query": name,
+                    "plan": plan,
+                    "seq_scans": self.seq_scans(dialect, plan),
+                })
+        finally:
+            db.rollback()
+        return results
+
+
+query_plan_checker = QueryPlanChecker()
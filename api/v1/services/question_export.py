@@ -0,0 +1,108 @@
+""" Streaming export of papers, exams and questions as CSV or JSONL
+
+Each output row is one question with its exam and paper flattened into
+prefixed columns, in paper / exam / question order. Rows come from a
+server-side cursor (yield_per) on a session the export opens for itself, so
+the response can keep streaming after the request's own session is closed
+and memory stays flat for any size of question bank. The question columns
+match the bulk import format, so an export of one exam can be imported
+into another environment as is.
+"""
+import csv
+import io
+import json
+from typing import Iterator, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+
+from api.db.database import SessionLocal
+from api.v1.models.exam import Exam, Paper, Question
+
+COLUMNS = (
+    "paper_id", "paper_title", "paper_level",
+    "exam_id", "exam_diet", "exam_year", "exam_duration_minutes", "exam_pass_mark",
+    "question_id", "question_text", "question_type", "options", "correct_answer", "rubric",
+)
+MEDIA_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+def _value(value):
+    return getattr(value, "value", value)
+
+
+class QuestionExporter:
+    """Streams question rows out of the database"""
+
+    def __init__(self, chunk_size: int = 1000):
+        self.chunk_size = chunk_size
+
+    def rows(self, paper_id: Optional[UUID] = None, exam_id: Optional[UUID] = None) -> Iterator[dict]:
+        """Yields one flat dict per question"""
+
+        query = (
+            select(
+                Paper.id.label("paper_id"),
+                Paper.title.label("paper_title"),
+                Paper.level.label("paper_level"),
+                Exam.id.label("exam_id"),
+                Exam.diet.label("exam_diet"),
+                Exam.year.label("exam_year"),
+                Exam.duration_minutes.label("exam_duration_minutes"),
+                Exam.pass_mark.label("exam_pass_mark"),
+                Question.id.label("question_id"),
+                Question.question_text,
+                Question.question_type,
+                Question.options,
+                Question.correct_answer,
+                Question.rubric,
+            )
+            .join(Exam, Exam.paper_id == Paper.id)
+            .join(Question, Question.exam_id == Exam.id)
+            .order_by(Paper.title, Exam.year, Exam.diet, Exam.id, Question.created_at, Question.id)
+            .execution_options(stream_results=True, yield_per=self.chunk_size)
+        )
+        if paper_id:
+            query = query.where(Paper.id == paper_id)
+        if exam_id:
+            query = query.where(Exam.id == exam_id)
+
+        db = SessionLocal()
+        try:
+            for row in db.execute(query):
+                yield {column: _value(value) for column, value in row._mapping.items()}
+        finally:
+            db.close()
+
+    def stream(self, fmt: str, paper_id: Optional[UUID] = None, exam_id: Optional[UUID] = None) -> Iterator[str]:
+        """Yields the export as text chunks of up to `chunk_size` rows"""
+
+        buffer = io.StringIO()
+        writer = None
+        if fmt == "csv":
+            writer = csv.writer(buffer)
+            writer.writerow(COLUMNS)
+
+        count = 0
+        for row in self.rows(paper_id, exam_id):
+            if writer is not None:
+                writer.writerow([
+                    json.dumps(row[column]) if column in ("options", "rubric") and row[column] is not None
+                    else row[column]
+                    for column in COLUMNS
+                ])
+            else:
+                buffer.write(json.dumps(row, default=str, ensure_ascii=False))
+                buffer.write("\n")
+
+            count += 1
+            if count % self.chunk_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+question_exporter = QuestionExporter()
@@ -0,0 +1,217 @@
+""" Streaming bulk import of exam questions from CSV or JSONL
+
+Rows are read one at a time from the upload, validated with QuestionCreate
+and inserted in executemany batches, all in the caller's single transaction,
+so an import costs a handful of round trips instead of three per question and
+memory stays flat however large the file is. Invalid rows are skipped and
+reported by row number (or, in strict mode, abort the whole import). The
+catalog version is bumped once at the end.
+
+CSV files need a header with question_text, question_type and correct_answer;
+options and rubric are optional and hold either a JSON list or "|"-separated
+values. JSONL files hold one QuestionCreate object per line. A file that
+can't be read on (bad encoding, broken CSV quoting) imports nothing and
+raises QuestionImportError naming the row; the admin route answers it with
+a 400 and manage.py with an error message and exit status.
+"""
+import codecs
+import csv
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import IO, Iterator, Optional, Tuple
+from uuid import UUID
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from api.v1.models.exam import Exam, Question
+from api.v1.schemas.exam import QuestionCreate
+from api.v1.services.catalog import catalog_cache
+
+FORMATS = ("csv", "jsonl")
+LIST_FIELDS = ("options", "rubric")
+
+
+class QuestionImportError(ValueError):
+    """An import that can't go ahead; nothing was imported"""
+
+    def __init__(self, message: str, report: Optional["ImportReport"] = None):
+        super().__init__(message)
+        self.report = report
+
+    @property
+    def detail(self):
+        """The message, with the report of the rows read so far if there is one"""
+
+        if self.report is None:
+            return str(self)
+        return {"message": str(self), **self.report.to_dict()}
+
+
+def detect_format(filename: Optional[str], fmt: Optional[str] = None) -> str:
+    """Function to pick the import format from an explicit value or the file name"""
+
+    if fmt is None and filename:
+        extension = filename.rsplit(".", 1)[-1].lower()
+        fmt = {"ndjson": "jsonl", "json": "jsonl"}.get(extension, extension)
+    if fmt not in FORMATS:
+        raise QuestionImportError(f"Unsupported import format; use one of: {', '.join(FORMATS)}")
+    return fmt
+
+
+def _csv_list(value: Optional[str]):
+    value = (value or "").strip()
+    if not value:
+        return None
+    if value.startswith("["):
+        return json.loads(value)
+    return [item.strip() for item in value.split("|")]
+
+
+class UnreadableFileError(Exception):
+    """The rest of the file can't be read"""
+
+
+def _decoded_lines(stream: IO[bytes]) -> Iterator[str]:
+    # Decoded line by line, so a bad byte fails the row it is in
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    for line in stream:
+        yield decoder.decode(line)
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_rows(stream: IO[bytes], fmt: str) -> Iterator[Tuple[int, object]]:
+    """Yields (row number, raw row) pairs; a raw row is a dict or a parse error.
+
+    Reading stops at the first row the file itself can't be read at, which
+    is yielded as an UnreadableFileError.
+    """
+
+    text = _decoded_lines(stream)
+    number = 0
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            # Row 1 is the header; read it first so errors below are row 2 on
+            if reader.fieldnames is None:
+                return
+            number = 1
+            for number, row in enumerate(reader, start=2):
+                try:
+                    for field in LIST_FIELDS:
+                        if field in row:
+                            row[field] = _csv_list(row[field])
+                    yield number, {k: v for k, v in row.items() if k is not None}
+                except ValueError as exc:
+                    yield number, exc
+        else:
+            for number, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield number, json.loads(line)
+                except ValueError as exc:
+                    yield number, exc
+    except (UnicodeDecodeError, csv.Error) as exc:
+        yield number + 1, UnreadableFileError(str(exc))
+
+
+class ImportReport:
+    """Outcome of one import"""
+
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, row: int, messages: list):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "errors": messages})
+
+    def to_dict(self) -> dict:
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+class QuestionImporter:
+    """Validates and inserts question rows in batches"""
+
+    def __init__(self, batch_size: int = 1000, max_errors: int = 1000):
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+
+    def run(
+        self, db: Session, exam_id: UUID, stream: IO[bytes], fmt: str, strict: bool = False
+    ) -> ImportReport:
+        """Imports every valid row into the exam and commits.
+
+        With `strict`, any invalid row rolls back the whole import. Raises
+        QuestionImportError for a missing exam or an unreadable file.
+        """
+
+        if not db.query(Exam.id).filter(Exam.id == exam_id).first():
+            raise QuestionImportError(f"Exam with id {exam_id} not found.")
+
+        report = ImportReport(self.max_errors)
+        # Consecutive created_at values keep the file's order in the paper
+        started = datetime.now(timezone.utc)
+        batch = []
+
+        for number, raw in iter_rows(stream, fmt):
+            if isinstance(raw, UnreadableFileError):
+                db.rollback()
+                report.imported = 0
+                report.error(number, [f"Could not read the file: {raw}"])
+                raise QuestionImportError("Could not read the file; nothing was imported.", report)
+            if isinstance(raw, Exception):
+                report.error(number, [f"Could not parse row: {raw}"])
+                continue
+            try:
+                question = QuestionCreate.model_validate(raw)
+            except ValidationError as exc:
+                report.error(number, [
+                    f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}"
+                    for err in exc.errors()
+                ])
+                continue
+
+            if strict and report.failed:
+                continue  # nothing will be written; keep validating for the report
+            batch.append({
+                **question.model_dump(),
+                "id": uuid.uuid4(),
+                "exam_id": exam_id,
+                "created_at": started + timedelta(microseconds=report.imported + len(batch)),
+            })
+            if len(batch) >= self.batch_size:
+                self._flush(db, batch, report)
+
+        if strict and report.failed:
+            db.rollback()
+            report.imported = 0
+            return report
+
+        self._flush(db, batch, report)
+        if report.imported:
+            catalog_cache.bump(db)
+        db.commit()
+        return report
+
+    def _flush(self, db: Session, batch: list, report: ImportReport):
+        if batch:
+            db.execute(insert(Question), batch)
+            report.imported += len(batch)
+            batch.clear()
+
+
+question_importer = QuestionImporter()
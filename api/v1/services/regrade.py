@@ -0,0 +1,307 @@
+""" Bulk re-grading of finished sessions after an answer key correction
+
+The job works on the exam's sessions that finished before it started, in
+chunks of REGRADE_BATCH_SIZE taken in id order (keyset, no OFFSET). For each
+chunk the objective answers in session_answers are re-marked against the
+current key with one set-based UPDATE, the count of correct answers (and
+summed theory marks, see theory_marking) is read per session, new scores
+are computed with NumPy and changed ones written back in one batched
+UPDATE, and the chunk commits. Memory use depends on the chunk size and not
+on the number of sessions. Provisional sessions (see grading) whose theory
+answers are all marked stop being provisional. Once scores are settled,
+credits for candidates whose pass/fail outcome flipped or was just decided
+are granted or revoked and their progression records rebuilt, and the
+exam's live statistics (see exam_stats) are recomputed.
+"""
+import threading
+import time
+import uuid
+from datetime import date, datetime, timezone
+from typing import Dict, Optional
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import and_, case, func, update
+from sqlalchemy.orm import Session
+
+from api.core.config import settings
+from api.db.database import SessionLocal
+from api.utils.logger import logger
+from api.v1.models.exam import (
+    Exam, Question, QuestionType, SessionAnswer, TheoryMark, UserExamSession, UserPaperCredit
+)
+from api.v1.services.exam_stats import exam_stats_service
+from api.v1.services.grading import AnswerKey, grading_service
+from api.v1.services.progression import progression_service
+
+
+def score_chunk(key: AnswerKey, marks: np.ndarray, sizes: Optional[np.ndarray] = None) -> np.ndarray:
+    """Returns the integer scores a chunk of sessions would be stored with.
+
+    `marks` holds each session's correct answers plus its theory marks and
+    `sizes` the number of questions each session was given.
+    """
+
+    if sizes is None:
+        sizes = np.full(marks.shape[0], key.size, dtype=np.float64)
+    scores = np.zeros(marks.shape[0], dtype=np.int64)
+    given = sizes > 0
+    # Postgres rounds float -> integer half away from zero
+    scores[given] = np.floor(marks[given] * 100.0 / sizes[given] + 0.5)
+    return scores
+
+
+class RegradeJob:
+    """Progress of one re-grade run"""
+
+    def __init__(self, exam_id: UUID, kind: str = "regrade"):
+        self.id = uuid.uuid4()
+        self.exam_id = exam_id
+        self.kind = kind
+        self.status = "pending"
+        self.total = 0
+        self.processed = 0
+        self.changed = 0
+        self.marked = 0
+        self.credits_granted = 0
+        self.credits_revoked = 0
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        elapsed = None
+        if self.started_at:
+            elapsed = round((self.finished_at or time.time()) - self.started_at, 3)
+        return {
+            "id": self.id,
+            "exam_id": self.exam_id,
+            "kind": self.kind,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "changed": self.changed,
+            "marked": self.marked,
+            "credits_granted": self.credits_granted,
+            "credits_revoked": self.credits_revoked,
+            "error": self.error,
+            "elapsed_seconds": elapsed,
+        }
+
+
+class RegradeService:
+    """Runs re-grade jobs and keeps their progress for this worker"""
+
+    def __init__(self, chunk_size: int):
+        self.chunk_size = chunk_size
+        self.jobs: Dict[UUID, RegradeJob] = {}
+        self._lock = threading.Lock()
+
+    def create_job(self, exam_id: UUID, kind: str = "regrade") -> RegradeJob:
+        job = RegradeJob(exam_id, kind)
+        with self._lock:
+            self.jobs[job.id] = job
+        return job
+
+    def get_job(self, job_id: UUID) -> Optional[RegradeJob]:
+        return self.jobs.get(job_id)
+
+    def run(self, db: Session, job: RegradeJob, chunk_size: Optional[int] = None):
+        """Re-grades every finished session of the job's exam"""
+
+        chunk_size = chunk_size or self.chunk_size
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            self.rescore(db, job, chunk_size)
+            job.status = "completed"
+        except Exception as exc:
+            logger.exception(f"Re-grade of exam {job.exam_id} failed")
+            job.status = "failed"
+            job.error = str(exc)
+            raise
+        finally:
+            job.finished_at = time.time()
+
+    def run_in_background(self, job: RegradeJob):
+        """Runs a job on its own database session (for BackgroundTasks)"""
+
+        db = SessionLocal()
+        try:
+            self.run(db, job)
+        except Exception:
+            pass  # recorded on the job and logged
+        finally:
+            db.close()
+
+    def remark(self, db: Session, exam_id: UUID, session_ids: list) -> int:
+        """Function to re-mark the stored objective answers of some sessions against the exam's questions.
+
+        Changes are left in the caller's transaction.
+        """
+
+        result = db.execute(
+            update(SessionAnswer)
+            .where(
+                SessionAnswer.session_id.in_(session_ids),
+                SessionAnswer.question_id == Question.id,
+                Question.exam_id == exam_id,
+            )
+            .values(correct=case(
+                (Question.question_type == QuestionType.THEORY, None),
+                else_=SessionAnswer.answer == Question.correct_answer,
+            ))
+        )
+        return result.rowcount
+
+    def rescore(self, db: Session, job: RegradeJob, chunk_size: int):
+        """Re-marks the exam's answers, rewrites changed scores, reconciles credits and rebuilds live stats"""
+
+        key = grading_service.compile_answer_key(db, job.exam_id)
+        # Sessions submitted from now on are graded against the corrected
+        # key already, so the job works on a fixed set: those finished
+        # before it started.
+        started = datetime.now(timezone.utc)
+        finished = and_(
+            UserExamSession.exam_id == job.exam_id,
+            UserExamSession.end_time != None,
+            UserExamSession.end_time <= started,
+        )
+        job.total = db.query(func.count(UserExamSession.id)).filter(finished).scalar()
+        theory_ids = [key.question_ids[i] for i in key.theory]
+
+        flipped_users = set()
+        last_id = None
+        while True:
+            query = db.query(
+                UserExamSession.id, UserExamSession.user_id, UserExamSession.score,
+                UserExamSession.seed, UserExamSession.provisional,
+            ).filter(finished)
+            if last_id is not None:
+                query = query.filter(UserExamSession.id > last_id)
+            chunk = query.order_by(UserExamSession.id).limit(chunk_size).all()
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            ids = [r.id for r in chunk]
+
+            self.remark(db, job.exam_id, ids)
+            correct = dict(
+                db.query(SessionAnswer.session_id, func.count())
+                .filter(SessionAnswer.session_id.in_(ids), SessionAnswer.correct == True)
+                .group_by(SessionAnswer.session_id)
+            )
+            theory = dict(
+                db.query(TheoryMark.session_id, func.sum(TheoryMark.score))
+                .filter(TheoryMark.session_id.in_(ids), TheoryMark.question_id.in_(theory_ids))
+                .group_by(TheoryMark.session_id)
+            ) if theory_ids else {}
+            # Provisional sessions whose theory answers are all marked now
+            # get their pass/fail outcome decided below
+            provisional = [r.id for r in chunk if r.provisional]
+            unmarked = {
+                sid for (sid,) in db.query(SessionAnswer.session_id)
+                .outerjoin(TheoryMark, and_(
+                    TheoryMark.session_id == SessionAnswer.session_id,
+                    TheoryMark.question_id == SessionAnswer.question_id,
+                ))
+                .filter(
+                    SessionAnswer.session_id.in_(provisional),
+                    SessionAnswer.correct == None,
+                    TheoryMark.session_id == None,
+                )
+                .distinct()
+            } if provisional else set()
+            settled = [r for r in chunk if r.provisional and r.id not in unmarked]
+
+            marks = np.array(
+                [correct.get(r.id, 0) + (theory.get(r.id) or 0.0) for r in chunk], dtype=np.float64
+            )
+            sizes = np.array([key.size_for(r.seed) for r in chunk], dtype=np.float64)
+            new_scores = score_chunk(key, marks, sizes)
+            old_scores = np.array([-1 if r.score is None else r.score for r in chunk], dtype=np.int64)
+
+            changed = np.nonzero(new_scores != old_scores)[0]
+            if changed.size:
+                db.execute(
+                    update(UserExamSession),
+                    [{"id": chunk[i].id, "score": int(new_scores[i])} for i in changed],
+                )
+                flipped = (new_scores >= key.pass_mark) != (old_scores >= key.pass_mark)
+                flipped_users.update(chunk[i].user_id for i in np.nonzero(flipped)[0])
+            if settled:
+                db.query(UserExamSession).filter(
+                    UserExamSession.id.in_([r.id for r in settled])
+                ).update({"provisional": False}, synchronize_session=False)
+                flipped_users.update(r.user_id for r in settled)
+            db.commit()
+
+            job.processed += len(chunk)
+            job.changed += int(changed.size)
+
+        if flipped_users:
+            self.reconcile_credits(db, job, key.paper_id, list(flipped_users))
+        exam_stats_service.rebuild(db, job.exam_id)
+
+    def reconcile_credits(self, db: Session, job: RegradeJob, paper_id: UUID, user_ids: list):
+        """Grants or revokes the paper credit of users whose outcome changed.
+
+        A user keeps the credit if any finished, non-provisional session on
+        any exam of the paper meets that exam's pass mark.
+        """
+
+        for start in range(0, len(user_ids), self.chunk_size):
+            batch = user_ids[start:start + self.chunk_size]
+
+            # Submits lock their session row until they commit, so locking
+            # the users' sessions on the paper waits out submits in flight
+            # and holds off new ones: sessions and credits read below can't
+            # change before this batch commits.
+            (
+                db.query(UserExamSession.id)
+                .join(Exam, Exam.id == UserExamSession.exam_id)
+                .filter(Exam.paper_id == paper_id, UserExamSession.user_id.in_(batch))
+                .order_by(UserExamSession.id)
+                .with_for_update(of=UserExamSession)
+                .all()
+            )
+            passing = {
+                uid for (uid,) in db.query(UserExamSession.user_id)
+                .join(Exam, Exam.id == UserExamSession.exam_id)
+                .filter(
+                    Exam.paper_id == paper_id,
+                    UserExamSession.user_id.in_(batch),
+                    UserExamSession.provisional.is_(False),
+                    UserExamSession.score >= Exam.pass_mark,
+                )
+                .distinct()
+            }
+            credited = {
+                uid for (uid,) in db.query(UserPaperCredit.user_id).filter(
+                    UserPaperCredit.paper_id == paper_id,
+                    UserPaperCredit.user_id.in_(batch),
+                )
+            }
+
+            grant = passing - credited
+            revoke = credited - passing
+            if grant:
+                db.add_all([
+                    UserPaperCredit(user_id=uid, paper_id=paper_id, passed=True, passed_date=date.today())
+                    for uid in grant
+                ])
+            if revoke:
+                db.query(UserPaperCredit).filter(
+                    UserPaperCredit.paper_id == paper_id,
+                    UserPaperCredit.user_id.in_(revoke),
+                ).delete(synchronize_session=False)
+            db.flush()
+            if grant or revoke:
+                progression_service.rebuild(db, list(grant | revoke))
+            db.commit()
+
+            job.credits_granted += len(grant)
+            job.credits_revoked += len(revoke)
+
+
+regrade_service = RegradeService(chunk_size=settings.REGRADE_BATCH_SIZE)
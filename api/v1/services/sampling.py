@@ -0,0 +1,53 @@
+""" Seeded per-candidate question sampling and shuffling
+
+A personalized session stores one random seed. Every question of the exam
+gets a rank from a keyed hash of (seed, question id); the candidate's
+questions are the `questions_per_candidate` lowest-ranked ones, presented in
+rank order when questions are shuffled and in paper order otherwise. Options
+are shuffled with a PRNG seeded from (seed, question id). Nothing else is
+stored per session: the paper and the grading both recompute the same
+selection from the seed, and ranking by question id (rather than position)
+keeps a candidate's selection stable when other questions are added.
+"""
+import hashlib
+import random
+import secrets
+from typing import List, Optional, Sequence
+from uuid import UUID
+
+
+def new_seed() -> int:
+    """Function to draw a seed that fits a signed 64-bit column"""
+
+    return secrets.randbits(63)
+
+
+def is_personalized(questions_per_candidate: Optional[int], shuffle_questions: bool, shuffle_options: bool) -> bool:
+    """Whether sessions of an exam with these settings need a seed"""
+
+    return bool(questions_per_candidate or shuffle_questions or shuffle_options)
+
+
+def _rank(seed: int, question_id: UUID) -> bytes:
+    return hashlib.blake2b(question_id.bytes, digest_size=8, key=seed.to_bytes(8, "big")).digest()
+
+
+def select_positions(
+    seed: int, question_ids: Sequence[UUID], count: Optional[int] = None, shuffle: bool = False
+) -> List[int]:
+    """Returns the positions of a candidate's questions, in presentation order"""
+
+    positions = sorted(range(len(question_ids)), key=lambda i: _rank(seed, question_ids[i]))
+    if count is not None:
+        positions = positions[:count]
+    if not shuffle:
+        positions.sort()
+    return positions
+
+
+def shuffled_options(seed: int, question_id: UUID, options: Sequence[str]) -> list:
+    """Returns a candidate's order of a question's options"""
+
+    options = list(options)
+    random.Random(seed ^ question_id.int).shuffle(options)
+    return options
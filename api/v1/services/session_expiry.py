@@ -0,0 +1,301 @@
+""" Auto-submission of exam sessions whose time has run out
+
+One app process at a time is the leader, holding a Postgres advisory lock
+on a dedicated connection; the others retry now and then and take over if
+the leader's connection goes away. The leader loads the open sessions that
+expire within the next few minutes into a heap (one indexed range query on
+expires_at per half horizon, never per request), sleeps until the earliest
+expiry and submits everything due in batched transactions, using the
+session's autosaved answers. Sessions started with a short duration on the
+leader are pushed onto the heap directly.
+
+A grace period after expiry leaves room for a last autosave flush or a
+submit that is already on its way. Sessions with a deferred submission are
+left to the grading queue, unless it has given up on them: those are
+submitted from their recorded answers here.
+"""
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from uuid import UUID
+
+from pydantic import ValidationError
+from sqlalchemy import text
+
+from api.core.config import settings
+from api.db.database import SessionLocal
+from api.utils.logger import logger
+from api.utils.metrics import Counter, TimingStats
+from api.v1.models.exam import PendingSubmission, UserExamSession
+from api.v1.schemas.exam import ExamSubmission
+from api.v1.services.autosave import autosave_buffer
+from api.v1.services.grading import grading_service
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands timestamps back without a timezone
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class SessionExpiryScheduler:
+    """Heap of upcoming session expiries, drained by a leader-only thread"""
+
+    def __init__(self, grace: int, horizon: int, batch_size: int, lock_id: int):
+        self.grace = timedelta(seconds=grace)
+        self.horizon = horizon
+        self.batch_size = batch_size
+        self.lock_id = lock_id
+
+        self._heap = []  # [(expires_at, session_id)]
+        self._scheduled = set()
+        self._loaded_until: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._leader_connection = None
+        self.is_leader = False
+
+        self.expired = Counter()
+        self.skipped = Counter()
+        self.lag = TimingStats()
+        self.batch_time = TimingStats()
+
+    # Leadership
+
+    def _try_lead(self):
+        engine = SessionLocal.kw["bind"]
+        if engine.dialect.name != "postgresql":
+            # No advisory locks; a SQLite deployment is a single process
+            self.is_leader = True
+            return
+
+        connection = engine.connect()
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_id}
+            ).scalar()
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+        if acquired:
+            self._leader_connection = connection
+            self.is_leader = True
+            logger.info("Session expiry: this process is now the leader")
+        else:
+            connection.close()
+
+    def _still_leader(self) -> bool:
+        if self._leader_connection is None:
+            return self.is_leader
+        try:
+            self._leader_connection.execute(text("SELECT 1"))
+            self._leader_connection.commit()
+            return True
+        except Exception:
+            logger.exception("Session expiry: lost the leader connection")
+            self._step_down()
+            return False
+
+    def _step_down(self):
+        connection, self._leader_connection = self._leader_connection, None
+        self.is_leader = False
+        with self._lock:
+            self._heap, self._scheduled, self._loaded_until = [], set(), None
+        if connection is not None:
+            try:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_id})
+                connection.commit()
+            except Exception:
+                pass  # the lock goes with the connection anyway
+            finally:
+                connection.close()
+
+    # Scheduling
+
+    def schedule(self, session_id: UUID, expires_at: Optional[datetime]):
+        """Adds a new session to the heap if the leader already covers its expiry"""
+
+        if not self.is_leader or expires_at is None:
+            return
+        expires_at = _utc(expires_at)
+        with self._lock:
+            if self._loaded_until is None or expires_at > self._loaded_until:
+                return  # the next refill picks it up
+            if session_id in self._scheduled:
+                return
+            heapq.heappush(self._heap, (expires_at, session_id))
+            self._scheduled.add(session_id)
+            earliest = self._heap[0][1] == session_id
+        if earliest:
+            self._wake.set()
+
+    def refill(self) -> int:
+        """Loads open sessions that expire within the horizon. Returns how many were added"""
+
+        until = datetime.now(timezone.utc) + timedelta(seconds=self.horizon)
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(UserExamSession.id, UserExamSession.expires_at)
+                .filter(
+                    UserExamSession.end_time == None,
+                    UserExamSession.expires_at != None,
+                    UserExamSession.expires_at <= until,
+                )
+                .order_by(UserExamSession.expires_at)
+                .all()
+            )
+        finally:
+            db.close()
+
+        added = 0
+        with self._lock:
+            for session_id, expires_at in rows:
+                if session_id not in self._scheduled:
+                    heapq.heappush(self._heap, (_utc(expires_at), session_id))
+                    self._scheduled.add(session_id)
+                    added += 1
+            self._loaded_until = until
+        return added
+
+    def _pop_due(self, now: datetime) -> List[UUID]:
+        due = []
+        with self._lock:
+            while self._heap and len(due) < self.batch_size and self._heap[0][0] + self.grace <= now:
+                expires_at, session_id = heapq.heappop(self._heap)
+                self._scheduled.discard(session_id)
+                self.lag.record((now - expires_at).total_seconds())
+                due.append(session_id)
+        return due
+
+    def _seconds_to_next(self, now: datetime) -> Optional[float]:
+        with self._lock:
+            if not self._heap:
+                return None
+            return (self._heap[0][0] + self.grace - now).total_seconds()
+
+    # Submission
+
+    def expire(self, session_ids: List[UUID]) -> int:
+        """Submits the given sessions if still open, in one transaction. Returns how many were submitted"""
+
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            sessions = (
+                db.query(UserExamSession)
+                .filter(UserExamSession.id.in_(session_ids), UserExamSession.end_time == None)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            pending = {
+                p.session_id: p for p in db.query(PendingSubmission)
+                .filter(PendingSubmission.session_id.in_(session_ids))
+            }
+
+            submitted = []
+            for session in sessions:
+                deferred = pending.get(session.id)
+                if deferred is not None and deferred.status != "failed":
+                    self.skipped.incr()
+                    continue
+                try:
+                    with db.begin_nested():
+                        submission = ExamSubmission(answers=[])
+                        if deferred is not None:
+                            try:
+                                submission = ExamSubmission.model_validate(deferred.payload)
+                            except ValidationError:
+                                pass
+                        submission = autosave_buffer.merge(db, session.id, submission)
+                        grading_service.finalize(db, session, submission)
+                        if deferred is not None:
+                            deferred.status = "done"
+                    submitted.append(session.id)
+                except Exception:
+                    logger.exception(f"Auto-submission of session {session.id} failed")
+            db.commit()
+        finally:
+            db.close()
+
+        for session_id in submitted:
+            autosave_buffer.close_session(session_id)
+        self.expired.incr(len(submitted))
+        self.batch_time.record(time.perf_counter() - started)
+        return len(submitted)
+
+    # Thread
+
+    def _work(self):
+        retry = max(self.horizon / 10, 5)
+        next_refill = 0.0
+        while not self._stop.is_set():
+            try:
+                if not self.is_leader:
+                    self._try_lead()
+                    if not self.is_leader:
+                        self._stop.wait(retry)
+                        continue
+                    next_refill = 0.0
+
+                if time.monotonic() >= next_refill:
+                    if not self._still_leader():
+                        continue
+                    self.refill()
+                    next_refill = time.monotonic() + self.horizon / 2
+
+                now = datetime.now(timezone.utc)
+                due = self._pop_due(now)
+                if due:
+                    self.expire(due)
+                    continue
+
+                wait = next_refill - time.monotonic()
+                until_due = self._seconds_to_next(now)
+                if until_due is not None:
+                    wait = min(wait, until_due)
+                self._wake.wait(max(wait, 0.05))
+                self._wake.clear()
+            except Exception:
+                logger.exception("Session expiry loop failed")
+                self._stop.wait(retry)
+
+    def start(self):
+        """Starts the scheduler thread"""
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._work, name="session-expiry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the scheduler thread and gives up leadership"""
+
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        self._step_down()
+
+    def stats(self) -> dict:
+        return {
+            "leader": self.is_leader,
+            "scheduled": len(self._heap),
+            "expired": self.expired.value,
+            "skipped": self.skipped.value,
+            "lag": self.lag.snapshot(),
+            "batch_time": self.batch_time.snapshot(),
+        }
+
+
+session_expiry = SessionExpiryScheduler(
+    grace=settings.SESSION_EXPIRY_GRACE,
+    horizon=settings.SESSION_EXPIRY_HORIZON,
+    batch_size=settings.SESSION_EXPIRY_BATCH_SIZE,
+    lock_id=settings.SESSION_EXPIRY_LOCK_ID,
+)
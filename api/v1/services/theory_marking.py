@@ -0,0 +1,276 @@
+""" Batch auto-marking of theory answers
+
+Each theory question gets its own TF-IDF space: a first pass over the
+exam's stored theory answers counts document frequencies of the candidates'
+answers, a second pass vectorizes one chunk of answers at a time into a
+sparse matrix and scores every answer in the chunk with one sparse
+matrix-vector product against the model answer. When the question has a
+keyword rubric, coverage of its key phrases is blended into the mark.
+
+Marks (0-1 per answer) are upserted into theory_marks, after which the
+regular re-grade rescores the sessions, settles the provisional ones and
+reconciles credits. Both passes read the answers of a chunk of finished
+sessions at a time (keyset on the session id), so memory depends on the
+chunk size and the vocabulary, not on the number of scripts. Reads and
+writes share the job's one database session: a streaming read held open
+beside a second, writing session would leave SQLite "database is locked".
+"""
+import re
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from api.core.config import settings
+from api.db.database import SessionLocal
+from api.utils.logger import logger
+from api.utils.upsert import upsert
+from api.v1.models.exam import Question, SessionAnswer, TheoryMark, UserExamSession
+from api.v1.services.grading import grading_service
+from api.v1.services.regrade import RegradeJob, regrade_service
+
+TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be been but by can for from had has have if in into is it its "
+    "of on or so such than that the their them then there these they this to was were "
+    "what when which while who will with would".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Function to split an answer into lower-cased terms without stopwords"""
+
+    tokens = []
+    for token in TOKEN.findall((text or "").lower()):
+        if token in STOPWORDS:
+            continue
+        # Light plural folding: "liabilities" and "liability" still differ,
+        # but "assets"/"asset" and "accounts"/"account" don't
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class Rubric:
+    """Key phrases of a theory question; "a|b" accepts either alternative"""
+
+    def __init__(self, phrases: Optional[Sequence[str]]):
+        self.groups = []
+        for phrase in phrases or ():
+            alternatives = [" ".join(tokenize(alt)) for alt in phrase.split("|")]
+            alternatives = [f" {alt} " for alt in alternatives if alt]
+            if alternatives:
+                self.groups.append(alternatives)
+
+    def coverage(self, tokens: List[str]) -> Optional[float]:
+        """Returns the fraction of key phrases an answer mentions"""
+
+        if not self.groups:
+            return None
+        text = f" {' '.join(tokens)} "
+        hits = sum(1 for group in self.groups if any(alt in text for alt in group))
+        return hits / len(self.groups)
+
+
+class TheoryQuestionModel:
+    """The TF-IDF space and model answer vector of one theory question"""
+
+    def __init__(self, question_id: UUID, model_answer: str, rubric: Optional[Sequence[str]] = None):
+        self.question_id = question_id
+        self.model_tokens = tokenize(model_answer)
+        self.rubric = Rubric(rubric)
+
+        self.df: Counter = Counter()
+        self.documents = 0
+        self.vocabulary: Dict[str, int] = {}
+        self.idf: Optional[np.ndarray] = None
+        self.model_vector: Optional[sparse.csr_matrix] = None
+
+    def observe(self, tokens: List[str]):
+        """Counts one candidate answer towards the document frequencies"""
+
+        self.documents += 1
+        self.df.update(set(tokens))
+
+    def fit(self):
+        """Fixes the vocabulary and IDF weights after all answers were observed"""
+
+        self.df.update(set(self.model_tokens))
+        self.vocabulary = {term: i for i, term in enumerate(self.df)}
+        df = np.fromiter(self.df.values(), dtype=np.float64, count=len(self.df))
+        # Smoothed IDF, as if the model answer were one more document
+        n = self.documents + 1
+        self.idf = np.log((1 + n) / (1 + df)) + 1
+        self.model_vector = self.vectorize([self.model_tokens])
+
+    def vectorize(self, documents: List[List[str]]) -> sparse.csr_matrix:
+        """Returns the L2-normalized TF-IDF rows of tokenized answers"""
+
+        vocabulary = self.vocabulary
+        indptr, indices, counts = [0], [], []
+        for tokens in documents:
+            terms = Counter(vocabulary[t] for t in tokens if t in vocabulary)
+            indices.extend(terms.keys())
+            counts.extend(terms.values())
+            indptr.append(len(indices))
+
+        matrix = sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+            shape=(len(documents), len(vocabulary)),
+        )
+        # Sublinear term frequency, so repeating a term doesn't buy marks
+        np.log(matrix.data, out=matrix.data)
+        matrix.data += 1
+        matrix = matrix @ sparse.diags(self.idf)
+
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.diags(1 / norms) @ matrix
+
+    def similarity(self, documents: List[List[str]]) -> np.ndarray:
+        """Returns the cosine similarity of each answer to the model answer"""
+
+        if not documents:
+            return np.zeros(0)
+        return (self.vectorize(documents) @ self.model_vector.T).toarray().ravel()
+
+
+class TheoryMarker:
+    """Marks an exam's theory answers and rescores its sessions"""
+
+    def __init__(self, full_mark_similarity: float, keyword_weight: float, chunk_size: int = 2000):
+        self.full_mark_similarity = full_mark_similarity
+        self.keyword_weight = keyword_weight
+        self.chunk_size = chunk_size
+
+    def create_job(self, exam_id: UUID) -> RegradeJob:
+        return regrade_service.create_job(exam_id, kind="theory_marking")
+
+    def marks(self, model: TheoryQuestionModel, documents: List[List[str]]):
+        """Returns (score, similarity, keyword coverage) arrays for a chunk of answers"""
+
+        similarity = np.clip(model.similarity(documents), 0, 1)
+        score = np.minimum(similarity / self.full_mark_similarity, 1)
+
+        coverage = None
+        if model.rubric.groups:
+            coverage = np.array([model.rubric.coverage(tokens) for tokens in documents])
+            score = (1 - self.keyword_weight) * score + self.keyword_weight * coverage
+
+        empty = np.array([not tokens for tokens in documents], dtype=bool)
+        score[empty] = 0
+        return np.round(score, 4), similarity, coverage
+
+    def run(self, db: Session, job: RegradeJob, chunk_size: Optional[int] = None):
+        """Marks every theory answer of the job's exam, then rescores the exam"""
+
+        chunk_size = chunk_size or self.chunk_size
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            self._run(db, job, chunk_size)
+            job.status = "completed"
+        except Exception as exc:
+            logger.exception(f"Theory marking of exam {job.exam_id} failed")
+            job.status = "failed"
+            job.error = str(exc)
+            raise
+        finally:
+            job.finished_at = time.time()
+
+    def run_in_background(self, job: RegradeJob):
+        """Runs a job on its own database session (for BackgroundTasks)"""
+
+        db = SessionLocal()
+        try:
+            self.run(db, job)
+        except Exception:
+            pass  # recorded on the job and logged
+        finally:
+            db.close()
+
+    def _answers(self, db: Session, job: RegradeJob, question_ids: list, chunk_size: int):
+        """Yields the (session id, question id, answer) rows of finished sessions, chunk_size sessions at a time"""
+
+        last_id = None
+        while True:
+            query = db.query(UserExamSession.id).filter(
+                UserExamSession.exam_id == job.exam_id,
+                UserExamSession.end_time != None,
+            )
+            if last_id is not None:
+                query = query.filter(UserExamSession.id > last_id)
+            session_ids = [sid for (sid,) in query.order_by(UserExamSession.id).limit(chunk_size)]
+            if not session_ids:
+                return
+            last_id = session_ids[-1]
+
+            yield db.execute(
+                select(SessionAnswer.session_id, SessionAnswer.question_id, SessionAnswer.answer)
+                .where(
+                    SessionAnswer.session_id.in_(session_ids),
+                    SessionAnswer.question_id.in_(question_ids),
+                )
+            ).all()
+
+    def _run(self, db: Session, job: RegradeJob, chunk_size: int):
+        key = grading_service.compile_answer_key(db, job.exam_id)
+        if key.theory:
+            theory_ids = [key.question_ids[i] for i in key.theory]
+            models = {
+                question.id: TheoryQuestionModel(question.id, question.correct_answer, question.rubric)
+                for question in db.query(Question.id, Question.correct_answer, Question.rubric)
+                .filter(Question.id.in_(theory_ids))
+            }
+
+            for chunk in self._answers(db, job, theory_ids, chunk_size):
+                for row in chunk:
+                    models[row.question_id].observe(tokenize(row.answer))
+            for model in models.values():
+                model.fit()
+
+            for chunk in self._answers(db, job, theory_ids, chunk_size):
+                by_question = {}
+                for row in chunk:
+                    by_question.setdefault(row.question_id, []).append(row)
+
+                marked_at = datetime.now(timezone.utc)
+                rows = []
+                for question_id, answers in by_question.items():
+                    documents = [tokenize(row.answer) for row in answers]
+                    score, similarity, coverage = self.marks(models[question_id], documents)
+                    rows.extend(
+                        {
+                            "session_id": row.session_id,
+                            "question_id": question_id,
+                            "score": float(score[i]),
+                            "similarity": round(float(similarity[i]), 4),
+                            "keyword_coverage": None if coverage is None else float(coverage[i]),
+                            "marked_at": marked_at,
+                        }
+                        for i, row in enumerate(answers)
+                    )
+                if rows:
+                    upsert(
+                        db, TheoryMark, rows,
+                        keys=[TheoryMark.session_id, TheoryMark.question_id],
+                        fields=["score", "similarity", "keyword_coverage", "marked_at"],
+                    )
+                    db.commit()
+                    job.marked += len(rows)
+
+        # Rescore with the new marks and reconcile credits
+        regrade_service.rescore(db, job, chunk_size)
+
+
+theory_marker = TheoryMarker(
+    full_mark_similarity=settings.THEORY_FULL_MARK_SIMILARITY,
+    keyword_weight=settings.THEORY_KEYWORD_WEIGHT,
+)
@@ -1,24 +1,70 @@
 from uuid import UUID
 from typing import Any, Optional
 import datetime as dt
+import hashlib
+import threading
+import time
 from fastapi import status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query, Session
 
+from api.utils.cache import TTLCache
 from api.utils.db_validators import check_model_existence
+from api.utils.pagination import estimated_count, keyset_page
+from api.utils.password_pool import password_pool
 
 from api.core.services import Service
-from api.db.database import get_db
+from api.db.database import get_async_db, get_db
 from api.core.config import settings
 from api.v1.models.user import User
 from api.v1.schemas import user
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Decoded access-token claims keyed by (signing key namespace, token digest).
+# Entries expire at the token's own `exp`, so wall-clock time is used.
+token_cache = TTLCache(maxsize=settings.JWT_CACHE_SIZE, ttl=300, clock=time.time)
+
+
+class IdentityCache:
+    """TTL-bounded cache of UserIdentity snapshots keyed by user id
+
+    Writes through UserService invalidate entries explicitly. Every
+    invalidation bumps `version`; a fill that started before an invalidation
+    is discarded, so a concurrent request can't re-cache the old snapshot.
+    The version check and the write happen under one lock with invalidate.
+    Other workers only see a change once their own entry's TTL runs out.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def get(self, user_id: UUID) -> Optional[user.UserIdentity]:
+        return self._cache.get(user_id)
+
+    def set(self, identity: user.UserIdentity, version: int):
+        with self._lock:
+            if version == self.version:
+                self._cache.set(identity.id, identity)
+
+    def invalidate(self, user_id: UUID):
+        with self._lock:
+            self.version += 1
+            self._cache.pop(user_id)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+identity_cache = IdentityCache(
+    maxsize=settings.IDENTITY_CACHE_SIZE, ttl=settings.IDENTITY_CACHE_TTL
+)
 
 
 class UserService(Service):
@@ -26,67 +72,65 @@ class UserService(Service):
     def fetch_all(
         self,
         db: Session,
-        page: int,
-        per_page: int,
+        cursor: Optional[str] = None,
+        per_page: int = 10,
+        estimate_total: bool = False,
         **query_params: Optional[Any],
     ):
         """
-        Fetch all users
+        Fetch all users, newest first
         Args:
             db: database Session object
-            page: page number
+            cursor: next_cursor of the previous page, if any
             per_page: max number of users in a page
-            query_params: params to filter by
+            estimate_total: include an estimated number of matching users
+            query_params: boolean params to filter by
         """
-        per_page = min(per_page, 10)
+        per_page = min(per_page, 100)
+        query = self.listing_query(db, **query_params)
 
-        # Enable filter by query parameter
-        filters = []
-        if all(query_params):
-            # Validate boolean query parameters
-            for param, value in query_params.items():
-                if value is not None and not isinstance(value, bool):
-                    raise HTTPException(
-                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                        detail=f"Invalid value for '{param}'. Must be a boolean.",
-                    )
-                if value == None:
-                    continue
-                if hasattr(User, param):
-                    filters.append(getattr(User, param) == value)
-        query = db.query(User)
-        total_users = query.count()
-        if filters:
-            query = query.filter(*filters)
-            total_users = query.count()
-
-        all_users: list = (
-            query.order_by(desc(User.created_at))
-            .limit(per_page)
-            .offset((page - 1) * per_page)
-            .all()
-        )
+        all_users, next_cursor = keyset_page(query, User.created_at, User.id, cursor, per_page)
+        total_users = estimated_count(db, query) if estimate_total else None
 
-        return self.all_users_response(all_users, total_users, page, per_page)
-    
+        return self.all_users_response(all_users, total_users, per_page, next_cursor)
+
+    def listing_query(self, db: Session, **query_params: Optional[Any]) -> Query:
+        """Returns the users matching boolean `query_params`, for fetch_all to page through"""
+
+        # Enable filter by query parameter. IS TRUE / IS FALSE (rather than
+        # a bound value) lets Postgres match the partial indexes on users.
+        filters = []
+        for param, value in query_params.items():
+            if value is None:
+                continue
+            if not isinstance(value, bool):
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f"Invalid value for '{param}'. Must be a boolean.",
+                )
+            if hasattr(User, param):
+                filters.append(getattr(User, param).is_(value))
+        return db.query(User).filter(*filters)
 
     def all_users_response(
-        self, users: list, total_users: int, page: int, per_page: int
+        self, users: list, total_users: Optional[int], per_page: int, next_cursor: Optional[str]
     ):
         """
         Generates a response for all users
         Args:
             users: a list containing user objects
-            total_users: total number of users
+            total_users: estimated number of matching users, if requested
+            next_cursor: cursor of the next page, None on the last page
         """
         if not users or len(users) == 0:
             return user.AllUsersResponse(
                 message="No User(s) for this query",
                 status="success",
                 status_code=200,
-                page=page,
                 per_page=per_page,
-                total=0,
+                estimated_total=total_users,
+                total=total_users,
+                next_cursor=None,
                 data=[],
             )
         all_users = [
@@ -97,9 +141,10 @@ class UserService(Service):
             message="Users successfully retrieved",
             status="success",
             status_code=200,
-            page=page,
             per_page=per_page,
+            estimated_total=total_users,
             total=total_users,
+            next_cursor=next_cursor,
             data=all_users,
         )
 
@@ -155,9 +200,10 @@ class UserService(Service):
 
         user.is_active = True
         db.commit()
+        identity_cache.invalidate(user.id)
 
     def update(
-        self, db: Session, current_user: User, schema: user.UserUpdate, id=None
+        self, db: Session, current_user: user.UserIdentity, schema: user.UserUpdate, id=None
     ):
         """Function to update a User"""
 
@@ -180,12 +226,13 @@ class UserService(Service):
         
         db.commit()
         db.refresh(user_to_update)
+        identity_cache.invalidate(user_to_update.id)
         return user_to_update
 
     def hash_password(self, password: str) -> str:
         """Function to hash a password"""
 
-        hashed_password = pwd_context.hash(secret=password)
+        hashed_password = password_pool.hash(password)
         return hashed_password
     
     def create_access_token(self, user_id: UUID) -> str:
@@ -208,15 +255,40 @@ class UserService(Service):
         encoded_jwt = jwt.encode(data, settings.SECRET_KEY, settings.ALGORITHM)
         return encoded_jwt
 
+    def _signing_namespace(self) -> bytes:
+        """Identifies the current signing key so a rotated key never hits old entries"""
+
+        return hashlib.sha256(
+            f"{settings.ALGORITHM}:{settings.SECRET_KEY}".encode()
+        ).digest()[:8]
+
+    def decode_access_token(self, access_token: str) -> dict:
+        """Function to decode an access token, reusing claims already verified"""
+
+        key = (
+            self._signing_namespace(),
+            hashlib.sha256(access_token.encode()).digest(),
+        )
+        payload = token_cache.get(key)
+        if payload is not None:
+            return payload
+
+        payload = jwt.decode(
+            access_token,
+            settings.SECRET_KEY,
+            algorithms=[settings.ALGORITHM],
+        )
+        exp = payload.get("exp")
+        token_cache.set(
+            key, payload, expires_at=float(exp) if isinstance(exp, (int, float)) else None
+        )
+        return payload
+
     def verify_access_token(self, access_token: str, credentials_exception):
         """Funtcion to decode and verify access token"""
 
         try:
-            payload = jwt.decode(
-                access_token,
-                settings.SECRET_KEY,
-                algorithms=[settings.ALGORITHM],
-            )
+            payload = self.decode_access_token(access_token)
             user_id = payload.get("user_id")
             token_type = payload.get("type")
 
@@ -300,13 +372,13 @@ class UserService(Service):
     def hash_password(self, password: str) -> str:
         """Function to hash a password"""
 
-        hashed_password = pwd_context.hash(secret=password)
+        hashed_password = password_pool.hash(password)
         return hashed_password
 
     def verify_password(self, password: str, hash: str) -> bool:
         """Function to verify a hashed password"""
 
-        return pwd_context.verify(secret=password, hash=hash)
+        return password_pool.verify(password, hash)
 
 
     def get_current_user(
@@ -329,7 +401,84 @@ class UserService(Service):
             raise credentials_exception
         return user
 
-    def get_current_admin_user(self, current_user: User) -> User:
+    def _identity_user_id(self, access_token: str) -> UUID:
+        """Function to validate an access token and return its user id"""
+
+        credentials_exception = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+        token = self.verify_access_token(access_token, credentials_exception)
+        if not token:
+            raise credentials_exception
+        try:
+            return UUID(token.id)
+        except (TypeError, ValueError):
+            raise credentials_exception
+
+    def _identity_from_row(self, row) -> user.UserIdentity:
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return user.UserIdentity(
+            id=row.id,
+            is_admin=bool(row.is_admin),
+            is_active=bool(row.is_active),
+            is_verified=bool(row.is_verified),
+        )
+
+    def get_current_identity(
+        self,
+        access_token: str = Depends(oauth2_scheme),
+        db: Session = Depends(get_db),
+    ) -> user.UserIdentity:
+        """Function to get the id and role flags of the current user.
+
+        Use this instead of get_current_user for routes that only need
+        identity and role; it is served from identity_cache when possible.
+        """
+
+        user_id = self._identity_user_id(access_token)
+        identity = identity_cache.get(user_id)
+        if identity is not None:
+            return identity
+
+        version = identity_cache.version
+        row = (
+            db.query(User.id, User.is_admin, User.is_active, User.is_verified)
+            .filter(User.id == user_id)
+            .first()
+        )
+        identity = self._identity_from_row(row)
+        identity_cache.set(identity, version)
+        return identity
+
+    async def get_current_identity_async(
+        self,
+        access_token: str = Depends(oauth2_scheme),
+        db: AsyncSession = Depends(get_async_db),
+    ) -> user.UserIdentity:
+        """Async get_current_identity, for `async def` routes"""
+
+        user_id = self._identity_user_id(access_token)
+        identity = identity_cache.get(user_id)
+        if identity is not None:
+            return identity
+
+        version = identity_cache.version
+        row = (await db.execute(
+            select(User.id, User.is_admin, User.is_active, User.is_verified)
+            .where(User.id == user_id)
+        )).first()
+        identity = self._identity_from_row(row)
+        identity_cache.set(identity, version)
+        return identity
+
+    def get_current_admin_user(self, current_user: user.UserIdentity) -> user.UserIdentity:
         """
         Verifies if a given user object is an admin.
         Raises a 403 Forbidden error if the user is not an admin.
@@ -0,0 +1,83 @@
+""" Ranked admin search over users by email, name or ICAN number
+
+On Postgres the search text is one lower-cased document per user (see
+USER_SEARCH_DOCUMENT) with a pg_trgm GIN index, which answers both a
+substring match (LIKE '%term%') and a fuzzy word match (term <% document)
+without scanning users. Rows whose email or ICAN number start with the term
+rank first, then by trigram word similarity.
+
+On SQLite (local runs) the users_fts FTS5 table is queried with one prefix
+term per word of the input and ranked by bm25.
+
+Results page by an opaque (rank, id) cursor.
+"""
+import re
+from typing import Optional, Tuple
+
+from sqlalchemy import Float, case, cast, column, func, literal_column, or_, select, table
+from sqlalchemy.orm import Session
+
+from api.utils.pagination import ranked_page
+from api.v1.models.user import USER_SEARCH_DOCUMENT, User
+
+users_fts = table("users_fts", column("rowid"))
+
+
+def _like_escape(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class UserSearchService:
+    """Finds users matching a free-text term"""
+
+    def search(self, db: Session, term: str, cursor: Optional[str], limit: int) -> Tuple[list, Optional[str]]:
+        """Returns one page of matching users, best match first, and the next cursor"""
+
+        term = term.strip().lower()
+        if db.get_bind().dialect.name == "postgresql":
+            ranked = self._postgres(term)
+        else:
+            ranked = self._sqlite(term)
+        if ranked is None:
+            return [], None
+
+        query = db.query(User, ranked.c.rank, ranked.c.id).join(ranked, ranked.c.id == User.id)
+        rows, next_cursor = ranked_page(query, ranked.c.rank, ranked.c.id, cursor, limit)
+        return [row.User for row in rows], next_cursor
+
+    def _postgres(self, term: str):
+        pattern = _like_escape(term)
+        prefix_match = or_(
+            func.lower(User.email).like(f"{pattern}%"),
+            func.lower(User.ican_number).like(f"{pattern}%"),
+        )
+        # word_similarity() is a float4; as a double the rank survives the
+        # round trip through the cursor and compares equal to itself
+        rank = cast(
+            case((prefix_match, 1.0), else_=0.0)
+            + func.word_similarity(term, USER_SEARCH_DOCUMENT),
+            Float(53),
+        )
+        return (
+            select(User.id.label("id"), rank.label("rank"))
+            .where(or_(
+                USER_SEARCH_DOCUMENT.like(f"%{pattern}%"),
+                USER_SEARCH_DOCUMENT.op("%>")(term),
+            ))
+            .subquery()
+        )
+
+    def _sqlite(self, term: str):
+        words = re.findall(r"\w+", term)
+        if not words:
+            return None
+        # Every word, quoted so FTS5 syntax in the input is inert, as a prefix
+        match = " ".join(f'"{word}"*' for word in words)
+        return (
+            select(User.id.label("id"), (-func.bm25(literal_column("users_fts"))).label("rank"))
+            .join(users_fts, users_fts.c.rowid == literal_column("users.rowid"))
+            .where(literal_column("users_fts").op("MATCH")(match))
+            .subquery()
+        )
+
+user_search_service = UserSearchService()
@@ -0,0 +1,79 @@
+""" Micro-benchmark of per-submission grading cost
+
+usage: python -m benchmarks.grading [--sizes 50 200 1000] [--repeat 2000]
+
+Times AnswerKey.grade, the marking and scoring GradingService.finalize runs
+for every submission, against the previous approach of rebuilding a
+str(question.id) -> correct_answer dict from the exam's questions on every
+submission. Each size is run on a full paper and on a personalized one
+(half the questions drawn per candidate from the session's seed). Needs no
+database: the writes finalize then makes are the same either way.
+"""
+import argparse
+import math
+import random
+import timeit
+from types import SimpleNamespace
+from uuid import uuid4
+
+from api.v1.schemas.exam import ExamSubmission
+from api.v1.services.grading import AnswerKey
+from api.v1.services.sampling import new_seed
+
+OPTIONS = ["A", "B", "C", "D"]
+
+
+def legacy_score(questions, submission):
+    correct_answers = {str(q.id): q.correct_answer for q in questions}
+    score = 0
+    for user_answer in submission.answers:
+        question_id_str = str(user_answer.question_id)
+        if question_id_str in correct_answers and user_answer.answer == correct_answers[question_id_str]:
+            score += 1
+    return math.floor((score / len(questions)) * 100 + 0.5)
+
+
+def run(size: int, repeat: int, personalized: bool):
+    questions = [
+        SimpleNamespace(id=uuid4(), correct_answer=random.choice(OPTIONS))
+        for _ in range(size)
+    ]
+    key = AnswerKey(
+        [q.id for q in questions], [q.correct_answer for q in questions],
+        questions_per_candidate=size // 2 if personalized else None,
+    )
+    seed = new_seed() if personalized else None
+    positions = key.positions_for(seed)
+    # A candidate answers the questions they were given
+    given = [q for i, q in enumerate(questions) if positions is None or i in positions]
+    submission = ExamSubmission.model_validate({
+        "answers": [
+            {"question_id": str(q.id), "answer": random.choice(OPTIONS)}
+            for q in given
+        ]
+    })
+
+    assert key.grade(submission.answers, seed)[1] == legacy_score(given, submission)
+
+    legacy = min(timeit.repeat(lambda: legacy_score(given, submission), number=repeat, repeat=3)) / repeat
+    compiled = min(timeit.repeat(lambda: key.grade(submission.answers, seed), number=repeat, repeat=3)) / repeat
+    print(
+        f"{size:>5} questions {'personalized' if personalized else 'full paper':>12}  "
+        f"legacy {legacy * 1e6:9.1f} us  compiled {compiled * 1e6:9.1f} us  "
+        f"speedup {legacy / compiled:5.1f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        for personalized in (False, True):
+            run(size, args.repeat, personalized)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,17 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
 from api.core.config import settings
+from api.db import database
 from api.utils.logger import logger
+from api.utils.password_pool import password_pool
+from api.utils.rate_limit import limiter
 from api.v1.routes import api_router
+from api.v1.services.autosave import autosave_buffer
+from api.v1.services.grading_queue import grading_queue
+from api.v1.services.session_expiry import session_expiry
 
 from api.utils.json_response import JsonResponseDict
 
@@ -20,11 +24,18 @@ import traceback
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+	autosave_buffer.start()
+	grading_queue.start()
+	session_expiry.start()
 	yield
+	session_expiry.stop()
+	grading_queue.stop()
+	autosave_buffer.stop()
+	password_pool.shutdown()
+	await database.async_engine.dispose()
 
 app = FastAPI(lifespan=lifespan)
 
-limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
 
 app.add_middleware(
@@ -66,7 +77,8 @@ async def http_exception(request: Request, exc: HTTPException):
             "success": False,
             "status_code": exc.status_code,
             "message": exc.detail
-        }
+        },
+        headers=exc.headers,
     )
 
 @app.exception_handler(RateLimitExceeded)
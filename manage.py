@@ -0,0 +1,175 @@
+""" Management commands
+
+usage: python manage.py <command> [options]
+"""
+import argparse
+
+from api.db.database import SessionLocal
+
+
+def backfill_progression(args):
+    """Rebuilds user_progressions from user_paper_credits"""
+    from api.v1.services.progression import progression_service
+
+    db = SessionLocal()
+    try:
+        processed = progression_service.backfill(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Backfilled progression for {processed} users")
+
+
+def regrade(args):
+    """Re-grades every finished session of an exam"""
+    from uuid import UUID
+    from api.v1.services.regrade import regrade_service
+
+    db = SessionLocal()
+    try:
+        job = regrade_service.create_job(UUID(args.exam_id))
+        regrade_service.run(db, job, chunk_size=args.chunk_size)
+    finally:
+        db.close()
+    print(job.to_dict())
+
+
+def mark_theory(args):
+    """Auto-marks the theory answers of an exam and rescores its sessions"""
+    from uuid import UUID
+    from api.v1.services.theory_marking import theory_marker
+
+    db = SessionLocal()
+    try:
+        job = theory_marker.create_job(UUID(args.exam_id))
+        theory_marker.run(db, job, chunk_size=args.chunk_size)
+    finally:
+        db.close()
+    print(job.to_dict())
+
+
+def analyze_items(args):
+    """Computes item statistics and the score distribution of an exam"""
+    from uuid import UUID
+    from api.v1.services.item_analysis import item_analysis_service
+
+    db = SessionLocal()
+    try:
+        job = item_analysis_service.create_job(UUID(args.exam_id))
+        item_analysis_service.run(db, job, chunk_size=args.chunk_size)
+    finally:
+        db.close()
+    print(job.to_dict())
+
+
+def import_questions(args):
+    """Bulk imports questions into an exam from a CSV or JSONL file"""
+    import json
+    import sys
+    from uuid import UUID
+    from api.v1.services.question_import import QuestionImportError, detect_format, question_importer
+
+    db = SessionLocal()
+    try:
+        fmt = detect_format(args.path, args.format)
+        with open(args.path, "rb") as stream:
+            report = question_importer.run(db, UUID(args.exam_id), stream, fmt, strict=args.strict)
+    except QuestionImportError as exc:
+        print(f"Import failed: {exc}", file=sys.stderr)
+        if exc.report is not None:
+            print(json.dumps(exc.report.to_dict(), indent=2), file=sys.stderr)
+        sys.exit(1)
+    finally:
+        db.close()
+    print(json.dumps(report.to_dict(), indent=2))
+
+
+def export_questions(args):
+    """Exports papers, exams and questions as CSV or JSONL"""
+    import sys
+    from uuid import UUID
+    from api.v1.services.question_export import question_exporter
+
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        for chunk in question_exporter.stream(
+            args.format,
+            paper_id=UUID(args.paper_id) if args.paper_id else None,
+            exam_id=UUID(args.exam_id) if args.exam_id else None,
+        ):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+def check_query_plans(args):
+    """EXPLAINs the hot queries and fails if any reads a whole table"""
+    import sys
+    from api.v1.services.query_plans import query_plan_checker
+
+    db = SessionLocal()
+    try:
+        results = query_plan_checker.check(db)
+    finally:
+        db.close()
+
+    failed = [result for result in results if result["seq_scans"]]
+    for result in results:
+        print(f"{'FAIL' if result['seq_scans'] else 'ok  '} {result['query']}")
+        if result["seq_scans"] or args.verbose:
+            for line in result["plan"]:
+                print(f"       {line}")
+    print(f"{len(results) - len(failed)}/{len(results)} queries use an index")
+    if failed:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Testa management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser(
+        "backfill-progression", help=backfill_progression.__doc__
+    )
+    command.add_argument("--batch-size", type=int, default=1000)
+    command.set_defaults(func=backfill_progression)
+
+    command = commands.add_parser("regrade", help=regrade.__doc__)
+    command.add_argument("exam_id")
+    command.add_argument("--chunk-size", type=int, default=5000)
+    command.set_defaults(func=regrade)
+
+    command = commands.add_parser("mark-theory", help=mark_theory.__doc__)
+    command.add_argument("exam_id")
+    command.add_argument("--chunk-size", type=int, default=2000)
+    command.set_defaults(func=mark_theory)
+
+    command = commands.add_parser("analyze-items", help=analyze_items.__doc__)
+    command.add_argument("exam_id")
+    command.add_argument("--chunk-size", type=int, default=5000)
+    command.set_defaults(func=analyze_items)
+
+    command = commands.add_parser("import-questions", help=import_questions.__doc__)
+    command.add_argument("exam_id")
+    command.add_argument("path")
+    command.add_argument("--format", choices=["csv", "jsonl"])
+    command.add_argument("--strict", action="store_true")
+    command.set_defaults(func=import_questions)
+
+    command = commands.add_parser("export-questions", help=export_questions.__doc__)
+    command.add_argument("--format", choices=["csv", "jsonl"], default="jsonl")
+    command.add_argument("--paper-id")
+    command.add_argument("--exam-id")
+    command.add_argument("--output", help="file to write to (default: stdout)")
+    command.set_defaults(func=export_questions)
+
+    command = commands.add_parser("check-query-plans", help=check_query_plans.__doc__)
+    command.add_argument("--verbose", action="store_true", help="print every plan")
+    command.set_defaults(func=check_query_plans)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import uuid
+from datetime import datetime, timezone
+
+from api.v1.services import autosave
+from api.v1.services.autosave import AutosaveBuffer
+
+
+def test_flush_writes_rows_in_primary_key_order(db_path, monkeypatch):
+    buffer = AutosaveBuffer(flush_interval=60, batch_size=3, max_pending=100)
+    saved_at = datetime.now(timezone.utc)
+    for _ in range(4):
+        buffer._pending[uuid.uuid4()] = {uuid.uuid4(): ("a", saved_at) for _ in range(3)}
+    written = []
+    monkeypatch.setattr(autosave, "upsert_drafts", lambda db, rows: written.append(list(rows)))
+
+    assert buffer.flush() == 12
+
+    keys = [(row["session_id"], row["question_id"]) for batch in written for row in batch]
+    assert keys == sorted(keys)
+    assert [len(batch) for batch in written] == [3, 3, 3, 3]
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+
+import httpx
+
+from api.v1.services.catalog import catalog_cache
+from tests.conftest import auth_headers, make_exam, make_user
+
+
+def run_with_timeout(coro, timeout: float):
+    """Runs `coro` on a fresh event loop in a thread; a stalled loop fails the test instead of hanging it"""
+
+    outcome = {}
+
+    def target():
+        outcome["result"] = asyncio.run(coro)
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "event loop stalled"
+    return outcome["result"]
+
+
+def test_concurrent_available_exams_after_catalog_bump(db):
+    import main
+
+    make_exam(db)
+    users = [make_user(db, f"candidate{i}@example.com", f"ICAN{i}") for i in range(8)]
+    catalog_cache.bump(db)
+    db.commit()
+
+    async def fetch_all():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.get("/api/v1/exams/available", headers=auth_headers(user)) for user in users
+            ))
+
+    responses = run_with_timeout(fetch_all(), timeout=30)
+
+    assert [response.status_code for response in responses] == [200] * len(users)
+    assert catalog_cache.rebuilds >= 1
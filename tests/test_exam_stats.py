@@ -0,0 +1,26 @@
+from api.v1.models.exam import ExamStats
+from api.v1.services.exam_stats import exam_stats_service
+from tests.conftest import auth_headers, make_exam, make_user
+from tests.test_grading import start_and_answer
+
+
+def test_rebuild_matches_live_stats(client, db):
+    exam = make_exam(db, questions=3, pass_mark=67)
+    for i, correct in enumerate([3, 2, 1]):
+        candidate = make_user(db, f"candidate{i}@example.com", f"ICAN{i}")
+        start_and_answer(client, exam, auth_headers(candidate), correct=correct)
+
+    live = exam_stats_service.get(db, exam.id)
+    exam_stats_service.rebuild(db, exam.id)
+    rebuilt = exam_stats_service.get(db, exam.id)
+
+    assert (live["submissions"], live["passed"], live["mean_score"]) == (3, 2, 66.6667)
+    live.pop("updated_at"), rebuilt.pop("updated_at")
+    assert rebuilt == live
+    assert [row.shard for row in db.query(ExamStats).filter(ExamStats.exam_id == exam.id)] == [0]
+
+    # Submissions after a rebuild keep adding to the shards
+    candidate = make_user(db, "late@example.com", "ICAN9")
+    start_and_answer(client, exam, auth_headers(candidate), correct=3)
+    db.expire_all()
+    assert exam_stats_service.get(db, exam.id)["submissions"] == 4
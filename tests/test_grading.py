@@ -0,0 +1,99 @@
+from api.v1.models.exam import UserPaperCredit
+from api.v1.services.exam_stats import exam_stats_service
+from tests.conftest import auth_headers, make_exam, make_user
+
+
+def start_and_answer(client, exam, headers: dict, correct: int) -> tuple:
+    body = client.post(f"/api/v1/exams/{exam.id}/start", headers=headers).json()
+    answers = [
+        {"question_id": question["id"], "answer": "a" if i < correct else "b"}
+        for i, question in enumerate(body["questions"])
+    ]
+    session_id = body["session_id"]
+    response = client.post(f"/api/v1/exams/{session_id}/submit", json={"answers": answers}, headers=headers)
+    assert response.status_code == 200
+    return session_id, response.json()
+
+
+def test_pass_mark_applies_to_the_stored_score(client, db):
+    # 2 of 3 correct is 66.67%, stored as 67
+    exam = make_exam(db, questions=3, pass_mark=67)
+    candidate = make_user(db, "candidate@example.com", "ICAN1")
+    headers = auth_headers(candidate)
+
+    session_id, submitted = start_and_answer(client, exam, headers, correct=2)
+    result = client.get(f"/api/v1/exams/{session_id}/result", headers=headers).json()
+    history = client.get("/api/v1/exams/history", headers=headers).json()["items"]
+
+    assert (submitted["score"], submitted["passed"]) == (67, True)
+    assert (result["score"], result["passed"]) == (67, True)
+    assert history[0]["passed"] is True
+    assert db.query(UserPaperCredit).filter(UserPaperCredit.user_id == candidate.id).count() == 1
+    live = exam_stats_service.get(db, exam.id)
+    assert (live["passed"], live["mean_score"]) == (1, 67)
+
+
+def test_answer_key_grade_marks_each_question_once():
+    from uuid import uuid4
+    from api.v1.models.exam import QuestionType
+    from api.v1.schemas.exam import UserAnswer
+    from api.v1.services.grading import AnswerKey
+
+    ids = [uuid4() for _ in range(4)]
+    key = AnswerKey(
+        ids, ["a", "b", "c", "essay"],
+        question_types=[QuestionType.OBJECTIVE] * 3 + [QuestionType.THEORY],
+    )
+    answers = [
+        UserAnswer(question_id=ids[0], answer="a"),
+        UserAnswer(question_id=ids[0], answer="x"),  # a repeat can't undo a correct answer
+        UserAnswer(question_id=ids[1], answer="x"),
+        UserAnswer(question_id=ids[3], answer="essay"),  # theory: marked later
+        UserAnswer(question_id=uuid4(), answer="a"),  # not in the exam
+    ]
+
+    marked, score = key.grade(answers)
+
+    assert marked == {0: ("a", True), 1: ("x", False), 3: ("essay", None)}
+    assert score == 25
+
+
+def test_answer_key_is_compiled_once_per_catalog_version(db, monkeypatch):
+    from api.v1.models.exam import Question
+    from api.v1.services.catalog import catalog_cache
+    from api.v1.services.grading import GradingService
+
+    exam = make_exam(db, questions=2)
+    service = GradingService()
+    compiles = []
+    compile_key = service.compile_answer_key
+    monkeypatch.setattr(service, "compile_answer_key", lambda *args: compiles.append(1) or compile_key(*args))
+
+    key = service.get_answer_key(db, exam.id)
+    assert service.get_answer_key(db, exam.id) is key
+    assert key.answers == ("a", "a")
+
+    db.query(Question).filter(Question.exam_id == exam.id).update({"correct_answer": "b"})
+    catalog_cache.bump(db)
+    db.commit()
+
+    assert service.get_answer_key(db, exam.id).answers == ("b", "b")
+    assert len(compiles) == 2
+
+
+def test_answer_key_grades_a_sampled_session_on_its_own_questions():
+    from uuid import uuid4
+    from api.v1.schemas.exam import UserAnswer
+    from api.v1.services.grading import AnswerKey
+
+    ids = [uuid4() for _ in range(6)]
+    key = AnswerKey(ids, ["a"] * 6, questions_per_candidate=3)
+    drawn = sorted(key.positions_for(42))
+    not_drawn = next(i for i in range(6) if i not in drawn)
+    answers = [UserAnswer(question_id=ids[i], answer="a") for i in drawn[:2] + [not_drawn]]
+
+    marked, score = key.grade(answers, seed=42)
+
+    # 2 of the 3 questions drawn; the answer to an undrawn one is ignored
+    assert sorted(marked) == drawn[:2]
+    assert score == 67
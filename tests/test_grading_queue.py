@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+
+from api.db import database
+from api.v1.models.exam import PendingSubmission, UserExamSession
+from api.v1.schemas.exam import ExamSubmission
+from api.v1.services import grading_queue as grading_queue_module
+from api.v1.services.grading_queue import grading_queue
+from api.v1.services.session_expiry import session_expiry
+from tests.conftest import auth_headers, make_exam, make_user
+
+
+def open_session(db, exam, candidate, expires_in: timedelta = timedelta(hours=1)) -> UserExamSession:
+    now = datetime.now(timezone.utc)
+    session = UserExamSession(
+        user_id=candidate.id, exam_id=exam.id, start_time=now, expires_at=now + expires_in
+    )
+    db.add(session)
+    db.commit()
+    return session
+
+
+def answers_for(exam) -> ExamSubmission:
+    return ExamSubmission(answers=[
+        {"question_id": question.id, "answer": "a"} for question in exam.questions
+    ])
+
+
+def test_failed_grading_is_retried_with_backoff_then_given_up(db, monkeypatch):
+    exam = make_exam(db)
+    session = open_session(db, exam, make_user(db, "candidate@example.com", "ICAN1"))
+    grading_queue.enqueue(db, session, answers_for(exam))
+    db.commit()
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("grading failed")
+
+    monkeypatch.setattr(grading_queue_module.grading_service, "finalize", fail)
+    monkeypatch.setattr(grading_queue, "max_attempts", 2)
+
+    assert grading_queue.process_batch(db) == 1
+    pending = db.query(PendingSubmission).one()
+    assert (pending.status, pending.attempts) == ("queued", 1)
+    assert pending.next_attempt_at is not None
+
+    # Not due again until the backoff has passed
+    assert grading_queue.process_batch(db) == 0
+
+    pending.next_attempt_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.commit()
+    assert grading_queue.process_batch(db) == 1
+    db.refresh(pending)
+    assert (pending.status, pending.attempts, pending.error) == ("failed", 2, "grading failed")
+
+
+def test_expiry_submits_sessions_the_grading_queue_gave_up_on(db):
+    exam = make_exam(db)
+    candidate = make_user(db, "candidate@example.com", "ICAN1")
+    session = open_session(db, exam, candidate, expires_in=-timedelta(minutes=5))
+    pending = grading_queue.enqueue(db, session, answers_for(exam))
+    pending.status, pending.attempts = "failed", grading_queue.max_attempts
+    db.commit()
+
+    assert session_expiry.expire([session.id]) == 1
+
+    db.expire_all()
+    assert db.get(UserExamSession, session.id).score == 100
+    assert db.query(PendingSubmission).one().status == "done"
+
+
+def test_concurrent_deferred_submit_is_a_conflict(client, db, monkeypatch):
+    exam = make_exam(db)
+    candidate = make_user(db, "candidate@example.com", "ICAN1")
+    session = open_session(db, exam, candidate)
+    enqueue = grading_queue.enqueue
+
+    def enqueue_after_another_request(async_db, session, submission):
+        # The other request passed the same check and committed first
+        other = database.SessionLocal()
+        enqueue(other, session, submission)
+        other.commit()
+        other.close()
+        return enqueue(async_db, session, submission)
+
+    monkeypatch.setattr(grading_queue, "enqueue", enqueue_after_another_request)
+
+    response = client.post(
+        f"/api/v1/exams/{session.id}/submit?deferred=true",
+        json=answers_for(exam).model_dump(mode="json"),
+        headers=auth_headers(candidate),
+    )
+
+    assert response.status_code == 409
+    assert db.query(PendingSubmission).count() == 1
+
+
+def test_plain_submit_after_a_deferred_one_is_a_conflict(client, db):
+    exam = make_exam(db)
+    candidate = make_user(db, "candidate@example.com", "ICAN1")
+    session = open_session(db, exam, candidate)
+    body = answers_for(exam).model_dump(mode="json")
+    url = f"/api/v1/exams/{session.id}/submit"
+
+    assert client.post(f"{url}?deferred=true", json=body, headers=auth_headers(candidate)).status_code == 202
+    assert client.post(url, json=body, headers=auth_headers(candidate)).status_code == 409
+
+    db.expire_all()
+    assert db.get(UserExamSession, session.id).end_time is None
+    assert grading_queue.process_batch(db) == 1
+    db.expire_all()
+    assert db.get(UserExamSession, session.id).score == 100
@@ -0,0 +1,43 @@
+import threading
+import uuid
+
+from api.v1.schemas.user import UserIdentity
+from api.v1.services.user import IdentityCache
+
+
+def test_fill_started_before_an_invalidation_is_discarded():
+    cache = IdentityCache(maxsize=10, ttl=60)
+    identity = UserIdentity(id=uuid.uuid4(), is_admin=False, is_active=True, is_verified=True)
+
+    version = cache.version
+    cache.invalidate(identity.id)
+    cache.set(identity, version)
+
+    assert cache.get(identity.id) is None
+
+
+def test_invalidate_waits_for_a_set_in_progress():
+    cache = IdentityCache(maxsize=10, ttl=60)
+    identity = UserIdentity(id=uuid.uuid4(), is_admin=False, is_active=True, is_verified=True)
+    checked, release = threading.Event(), threading.Event()
+    store = cache._cache.set
+
+    def slow_store(key, value):
+        # Between the version check and the write
+        checked.set()
+        release.wait(5)
+        store(key, value)
+
+    cache._cache.set = slow_store
+    filler = threading.Thread(target=cache.set, args=(identity, cache.version))
+    filler.start()
+    checked.wait(5)
+
+    invalidator = threading.Thread(target=cache.invalidate, args=(identity.id,))
+    invalidator.start()
+    invalidator.join(0.5)
+    release.set()
+    filler.join(5)
+    invalidator.join(5)
+
+    assert cache.get(identity.id) is None
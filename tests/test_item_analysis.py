@@ -0,0 +1,28 @@
+from api.v1.services.item_analysis import item_analysis_service
+from tests.conftest import auth_headers, make_exam, make_user
+from tests.test_grading import start_and_answer
+
+
+def test_item_analysis_reports_difficulty_and_progress(client, db, monkeypatch):
+    exam = make_exam(db, questions=3)
+    for correct in range(4):
+        candidate = make_user(db, f"candidate{correct}@example.com", f"ICAN{correct}")
+        start_and_answer(client, exam, auth_headers(candidate), correct=correct)
+
+    job = item_analysis_service.create_job(exam.id)
+    totals_seen = []
+    add_chunk = item_analysis_service._chunk
+    monkeypatch.setattr(
+        item_analysis_service, "_chunk",
+        lambda *args: totals_seen.append(job.total) or add_chunk(*args),
+    )
+    item_analysis_service.run(db, job, chunk_size=2)
+
+    assert (job.status, job.total, job.processed) == ("completed", 4, 4)
+    # The total is known from the first chunk on
+    assert totals_seen == [4, 4]
+    analysis = item_analysis_service.get(db, exam.id)
+    assert analysis["candidates"] == 4
+    assert [item["p_value"] for item in analysis["items"]] == [0.75, 0.5, 0.25]
+    assert all(item["point_biserial"] > 0 for item in analysis["items"])
+    assert analysis["items"][0]["distractors"] == {"a": 3, "b": 1, "c": 0, "_other": 0, "_omitted": 0}
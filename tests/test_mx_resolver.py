@@ -0,0 +1,90 @@
+import threading
+
+import dns.exception
+
+from api.utils import mx_resolver as module
+from api.utils.mx_resolver import MXResolver, StubBackend
+
+
+class FlakyBackend:
+    def __init__(self):
+        self.calls = 0
+
+    def has_mx(self, domain):
+        self.calls += 1
+        raise dns.exception.Timeout()
+
+
+class SlowBackend:
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def has_mx(self, domain):
+        self.calls += 1
+        self.release.wait(5)
+        return True
+
+
+def make_resolver(backend, **kwargs):
+    return MXResolver(backend=backend, positive_ttl=60, negative_ttl=60, budget=5, **kwargs)
+
+
+def test_stub_rejects_the_configured_domains(monkeypatch):
+    monkeypatch.setattr(module.settings, "MX_RESOLVER_BACKEND", "stub")
+    monkeypatch.setattr(module.settings, "MX_STUB_UNDELIVERABLE", "nomail.test, Bounce.test")
+    resolver = make_resolver(module._make_backend())
+
+    assert resolver.has_mx("example.com")
+    assert not resolver.has_mx("nomail.test")
+    assert not resolver.has_mx("bounce.TEST.")
+
+
+def test_answers_are_cached():
+    backend = StubBackend(["nomail.test"])
+    calls = []
+    lookup = backend.has_mx
+    backend.has_mx = lambda domain: calls.append(domain) or lookup(domain)
+    resolver = make_resolver(backend)
+
+    for _ in range(3):
+        assert resolver.has_mx("example.com")
+        assert not resolver.has_mx("nomail.test")
+
+    assert calls == ["example.com", "nomail.test"]
+
+
+def test_a_failed_lookup_is_rejected_and_not_cached():
+    backend = FlakyBackend()
+    resolver = make_resolver(backend)
+
+    assert not resolver.has_mx("example.com")
+    assert not resolver.has_mx("example.com")
+    assert backend.calls == 2
+    assert resolver.stats()["unresolved"] == 2
+
+
+def test_a_failed_lookup_is_let_through_when_failing_open():
+    resolver = make_resolver(FlakyBackend(), fail_open=True)
+
+    assert resolver.has_mx("example.com")
+
+
+def test_concurrent_lookups_share_one_query():
+    backend = SlowBackend()
+    resolver = make_resolver(backend)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(resolver.has_mx("example.com")))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    while resolver.coalesced.value < 4:
+        threading.Event().wait(0.01)
+    backend.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == [True] * 5
+    assert backend.calls == 1
@@ -0,0 +1,90 @@
+import re
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+from api.utils.pagination import _Explain
+from api.v1.models.exam import UserExamSession
+from api.v1.models.user import User
+from tests.conftest import auth_headers, make_exam, make_user
+
+SAME_SECOND = datetime(2024, 1, 1, 10, 0, 0)
+
+
+def page_through(client, url: str, params: dict, headers: dict, items_key: str, id_key: str,
+                 max_pages: int = 20) -> list:
+    seen, cursor = [], None
+    for _ in range(max_pages):
+        params = {**params, "cursor": cursor} if cursor else params
+        body = client.get(url, params=params, headers=headers).json()
+        seen += [item[id_key] for item in body[items_key]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return seen
+    raise AssertionError("pagination did not terminate")
+
+
+def test_history_pages_through_rows_created_in_the_same_second(client, db):
+    exam = make_exam(db)
+    candidate = make_user(db, "candidate@example.com", "ICAN1")
+    now = datetime.now(timezone.utc)
+    db.add_all([
+        UserExamSession(user_id=candidate.id, exam_id=exam.id, start_time=now) for _ in range(7)
+    ])
+    db.commit()
+    db.query(UserExamSession).update({"created_at": SAME_SECOND})
+    db.commit()
+
+    seen = page_through(client, "/api/v1/exams/history", {"limit": 3}, auth_headers(candidate), "items", "session_id")
+
+    assert len(seen) == 7
+    assert len(set(seen)) == 7
+
+
+def test_admin_users_pages_through_rows_created_in_the_same_second(client, db):
+    admin = make_user(db, "admin@example.com", "ICAN0", is_admin=True)
+    for i in range(1, 8):
+        make_user(db, f"candidate{i}@example.com", f"ICAN{i}")
+    db.query(User).update({"created_at": SAME_SECOND})
+    db.commit()
+
+    seen = page_through(client, "/api/v1/admin/users", {"per_page": 3}, auth_headers(admin), "data", "id")
+
+    assert len(seen) == 8
+    assert len(set(seen)) == 8
+
+
+def test_created_at_is_stored_in_the_cursor_format(db):
+    # A server default would be stored as '2024-01-01 10:00:00' on SQLite,
+    # which sorts before the cursor '2024-01-01 10:00:00.000000'
+    make_user(db, "candidate@example.com", "ICAN1")
+
+    stored = db.execute(text("SELECT created_at FROM users")).scalar()
+
+    assert re.fullmatch(r"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\.\d{6}", stored)
+
+
+def test_admin_users_filters_newest_first_and_keeps_the_old_fields(client, db):
+    admin = make_user(db, "admin@example.com", "ICAN0", is_admin=True)
+    for i in range(1, 6):
+        make_user(db, f"candidate{i}@example.com", f"ICAN{i}", is_verified=i % 2 == 0)
+    params = {"per_page": 2, "is_verified": "false", "estimate_total": "true"}
+
+    body = client.get("/api/v1/admin/users", params=params, headers=auth_headers(admin)).json()
+    seen = page_through(client, "/api/v1/admin/users", params, auth_headers(admin), "data", "id")
+
+    unverified = db.query(User).filter(User.is_verified.is_(False)).order_by(User.created_at.desc(), User.id.desc())
+    assert seen == [str(user.id) for user in unverified]
+    assert body["estimated_total"] == body["total"] == len(seen)
+    assert body["page"] is None
+
+
+def test_estimated_count_sends_filter_values_as_parameters():
+    statement = select(User.id).where(User.id == uuid.uuid4(), User.is_admin.is_(True))
+
+    compiled = _Explain(statement).compile(dialect=postgresql.psycopg2.dialect())
+
+    assert str(compiled).startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert list(compiled.params) == ["id_1"]
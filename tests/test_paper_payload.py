@@ -0,0 +1,43 @@
+from api.v1.models.exam import Question
+from api.v1.services.catalog import catalog_cache
+from api.v1.services.paper_payload import paper_payload_cache
+from tests.conftest import auth_headers, make_exam, make_user
+
+
+def test_paper_is_encoded_once_per_catalog_version(client, db):
+    exam = make_exam(db)
+    headers = auth_headers(make_user(db, "candidate@example.com", "ICAN1"))
+    url = f"/api/v1/exams/{exam.id}/paper"
+
+    first = client.get(url, headers=headers)
+    payload = paper_payload_cache.get(db, exam.id)
+    cached = client.get(url, headers={**headers, "If-None-Match": first.headers["ETag"]})
+
+    assert first.status_code == 200
+    assert "correct_answer" not in first.text
+    assert cached.status_code == 304
+    assert paper_payload_cache.get(db, exam.id) is payload
+
+    # An edit bumps the catalog version, which retires the encoded paper
+    db.query(Question).filter(Question.exam_id == exam.id).update({"question_text": "Reworded"})
+    catalog_cache.bump(db)
+    db.commit()
+    edited = client.get(url, headers={**headers, "If-None-Match": first.headers["ETag"]})
+
+    assert edited.status_code == 200
+    assert edited.headers["ETag"] != first.headers["ETag"]
+    assert {q["question_text"] for q in edited.json()["questions"]} == {"Reworded"}
+
+
+def test_paper_is_served_gzipped_when_accepted(client, db):
+    exam = make_exam(db)
+    headers = auth_headers(make_user(db, "candidate@example.com", "ICAN1"))
+    url = f"/api/v1/exams/{exam.id}/paper"
+
+    plain = client.get(url, headers={**headers, "Accept-Encoding": "identity"})
+    gzipped = client.get(url, headers={**headers, "Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in plain.headers
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.json() == plain.json()
+    assert gzipped.headers["ETag"] == plain.headers["ETag"]
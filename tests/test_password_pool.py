@@ -0,0 +1,45 @@
+import pytest
+from fastapi import HTTPException
+
+from api.utils.password_pool import PasswordPool
+
+
+@pytest.fixture
+def pool():
+    pool = PasswordPool(workers=1, max_pending=0, timeout=30, retry_after=2)
+    yield pool
+    pool.shutdown()
+
+
+def test_hashes_and_verifies_in_the_pool(pool):
+    hashed = pool.hash("correct horse")
+
+    assert hashed.startswith("$2b$")
+    assert pool.verify("correct horse", hashed)
+    assert not pool.verify("wrong horse", hashed)
+    assert pool.stats()["compute"]["count"] == 3
+
+
+def test_a_full_pool_turns_callers_away(pool):
+    # The one slot is taken by a call in flight
+    pool._slots.acquire()
+
+    with pytest.raises(HTTPException) as exc_info:
+        pool.hash("correct horse")
+
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers == {"Retry-After": "2"}
+    assert pool.stats()["rejected"] == 1
+    assert pool._executor is None
+
+
+def test_a_slow_call_times_out_and_keeps_its_slot_until_done(pool):
+    pool.timeout = 0.001
+
+    with pytest.raises(HTTPException) as exc_info:
+        pool.hash("correct horse")
+
+    assert exc_info.value.status_code == 503
+    assert pool.stats()["timed_out"] == 1
+    pool.shutdown()  # waits for the hash to finish
+    assert pool._slots.acquire(blocking=False)
@@ -0,0 +1,41 @@
+from api.db import database
+from api.v1.models.exam import ExamLevel, UserProgression
+from api.v1.services.progression import progression_service
+from tests.conftest import make_exam, make_user
+
+
+def test_get_or_build_returns_a_record_built_concurrently(db, monkeypatch):
+    make_exam(db)
+    candidate = make_user(db, "candidate@example.com", "ICAN1")
+    fetch = progression_service.fetch
+    calls = []
+
+    def fetch_before_the_other_request_commits(db, user_id, for_update=False):
+        calls.append(user_id)
+        if len(calls) == 1:
+            # Another request builds and commits the record right after our read
+            other = database.SessionLocal()
+            other.add(UserProgression(user_id=user_id, passed_papers={}, current_level=ExamLevel.SKILLS))
+            other.commit()
+            other.close()
+            return None
+        return fetch(db, user_id, for_update=for_update)
+
+    monkeypatch.setattr(progression_service, "fetch", fetch_before_the_other_request_commits)
+
+    progression = progression_service.get_or_build(db, candidate.id)
+    db.commit()
+
+    assert progression.current_level == ExamLevel.SKILLS
+    assert db.query(UserProgression).filter(UserProgression.user_id == candidate.id).count() == 1
+
+
+def test_get_or_build_builds_a_missing_record(db):
+    make_exam(db)
+    candidate = make_user(db, "candidate@example.com", "ICAN1")
+
+    progression = progression_service.get_or_build(db, candidate.id)
+    db.commit()
+
+    assert (progression.current_level, progression.passed_papers) == (ExamLevel.FOUNDATION, {})
+    assert progression.id is not None
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from api.v1.models.exam import ExamLevel
+from api.v1.services.query_plans import hot_queries, query_plan_checker
+from tests.conftest import make_exam, make_user
+
+# Opt-in: a migrated Postgres database to check the plans against as well
+POSTGRES_URL = os.environ.get("QUERY_PLAN_POSTGRES_URL")
+
+
+def assert_no_seq_scans(db: Session):
+    results = query_plan_checker.check(db)
+
+    assert [result["query"] for result in results] == list(hot_queries(db))
+    offenders = {result["query"]: result["plan"] for result in results if result["seq_scans"]}
+    assert offenders == {}
+
+
+def test_hot_queries_use_indexes_on_sqlite(db):
+    for i in range(20):
+        make_user(db, f"candidate{i}@example.com", f"ICAN{i}")
+    for i, level in enumerate(list(ExamLevel) * 3):
+        make_exam(db, title=f"Paper {i}", level=level)
+    db.execute(text("ANALYZE"))
+    db.commit()
+
+    assert_no_seq_scans(db)
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="set QUERY_PLAN_POSTGRES_URL to check Postgres plans")
+def test_hot_queries_use_indexes_on_postgres():
+    engine = create_engine(POSTGRES_URL)
+    try:
+        with Session(engine) as db:
+            assert_no_seq_scans(db)
+    finally:
+        engine.dispose()
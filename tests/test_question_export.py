@@ -0,0 +1,37 @@
+import io
+import json
+
+from api.v1.models.exam import Question
+from api.v1.services.question_export import QuestionExporter
+from tests.conftest import auth_headers, make_exam, make_user
+
+
+def test_export_streams_in_chunks_in_paper_order(db):
+    exam = make_exam(db, questions=5)
+    make_exam(db, title="Taxation", questions=2)
+
+    chunks = list(QuestionExporter(chunk_size=2).stream("jsonl", exam_id=exam.id))
+    rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+
+    assert len(chunks) == 3
+    assert [row["question_text"] for row in rows] == [f"Question {i}" for i in range(5)]
+    assert rows[0]["options"] == ["a", "b", "c"]
+
+
+def test_an_exported_exam_imports_into_another(client, db):
+    source, target = make_exam(db, questions=3), make_exam(db, title="Taxation", questions=0)
+    admin = auth_headers(make_user(db, "admin@example.com", "ICAN0", is_admin=True))
+
+    export = client.get("/api/v1/admin/questions/export", params={"format": "csv", "exam_id": str(source.id)}, headers=admin)
+    imported = client.post(
+        f"/api/v1/admin/exams/{target.id}/questions/import",
+        files={"file": ("questions.csv", io.BytesIO(export.content))},
+        headers=admin,
+    )
+
+    assert export.headers["content-type"].startswith("text/csv")
+    assert imported.json()["data"]["imported"] == 3
+    copied = db.query(Question).filter(Question.exam_id == target.id).order_by(Question.created_at).all()
+    assert [(q.question_text, q.options, q.correct_answer) for q in copied] == [
+        (f"Question {i}", ["a", "b", "c"], "a") for i in range(3)
+    ]
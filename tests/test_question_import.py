@@ -0,0 +1,87 @@
+import io
+import sys
+
+import pytest
+
+import manage
+from api.v1.models.exam import Question
+from tests.conftest import auth_headers, make_exam, make_user
+
+
+def upload(client, exam, admin, name: str, content: bytes):
+    return client.post(
+        f"/api/v1/admin/exams/{exam.id}/questions/import",
+        files={"file": (name, io.BytesIO(content))},
+        headers=auth_headers(admin),
+    )
+
+
+def test_import_reports_bad_rows_and_imports_the_rest(client, db):
+    exam = make_exam(db, questions=0)
+    admin = make_user(db, "admin@example.com", "ICAN0", is_admin=True)
+    content = (
+        "question_text,question_type,correct_answer,options\n"
+        "What is 1+1?,Objective,2,1|2|3\n"
+        "Broken,Essay,x,\n"
+    ).encode()
+
+    response = upload(client, exam, admin, "questions.csv", content)
+
+    assert response.status_code == 200
+    report = response.json()["data"]
+    assert (report["imported"], report["failed"]) == (1, 1)
+    assert report["errors"][0]["row"] == 3
+
+
+def test_undecodable_csv_is_a_bad_request(client, db):
+    exam = make_exam(db, questions=0)
+    admin = make_user(db, "admin@example.com", "ICAN0", is_admin=True)
+    content = (
+        "question_text,question_type,correct_answer\n"
+        "What is 1+1?,Objective,2\n"
+    ).encode() + "Qu'est-ce que c'est ?,Objective,é\n".encode("latin-1")
+
+    response = upload(client, exam, admin, "questions.csv", content)
+
+    assert response.status_code == 400
+    detail = response.json()["message"]
+    assert (detail["imported"], detail["errors"][0]["row"]) == (0, 3)
+    assert db.query(Question).filter(Question.exam_id == exam.id).count() == 0
+
+
+def test_malformed_csv_is_a_bad_request(client, db):
+    exam = make_exam(db, questions=0)
+    admin = make_user(db, "admin@example.com", "ICAN0", is_admin=True)
+    content = (
+        "question_text,question_type,correct_answer\n"
+        f"What is 1+1?,Objective,{'2' * 200_000}\n"
+    ).encode()
+
+    response = upload(client, exam, admin, "questions.csv", content)
+
+    assert response.status_code == 400
+    assert response.json()["message"]["errors"][0]["row"] == 2
+
+
+def test_unsupported_format_is_a_bad_request(client, db):
+    exam = make_exam(db, questions=0)
+    admin = make_user(db, "admin@example.com", "ICAN0", is_admin=True)
+
+    response = upload(client, exam, admin, "questions.xlsx", b"not a spreadsheet")
+
+    assert response.status_code == 400
+    assert response.json()["message"].startswith("Unsupported import format")
+
+
+def test_cli_reports_an_unreadable_file_and_fails(db, tmp_path, monkeypatch, capsys):
+    exam = make_exam(db, questions=0)
+    path = tmp_path / "questions.csv"
+    path.write_bytes(b"question_text,question_type,correct_answer\n" + "é,Objective,a\n".encode("latin-1"))
+    monkeypatch.setattr(sys, "argv", ["manage.py", "import-questions", str(exam.id), str(path)])
+
+    with pytest.raises(SystemExit) as exit_info:
+        manage.main()
+
+    assert exit_info.value.code == 1
+    assert "Import failed: Could not read the file" in capsys.readouterr().err
+    assert db.query(Question).filter(Question.exam_id == exam.id).count() == 0
@@ -0,0 +1,48 @@
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, SlidingWindowCounterRateLimiter
+
+from api.utils import rate_limit
+from api.utils.rate_limit import SQLiteStorage
+
+
+def test_workers_share_counters_through_the_file(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'limits.db'}"
+    # One storage per worker process, each with its own connection
+    workers = [SlidingWindowCounterRateLimiter(storage_from_string(uri)) for _ in range(2)]
+    limit = parse("3/minute")
+
+    allowed = [workers[i % 2].hit(limit, "login", "10.0.0.1") for i in range(4)]
+
+    assert isinstance(workers[0].storage, SQLiteStorage)
+    assert allowed == [True, True, True, False]
+    assert workers[1].hit(limit, "login", "10.0.0.2")
+
+
+def test_the_previous_window_is_weighted_by_its_remaining_share(tmp_path, monkeypatch):
+    storage = SQLiteStorage(f"sqlite:///{tmp_path / 'limits.db'}")
+    clock = [600.0]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: clock[0])
+
+    for _ in range(4):
+        assert storage.acquire_sliding_window_entry("key", limit=4, expiry=60)
+    assert not storage.acquire_sliding_window_entry("key", limit=4, expiry=60)
+
+    # A quarter into the next window, 3 of the previous 4 hits still count
+    clock[0] = 675.0
+    assert storage.get_sliding_window("key", 60)[::2] == (4, 0)
+    assert storage.acquire_sliding_window_entry("key", limit=4, expiry=60)
+    assert not storage.acquire_sliding_window_entry("key", limit=4, expiry=60)
+
+
+def test_fixed_window_counters_expire(tmp_path, monkeypatch):
+    storage = SQLiteStorage(f"sqlite:///{tmp_path / 'limits.db'}")
+    limiter = FixedWindowRateLimiter(storage)
+    clock = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: clock[0])
+    limit = parse("2/minute")
+
+    assert [limiter.hit(limit, "key") for _ in range(3)] == [True, True, False]
+    clock[0] += 61
+    assert limiter.hit(limit, "key")
+    assert storage.get("LIMITER/key/2/1/minute") == 1
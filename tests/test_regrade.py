@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+
+from api.db import database
+from api.v1.models.exam import Question, UserExamSession, UserPaperCredit
+from api.v1.services.catalog import catalog_cache
+from api.v1.services.exam_stats import exam_stats_service
+from api.v1.services.regrade import regrade_service
+from tests.conftest import auth_headers, make_exam, make_user
+from tests.test_grading import start_and_answer
+
+
+def test_regrade_rescores_in_chunks_and_reconciles_credits(client, db):
+    exam = make_exam(db, questions=3, pass_mark=60)
+    candidates = [make_user(db, f"candidate{i}@example.com", f"ICAN{i}") for i in range(5)]
+    for candidate in candidates:
+        # a, a, b: 2 of 3 correct, 67 and a pass
+        start_and_answer(client, exam, auth_headers(candidate), correct=2)
+    assert db.query(UserPaperCredit).count() == 5
+
+    # The key is corrected: every answer should have been "b"
+    db.query(Question).filter(Question.exam_id == exam.id).update({"correct_answer": "b"})
+    catalog_cache.bump(db)
+    db.commit()
+
+    job = regrade_service.create_job(exam.id)
+    regrade_service.run(db, job, chunk_size=2)
+
+    assert (job.status, job.total, job.processed, job.changed) == ("completed", 5, 5, 5)
+    assert job.credits_revoked == 5
+    db.expire_all()
+    assert {score for (score,) in db.query(UserExamSession.score)} == {33}
+    assert db.query(UserPaperCredit).count() == 0
+    assert exam_stats_service.get(db, exam.id)["passed"] == 0
+
+
+def test_regrade_leaves_sessions_finished_after_it_started(client, db, monkeypatch):
+    exam = make_exam(db, questions=3, pass_mark=60)
+    early, late = (make_user(db, f"candidate{i}@example.com", f"ICAN{i}") for i in range(2))
+    start_and_answer(client, exam, auth_headers(early), correct=2)
+    remark = regrade_service.remark
+
+    def remark_while_a_submit_lands(db, exam_id, session_ids):
+        other = database.SessionLocal()
+        now = datetime.now(timezone.utc)
+        other.add(UserExamSession(user_id=late.id, exam_id=exam.id, start_time=now, end_time=now, score=67))
+        other.commit()
+        other.close()
+        return remark(db, exam_id, session_ids)
+
+    monkeypatch.setattr(regrade_service, "remark", remark_while_a_submit_lands)
+
+    job = regrade_service.create_job(exam.id)
+    regrade_service.run(db, job, chunk_size=1)
+
+    assert (job.total, job.processed, job.changed) == (1, 1, 0)
+    db.expire_all()
+    assert db.query(UserExamSession.score).filter(UserExamSession.user_id == late.id).scalar() == 67
@@ -0,0 +1,63 @@
+from uuid import uuid4
+
+from api.v1.models.exam import Exam
+from api.v1.services.catalog import catalog_cache
+from api.v1.services.sampling import select_positions, shuffled_options
+from tests.conftest import auth_headers, make_exam, make_user
+
+
+def test_a_seed_always_draws_the_same_questions_in_the_same_order():
+    ids = [uuid4() for _ in range(20)]
+
+    drawn = select_positions(7, ids, count=5, shuffle=True)
+
+    assert select_positions(7, ids, count=5, shuffle=True) == drawn
+    assert len(set(drawn)) == 5
+    assert select_positions(7, ids, count=5) == sorted(drawn)
+    assert any(select_positions(seed, ids, count=5, shuffle=True) != drawn for seed in range(8, 12))
+
+
+def test_adding_questions_keeps_a_candidate_draw_or_replaces_part_of_it():
+    ids = [uuid4() for _ in range(20)]
+    drawn = {ids[i] for i in select_positions(7, ids, count=5)}
+
+    extended = ids + [uuid4() for _ in range(5)]
+    redrawn = {extended[i] for i in select_positions(7, extended, count=5)}
+
+    # New questions can only take the place of old ones, never reshuffle the rest
+    assert redrawn - drawn <= set(extended[20:])
+
+
+def test_options_are_shuffled_the_same_way_for_a_seed():
+    question_id, options = uuid4(), ["a", "b", "c", "d", "e"]
+
+    shuffled = shuffled_options(7, question_id, options)
+
+    assert shuffled_options(7, question_id, options) == shuffled
+    assert sorted(shuffled) == options
+    assert options == ["a", "b", "c", "d", "e"]
+
+
+def test_a_candidate_sees_and_is_graded_on_the_same_draw(client, db):
+    exam = make_exam(db, questions=6)
+    db.query(Exam).filter(Exam.id == exam.id).update(
+        {"questions_per_candidate": 3, "shuffle_questions": True, "shuffle_options": True}
+    )
+    catalog_cache.bump(db)
+    db.commit()
+    headers = auth_headers(make_user(db, "candidate@example.com", "ICAN1"))
+
+    started = client.post(f"/api/v1/exams/{exam.id}/start", headers=headers).json()
+    paper = client.get(f"/api/v1/exams/{exam.id}/paper", headers=headers).json()
+    answers = [
+        {"question_id": question["id"], "answer": "a" if i < 2 else "b"}
+        for i, question in enumerate(started["questions"])
+    ]
+    submitted = client.post(
+        f"/api/v1/exams/{started['session_id']}/submit", json={"answers": answers}, headers=headers
+    ).json()
+
+    assert len(started["questions"]) == 3
+    assert paper["questions"] == started["questions"]
+    assert all(sorted(question["options"]) == ["a", "b", "c"] for question in paper["questions"])
+    assert submitted["score"] == 67
@@ -0,0 +1,27 @@
+from uuid import UUID
+
+from api.v1.models.exam import SessionAnswer, UserExamSession
+from tests.conftest import auth_headers, make_exam, make_user
+
+
+def test_submitted_answers_are_stored_one_row_per_question(client, db):
+    exam = make_exam(db, questions=3)
+    headers = auth_headers(make_user(db, "candidate@example.com", "ICAN1"))
+    body = client.post(f"/api/v1/exams/{exam.id}/start", headers=headers).json()
+    first, second, _ = (question["id"] for question in body["questions"])
+    answers = [
+        {"question_id": first, "answer": "b"},
+        {"question_id": first, "answer": "a"},  # changed their mind
+        {"question_id": second, "answer": "c"},
+    ]
+
+    response = client.post(f"/api/v1/exams/{body['session_id']}/submit", json={"answers": answers}, headers=headers)
+
+    assert response.json()["score"] == 33
+    session_id = UUID(body["session_id"])
+    rows = {
+        str(row.question_id): (row.answer, row.correct)
+        for row in db.query(SessionAnswer).filter(SessionAnswer.session_id == session_id)
+    }
+    assert rows == {first: ("a", True), second: ("c", False)}
+    assert db.get(UserExamSession, session_id).submitted_answers is None
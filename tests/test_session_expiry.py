@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from api.v1.models.exam import PendingSubmission, UserExamSession
+from api.v1.services.session_expiry import SessionExpiryScheduler
+from tests.conftest import auth_headers, make_exam, make_user
+
+
+def start_with_drafts(client, exam, headers: dict, correct: int) -> UUID:
+    body = client.post(f"/api/v1/exams/{exam.id}/start", headers=headers).json()
+    answers = [
+        {"question_id": question["id"], "answer": "a" if i < correct else "b"}
+        for i, question in enumerate(body["questions"])
+    ]
+    response = client.put(f"/api/v1/exams/{body['session_id']}/answers", json={"answers": answers}, headers=headers)
+    assert response.status_code == 200
+    return UUID(body["session_id"])
+
+
+def test_a_due_session_is_submitted_from_its_autosaved_answers(client, db):
+    exam = make_exam(db, questions=3)
+    due, running, queued = (
+        start_with_drafts(client, exam, auth_headers(make_user(db, f"c{i}@example.com", f"ICAN{i}")), correct=2)
+        for i in range(3)
+    )
+    now = datetime.now(timezone.utc)
+    db.query(UserExamSession).update({"expires_at": now - timedelta(minutes=1)})
+    db.query(UserExamSession).filter(UserExamSession.id == running).update({"expires_at": now + timedelta(minutes=1)})
+    # A deferred submit the grading queue still owns
+    db.add(PendingSubmission(session_id=queued, user_id=db.get(UserExamSession, queued).user_id, payload={"answers": []}))
+    db.commit()
+
+    scheduler = SessionExpiryScheduler(grace=30, horizon=300, batch_size=10, lock_id=1)
+    scheduler.is_leader = True
+    assert scheduler.refill() == 3
+    popped = scheduler._pop_due(now)
+
+    assert sorted(popped) == sorted([due, queued])
+    assert scheduler.expire(popped) == 1
+    assert scheduler.skipped.value == 1
+    db.expire_all()
+    sessions = {s.id: s for s in db.query(UserExamSession)}
+    assert (sessions[due].score, sessions[due].end_time is not None) == (67, True)
+    assert sessions[running].end_time is None
+    assert sessions[queued].end_time is None
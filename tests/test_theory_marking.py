@@ -0,0 +1,59 @@
+from api.v1.models.exam import Question, QuestionType, UserExamSession, UserPaperCredit
+from api.v1.services.catalog import catalog_cache
+from api.v1.services.exam_stats import exam_stats_service
+from api.v1.services.theory_marking import theory_marker
+from tests.conftest import auth_headers, make_exam, make_user
+
+MODEL_ANSWER = "Depreciation allocates the cost of a non-current asset over its useful life."
+
+
+def add_theory_question(db, exam) -> Question:
+    question = Question(
+        exam_id=exam.id, question_text="What is depreciation?", question_type=QuestionType.THEORY,
+        correct_answer=MODEL_ANSWER,
+    )
+    db.add(question)
+    catalog_cache.bump(db)
+    db.commit()
+    return question
+
+
+def submit(client, exam, headers: dict, theory: Question, objective: str, essay: str) -> tuple:
+    body = client.post(f"/api/v1/exams/{exam.id}/start", headers=headers).json()
+    answers = [
+        {"question_id": question["id"], "answer": essay if question["id"] == str(theory.id) else objective}
+        for question in body["questions"]
+    ]
+    session_id = body["session_id"]
+    response = client.post(f"/api/v1/exams/{session_id}/submit", json={"answers": answers}, headers=headers)
+    assert response.status_code == 200
+    return session_id, response.json()
+
+
+def test_results_with_theory_answers_wait_for_marking(client, db):
+    exam = make_exam(db, questions=1, pass_mark=75)
+    theory = add_theory_question(db, exam)
+    strong, weak = (make_user(db, f"candidate{i}@example.com", f"ICAN{i}") for i in range(2))
+
+    strong_session, submitted = submit(client, exam, auth_headers(strong), theory, "a", MODEL_ANSWER)
+    submit(client, exam, auth_headers(weak), theory, "a", "No idea.")
+
+    # Objective half only, and no outcome yet
+    assert (submitted["score"], submitted["passed"], submitted["provisional"]) == (50, None, True)
+    result = client.get(f"/api/v1/exams/{strong_session}/result", headers=auth_headers(strong)).json()
+    assert (result["status"], result["passed"]) == ("provisional", None)
+    history = client.get("/api/v1/exams/history", headers=auth_headers(strong)).json()["items"]
+    assert (history[0]["status"], history[0]["passed"]) == ("provisional", None)
+    assert exam_stats_service.get(db, exam.id)["submissions"] == 0
+
+    job = theory_marker.create_job(exam.id)
+    theory_marker.run(db, job, chunk_size=1)
+
+    assert (job.status, job.marked) == ("completed", 2)
+    db.expire_all()
+    assert db.query(UserExamSession).filter(UserExamSession.provisional.is_(True)).count() == 0
+    result = client.get(f"/api/v1/exams/{strong_session}/result", headers=auth_headers(strong)).json()
+    assert (result["status"], result["score"], result["passed"]) == ("graded", 100, True)
+    assert [uid for (uid,) in db.query(UserPaperCredit.user_id)] == [strong.id]
+    stats = exam_stats_service.get(db, exam.id)
+    assert (stats["submissions"], stats["passed"]) == (2, 1)
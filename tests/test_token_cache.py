@@ -0,0 +1,48 @@
+import uuid
+
+import pytest
+from jose import JWTError
+
+from api.v1.services import user as user_module
+from api.v1.services.user import token_cache, user_service
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    token_cache.clear()
+    calls = []
+    decode = user_module.jwt.decode
+    monkeypatch.setattr(user_module.jwt, "decode", lambda *args, **kwargs: calls.append(1) or decode(*args, **kwargs))
+    yield calls
+    token_cache.clear()
+
+
+def test_a_verified_token_is_decoded_once(decodes):
+    user_id = uuid.uuid4()
+    token = user_service.create_access_token(user_id)
+
+    for _ in range(3):
+        assert user_service.decode_access_token(token)["user_id"] == str(user_id)
+
+    assert len(decodes) == 1
+
+
+def test_a_rotated_signing_key_does_not_reuse_cached_claims(decodes, monkeypatch):
+    token = user_service.create_access_token(uuid.uuid4())
+    user_service.decode_access_token(token)
+
+    monkeypatch.setattr(user_module.settings, "SECRET_KEY", "rotated-secret")
+
+    with pytest.raises(JWTError):
+        user_service.decode_access_token(token)
+
+
+def test_cached_claims_expire_with_the_token(decodes, monkeypatch):
+    token = user_service.create_access_token(uuid.uuid4())
+    exp = user_service.decode_access_token(token)["exp"]
+
+    monkeypatch.setattr(token_cache, "clock", lambda: exp + 1)
+    user_service.decode_access_token(token)
+
+    # Past its exp the entry is gone, so the token is verified again
+    assert len(decodes) == 2
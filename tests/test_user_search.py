@@ -0,0 +1,28 @@
+from sqlalchemy.dialects import postgresql
+
+from api.v1.services.user_search import user_search_service
+from tests.conftest import auth_headers, make_user
+
+
+def test_postgres_rank_is_double_precision():
+    ranked = user_search_service._postgres("ada")
+    sql = str(ranked.element.compile(dialect=postgresql.dialect()))
+
+    assert "AS FLOAT(53)) AS rank" in sql
+
+
+def test_search_pages_through_matches(client, db):
+    admin = make_user(db, "admin@example.com", "ADMIN0", is_admin=True)
+    for i in range(5):
+        make_user(db, f"ada{i}@example.com", f"ICAN{i}")
+
+    seen, cursor = [], None
+    for _ in range(5):
+        params = {"q": "ada", "per_page": 2, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/api/v1/admin/users/search", params=params, headers=auth_headers(admin)).json()
+        seen += [user["email"] for user in body["data"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert sorted(seen) == [f"ada{i}@example.com" for i in range(5)]